@@ -0,0 +1,56 @@
+"""Benchmark comparing the storage backends.
+
+Runs the conformance checks of every registered backend and measures the throughput of the common
+workout operations, in operations per second.
+
+Usage:
+    python -m benchmarks.backends --workouts 1000
+"""
+
+import argparse
+import tempfile
+from functools import partial
+
+from src.storage.backends import backend_names, open_storages
+from src.storage.conformance import check_backend, measure_backend
+
+
+def run(workouts: int, directory: str) -> dict[str, tuple[list[str], dict[str, float]]]:
+    """Run the backend benchmark.
+
+    Args:
+        workouts: Number of workouts used by every operation.
+        directory: Directory for the data of the backends.
+
+    Returns:
+        Failed conformance checks and operations per second of each backend.
+    """
+    results = {}
+    for name in backend_names():
+        failures = check_backend(
+            partial(open_storages, name, f'{directory}/{name}/check', durable=True),
+            persistent=name != 'memory',
+        )
+        rates = measure_backend(partial(open_storages, name, f'{directory}/{name}/measure'), workouts)
+        results[name] = failures, rates
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=1000, help='Number of workouts used by every operation.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.workouts, directory)
+
+    operations = list(next(iter(results.values()))[1])
+    print(f'{"backend":<8}' + ''.join(f'{operation:>12}' for operation in operations) + '  conformance')
+    for name, (failures, rates) in results.items():
+        status = 'ok' if not failures else '; '.join(failures)
+        print(f'{name:<8}' + ''.join(f'{rates[operation]:>12.0f}' for operation in operations) + f'  {status}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark for incremental backups of a large workout history.
+
+Fills a workout file with the given number of workouts and backs it up, then backs it up again after
+saving and after editing a single workout, and reports the time and the bytes written by each backup.
+
+Usage:
+    python -m benchmarks.backup --workouts 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from src.models.exercise import Exercise, Workout
+from src.storage.backup import create_backup
+from src.storage.storage import WorkoutStorage
+
+
+def run(workouts: int, directory: str) -> list[tuple[str, float, int]]:
+    """Run the backup benchmark.
+
+    Args:
+        workouts: Number of workouts in the history.
+        directory: Directory for the storage files and the backups.
+
+    Returns:
+        Name, elapsed time and written bytes of each backup.
+    """
+    data_dir = os.path.join(directory, 'data')
+    backup_dir = os.path.join(directory, 'backups')
+    os.makedirs(data_dir)
+    workout_storage = WorkoutStorage(filename=os.path.join(data_dir, 'workouts.json'))
+    start = datetime(2000, 1, 1)
+    workout_storage.bulk_append(
+        {
+            'name': f'day {idx % 7}',
+            'datetime': (start + timedelta(hours=idx)).isoformat(),
+            'exercises': [{'name': f'lift {idx % 50 + n}', 'sets': 3, 'reps': 5, 'weight': 60.0} for n in range(4)],
+        }
+        for idx in range(workouts)
+    )
+    workout = Workout(exercises=[Exercise(name='deadlift', sets=1, reps=1)], name='new')
+
+    def backup(name: str) -> tuple[str, float, int]:
+        started = time.perf_counter()
+        result = create_backup(data_dir, backup_dir)
+        return name, time.perf_counter() - started, result.bytes_written
+
+    results = [backup('initial')]
+    results.append(backup('unchanged'))
+    workout_id = workout_storage.save_workout(workout)
+    results.append(backup('after save'))
+    workout_storage.update_workout(workout_id, workout.model_copy(update={'name': 'edited'}))
+    results.append(backup('after edit'))
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=100_000, help='Number of workouts in the history.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.workouts, directory)
+
+    for name, seconds, written in results:
+        print(f'{name}: {seconds:.3f} s, {written} bytes written')
+
+
+if __name__ == '__main__':
+    main()
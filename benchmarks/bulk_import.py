@@ -0,0 +1,75 @@
+"""Benchmark for bulk importing workout history.
+
+Generates a json lines file with the given number of workouts and imports it into empty storage files,
+then reports the import throughput.
+
+Usage:
+    python -m benchmarks.bulk_import --workouts 100000 --workers 4
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from src.storage.importer import import_workouts
+from src.storage.storage import ExerciseStorage, WorkoutStorage
+
+
+def run(workouts: int, workers: int | None, chunk_size: int, directory: str) -> dict:
+    """Run the import benchmark.
+
+    Args:
+        workouts: Number of workouts to import.
+        workers: Number of validation processes, one per CPU if None.
+        chunk_size: Rows validated at a time by a process.
+        directory: Directory for the source and storage files.
+
+    Returns:
+        Dict with the elapsed time, throughput and number of imported workouts.
+    """
+    source = os.path.join(directory, 'workouts.jsonl')
+    start = datetime(2000, 1, 1)
+    with open(source, 'w', encoding='utf-8') as file_:
+        for idx in range(workouts):
+            record = {
+                'name': f'day {idx % 7}',
+                'datetime': (start + timedelta(hours=idx)).isoformat(),
+                'exercises': [{'name': f'lift {idx % 50 + n}', 'sets': 3, 'reps': 5, 'weight': 60.0} for n in range(4)],
+            }
+            file_.write(json.dumps(record) + '\n')
+
+    workout_storage = WorkoutStorage(filename=os.path.join(directory, 'workouts.json'))
+    exercise_storage = ExerciseStorage(filename=os.path.join(directory, 'exercises.json'))
+    started = time.perf_counter()
+    with open(source, encoding='utf-8') as file_:
+        report = import_workouts(
+            file_, 'jsonl', workout_storage, exercise_storage, chunk_size=chunk_size, workers=workers
+        )
+    elapsed = time.perf_counter() - started
+    return {
+        'workouts': report.imported,
+        'seconds': elapsed,
+        'workouts_per_second': report.imported / elapsed,
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=100_000, help='Number of workouts to import.')
+    parser.add_argument('--workers', type=int, help='Number of validation processes.')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Rows validated at a time by a process.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = run(args.workouts, args.workers, args.chunk_size, directory)
+
+    print(f'imported {result["workouts"]} workouts in {result["seconds"]:.2f} s')
+    print(f'{result["workouts_per_second"]:.0f} workouts/s')
+
+
+if __name__ == '__main__':
+    main()
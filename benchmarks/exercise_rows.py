@@ -0,0 +1,58 @@
+"""Benchmark for adding exercise rows to the workout planning screen.
+
+Adds the given number of rows to a new screen, before its row pool is warmed, then clears the screen,
+as a save does, and adds the rows again from the recycled rows, and reports the time per added row.
+Uses the in-memory storage backend, so no data is written.
+
+Usage:
+    python -m benchmarks.exercise_rows --rows 30
+"""
+
+import argparse
+import os
+import time
+
+# The screens load their kv rules relative to the app directory
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def run(rows: int) -> list[tuple[str, float]]:
+    """Run the exercise row benchmark.
+
+    Args:
+        rows: Number of rows added to the screen.
+
+    Returns:
+        Name and time per added row, in seconds, of each pass.
+    """
+    from src.screens.workout_planning_screen import WorkoutPlanningScreen  # pylint: disable=import-outside-toplevel
+
+    screen = WorkoutPlanningScreen(name='workout_planning')
+
+    def add_rows(name: str) -> tuple[str, float]:
+        started = time.perf_counter()
+        for _ in range(rows):
+            screen.add_exercise_input(None)
+        return name, (time.perf_counter() - started) / rows
+
+    results = [add_rows('built')]
+    screen.clear_inputs()
+    results.append(add_rows('recycled'))
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=30, help='Number of rows added to the screen.')
+    args = parser.parse_args()
+
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ['XRCS_STORAGE_BACKEND'] = 'memory'
+    os.chdir(SRC_DIR)
+    for name, seconds in run(args.rows):
+        print(f'{name}: {seconds * 1000:.2f} ms per row')
+
+
+if __name__ == '__main__':
+    main()
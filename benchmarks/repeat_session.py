@@ -0,0 +1,116 @@
+"""Benchmark for repeating the last session of a workout and showing the last performance of an exercise.
+
+Saves a workout history to the json storage, then finds the last session of a workout by loading
+every workout, from a freshly opened storage and from one holding the workouts in memory, and with
+the session index, which reads the history once. Reports the time per lookup and the time to load
+the index, which the planning screen does off the UI thread. Then finds the last performance of an
+exercise by scanning the workouts held in memory and with the index.
+
+Usage:
+    python -m benchmarks.repeat_session --workouts 10000 --lookups 100
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from src.models.exercise import Exercise, Workout
+from src.storage.backends import open_storages
+from src.storage.session_index import SessionIndex
+
+WORKOUT_NAMES = ['Push', 'Pull', 'Legs', 'Upper', 'Lower', 'Full Body', 'Cardio', 'Core']
+
+
+def run(workouts: int, lookups: int, directory: str, seed: int = 0) -> dict[str, float]:
+    """Run the benchmark.
+
+    Args:
+        workouts: Number of saved workouts.
+        lookups: Number of last sessions looked up.
+        directory: Directory for the data of the storage.
+        seed: Seed of the history.
+
+    Returns:
+        Time per session lookup by scanning the history from a fresh and a cached storage and with the
+        index, time to load the index, and time per last performance lookup by scanning and with the
+        index, in milliseconds.
+    """
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    storage = open_storages('json', directory).workouts
+    storage.save_workouts(
+        [
+            Workout(
+                name=rng.choice(WORKOUT_NAMES),
+                datetime=(start + timedelta(hours=12 * idx)).isoformat(),
+                exercises=[Exercise(name=f'exercise {rng.randrange(50)}', sets=3, reps=8, weight=50) for _ in range(6)],
+            )
+            for idx in range(workouts)
+        ]
+    )
+    names = rng.choices(WORKOUT_NAMES, k=lookups)
+
+    def scan(name: str, storage) -> dict:
+        return max(
+            (record for record in storage.load_workouts() or [] if record['name'] == name), key=lambda r: r['datetime']
+        )
+
+    started = time.perf_counter()
+    for name in names[:10]:
+        scan(name, open_storages('json', directory).workouts)
+    cold = (time.perf_counter() - started) / len(names[:10])
+    started = time.perf_counter()
+    for name in names:
+        scan(name, storage)
+    cached = (time.perf_counter() - started) / lookups
+
+    exercises = [f'exercise {rng.randrange(50)}' for _ in range(lookups)]
+    started = time.perf_counter()
+    for exercise in exercises:
+        max(
+            (record['datetime'], performance)
+            for record in storage.load_workouts() or []
+            for performance in record['exercises']
+            if performance['name'] == exercise
+        )
+    exercise_scan = (time.perf_counter() - started) / lookups
+
+    index = SessionIndex(storage)
+    started = time.perf_counter()
+    index.workout_names()
+    load = time.perf_counter() - started
+    started = time.perf_counter()
+    for name in names:
+        index.next_session(name, progress=True)
+    lookup = (time.perf_counter() - started) / lookups
+    started = time.perf_counter()
+    for exercise in exercises:
+        index.last_performance(exercise)
+    exercise_lookup = (time.perf_counter() - started) / lookups
+
+    return {
+        'cold scan ms': cold * 1000,
+        'cached scan ms': cached * 1000,
+        'index ms': lookup * 1000,
+        'index load ms': load * 1000,
+        'exercise scan ms': exercise_scan * 1000,
+        'exercise index ms': exercise_lookup * 1000,
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=10_000, help='Number of saved workouts.')
+    parser.add_argument('--lookups', type=int, default=100, help='Number of last sessions looked up.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.workouts, args.lookups, directory)
+    print(', '.join(f'{name} {value:.3f}' for name, value in results.items()))
+
+
+if __name__ == '__main__':
+    main()
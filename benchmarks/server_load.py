@@ -0,0 +1,101 @@
+"""Load generator for the workout server.
+
+Simulates many active users, each sending a mix of workout saves and loads over its own connection,
+and reports the throughput and latency of the server. Starts a server in a temporary directory
+unless the port of a running server is given.
+
+Usage:
+    python -m benchmarks.server_load --users 1000 --requests 20 --write-ratio 0.2
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+from src.server import ShardedStore, WorkoutServer
+from src.storage.sync import receive_message, send_message
+
+WORKOUT = {'name': 'day', 'exercises': [{'name': 'squat', 'sets': 3, 'reps': 5, 'weight': 100.0}] * 4}
+
+
+async def _user(port: int, user: str, requests: int, write_ratio: float, latencies: list[float]) -> int:
+    """Send the requests of a single user, return the number of failed requests."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    failed = 0
+    try:
+        for idx in range(requests):
+            if random.random() < write_ratio:
+                message = {'op': 'save_workout', 'user': user, 'workout': {**WORKOUT, 'name': f'day {idx}'}}
+            else:
+                message = {'op': 'load_workouts', 'user': user}
+            started = time.perf_counter()
+            await send_message(writer, message)
+            response = await receive_message(reader)
+            latencies.append(time.perf_counter() - started)
+            failed += not (response and response['ok'])
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return failed
+
+
+async def run(users: int, requests: int, write_ratio: float, port: int | None = None, directory: str = '') -> dict:
+    """Run the load test.
+
+    Args:
+        users: Number of concurrent users.
+        requests: Number of requests sent by each user.
+        write_ratio: Share of requests saving a workout, the others load the workouts of the user.
+        port: Port of a running server. If None, a server is started in `directory`.
+        directory: Directory for the data of a started server.
+
+    Returns:
+        Dict with the elapsed time, throughput, latency percentiles and number of failed requests.
+    """
+    server = None
+    if port is None:
+        server = WorkoutServer(ShardedStore(directory))
+        _, port = await server.start(port=0)
+    latencies: list[float] = []
+    try:
+        started = time.perf_counter()
+        failed = await asyncio.gather(
+            *(_user(port, f'user{idx}', requests, write_ratio, latencies) for idx in range(users))
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            await server.close()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': quantiles[49] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'failed': sum(failed),
+    }
+
+
+def main() -> None:
+    """Run the load test from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000, help='Number of concurrent users.')
+    parser.add_argument('--requests', type=int, default=20, help='Requests sent by each user.')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of requests saving a workout.')
+    parser.add_argument('--port', type=int, help='Port of a running server, one is started if not given.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = asyncio.run(run(args.users, args.requests, args.write_ratio, port=args.port, directory=directory))
+
+    print(f'{result["requests"]} requests in {result["seconds"]:.2f} s, {result["requests_per_second"]:.0f} requests/s')
+    print(f'latency p50 {result["p50_ms"]:.1f} ms, p99 {result["p99_ms"]:.1f} ms, failed {result["failed"]}')
+
+
+if __name__ == '__main__':
+    main()
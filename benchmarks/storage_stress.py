@@ -0,0 +1,85 @@
+"""Stress benchmark for concurrent storage writers.
+
+Runs several writer processes that save workouts and exercises to the same storage files at the same
+time, then reports the write throughput and the number of records lost to concurrent updates.
+
+Usage:
+    python -m benchmarks.storage_stress --processes 8 --records 200
+"""
+
+import argparse
+import multiprocessing
+import multiprocessing.synchronize
+import os
+import tempfile
+import time
+
+from src.models.exercise import Exercise, Workout
+from src.storage.storage import ExerciseStorage, WorkoutStorage
+
+
+def _writer(directory: str, writer_id: int, records: int, start: multiprocessing.synchronize.Event) -> None:
+    """Save workouts and exercises from a single process."""
+    workout_storage = WorkoutStorage(filename=os.path.join(directory, 'workouts.json'))
+    exercise_storage = ExerciseStorage(filename=os.path.join(directory, 'exercises.json'))
+    start.wait()
+    for idx in range(records):
+        name = f'exercise {writer_id}-{idx}'
+        workout_storage.save_workout(Workout(exercises=[Exercise(name=name, sets=3, reps=5)], name=name))
+        exercise_storage.save_exercise(name)
+
+
+def run(processes: int, records: int, directory: str) -> dict:
+    """Run the stress benchmark.
+
+    Args:
+        processes: Number of writer processes.
+        records: Number of workouts and exercises saved by each process.
+        directory: Directory for the storage files.
+
+    Returns:
+        Dict with the elapsed time, throughput and number of lost workouts and exercises.
+    """
+    start = multiprocessing.Event()
+    workers = [
+        multiprocessing.Process(target=_writer, args=(directory, writer_id, records, start))
+        for writer_id in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    started = time.perf_counter()
+    start.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    expected = {f'exercise {writer_id}-{idx}' for writer_id in range(processes) for idx in range(records)}
+    workouts = WorkoutStorage(filename=os.path.join(directory, 'workouts.json')).load_workouts() or []
+    exercises = ExerciseStorage(filename=os.path.join(directory, 'exercises.json')).load_exercises() or []
+    return {
+        'processes': processes,
+        'records': processes * records,
+        'seconds': elapsed,
+        'writes_per_second': 2 * processes * records / elapsed,
+        'lost_workouts': len(expected - {workout['name'] for workout in workouts}),
+        'lost_exercises': len(expected - set(exercises)),
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8, help='Number of writer processes.')
+    parser.add_argument('--records', type=int, default=100, help='Records saved by each process.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = run(args.processes, args.records, directory)
+
+    print(f'{result["processes"]} processes, {result["records"]} workouts and exercises')
+    print(f'{result["seconds"]:.2f} s, {result["writes_per_second"]:.0f} writes/s')
+    print(f'lost workouts: {result["lost_workouts"]}, lost exercises: {result["lost_exercises"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark for the keystrokes needed to enter an exercise with suggestions.
+
+Builds a catalog of exercise names and a year of workout history, where a routine of exercises is
+performed with varying frequency, then counts the keystrokes typed before the next exercise of the
+routine shows up among the suggestions. Compares the ranked suggestions of the exercise index with
+the first substring matches in the order the exercises were saved, and reports the time per query.
+Then looks up misspelled names, with two adjacent characters swapped, and reports how often the
+intended name is suggested and the time per fuzzy query.
+
+Usage:
+    python -m benchmarks.suggestions --exercises 500 --entries 1000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from src.models.exercise import Exercise, Workout
+from src.storage.exercise_index import ExerciseIndex
+from src.storage.memory import MemoryExerciseStorage, MemoryWorkoutStorage
+
+SUGGESTIONS = 5
+MOVES = ['squat', 'press', 'row', 'curl', 'raise', 'deadlift', 'lunge', 'fly', 'pulldown', 'extension']
+VARIANTS = ['barbell', 'dumbbell', 'cable', 'machine', 'smith', 'single arm', 'incline', 'decline', 'seated']
+
+
+def _keystrokes(name: str, suggest) -> int:
+    """Return the number of characters typed before the name is suggested."""
+    for typed in range(1, len(name) + 1):
+        if name in suggest(name[:typed]):
+            return typed
+    return len(name)
+
+
+def _catalog(exercises: int, rng: random.Random) -> list[str]:
+    """Return a catalog of exercise names."""
+    names = [f'{variant} {move}' for move in MOVES for variant in VARIANTS]
+    names += [f'{rng.choice(names)} {idx}' for idx in range(exercises)]
+    names = list(dict.fromkeys(names))[:exercises]
+    rng.shuffle(names)
+    return names
+
+
+def run(exercises: int, entries: int, seed: int = 0) -> dict[str, tuple[float, float]]:
+    """Run the suggestion benchmark.
+
+    Args:
+        exercises: Number of exercise names in the catalog.
+        entries: Number of exercises entered.
+        seed: Seed of the catalog and the history.
+
+    Returns:
+        Mean keystrokes per entered exercise and mean time per query, in microseconds, of each ranking.
+    """
+    rng = random.Random(seed)
+    names = _catalog(exercises, rng)
+    routine = rng.sample(names, 20)
+    weights = [1 / (rank + 1) for rank in range(len(routine))]
+
+    def session(day: datetime) -> Workout:
+        chosen = dict.fromkeys(rng.choices(routine, weights, k=5))
+        return Workout(
+            name='session',
+            datetime=day.isoformat(),
+            exercises=[Exercise(name=name, sets=3, reps=8) for name in chosen],
+        )
+
+    start = datetime(2024, 1, 1)
+    exercise_storage = MemoryExerciseStorage()
+    exercise_storage.save_exercises(names)
+    workout_storage = MemoryWorkoutStorage()
+    workout_storage.save_workouts([session(start + timedelta(days=3 * idx)) for idx in range(120)])
+    index = ExerciseIndex(exercise_storage, workout_storage)
+    # Build the index before the queries are timed
+    index.suggest('')
+    targets = [name for _ in range(entries // 5) for name in session(start).model_dump()['exercises']]
+
+    def saved_order(text: str) -> list[str]:
+        text = text.lower()
+        return list(islice((name for name in names if text in name), SUGGESTIONS))
+
+    results = {}
+    for ranking, suggest in (('saved order', saved_order), ('ranked', lambda text: index.suggest(text, SUGGESTIONS))):
+        queries = 0
+        started = time.perf_counter()
+        keystrokes = []
+        for target in targets:
+            keystrokes.append(_keystrokes(target['name'], suggest))
+            queries += keystrokes[-1]
+        results[ranking] = statistics.mean(keystrokes), (time.perf_counter() - started) / queries * 1e6
+    return results
+
+
+def run_fuzzy(exercises: int, queries: int, seed: int = 0) -> tuple[float, float, float]:
+    """Run the fuzzy suggestion benchmark.
+
+    Args:
+        exercises: Number of exercise names in the catalog.
+        queries: Number of misspelled names looked up.
+        seed: Seed of the catalog and the typos.
+
+    Returns:
+        Time to build the index in seconds, share of queries suggesting the intended name and mean time
+        per query in microseconds.
+    """
+    rng = random.Random(seed)
+    names = _catalog(exercises, rng)
+    exercise_storage = MemoryExerciseStorage()
+    exercise_storage.save_exercises(names)
+    index = ExerciseIndex(exercise_storage)
+    started = time.perf_counter()
+    index.suggest('')
+    build = time.perf_counter() - started
+
+    typos = []
+    for name in rng.choices(names, k=queries):
+        swap = rng.randrange(1, min(len(name), 7) - 1)
+        typos.append((name[: swap - 1] + name[swap] + name[swap - 1] + name[swap + 1 :], name))
+    started = time.perf_counter()
+    found = sum(name in index.suggest(typo, SUGGESTIONS) for typo, name in typos)
+    return build, found / queries, (time.perf_counter() - started) / queries * 1e6
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exercises', type=int, default=500, help='Number of exercise names in the catalog.')
+    parser.add_argument('--entries', type=int, default=1000, help='Number of exercises entered.')
+    args = parser.parse_args()
+
+    for ranking, (keystrokes, micros) in run(args.exercises, args.entries).items():
+        print(f'{ranking}: {keystrokes:.2f} keystrokes per exercise, {micros:.1f} us per query')
+    build, found, micros = run_fuzzy(args.exercises, args.entries)
+    print(f'fuzzy: index built in {build:.2f} s, {found:.0%} of typos found, {micros:.1f} us per query')
+
+
+if __name__ == '__main__':
+    main()
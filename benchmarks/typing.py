@@ -0,0 +1,103 @@
+"""Benchmark for exercise suggestions while typing.
+
+Types exercise names into an exercise input at a random pace of 10 to 20 keys per second, with the
+Kivy clock running, and reports the time each keystroke blocks the UI thread, the number of lookups
+per typed name and the time from the last keystroke until the suggestions are shown. The benchmark
+runs with the debounce delay of the app and without one, looking up on every keystroke.
+
+Usage:
+    python -m benchmarks.typing --exercises 10000 --names 10
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+# The screens load their kv rules relative to the app directory
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def run(exercises: int, names: int, delay: float, seed: int = 0) -> dict[str, float]:
+    """Run the typing benchmark.
+
+    Args:
+        exercises: Number of saved exercises.
+        names: Number of exercise names typed.
+        delay: Debounce delay of the suggestion lookups, in seconds.
+        seed: Seed of the typing pace and the typed names.
+
+    Returns:
+        Mean and maximum keystroke time, lookups per name and mean suggestion latency, in milliseconds.
+    """
+    # pylint: disable=import-outside-toplevel
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+
+    from src.screens import workout_planning_screen
+    from src.storage.memory import MemoryExerciseStorage
+
+    class CountingExerciseStorage(MemoryExerciseStorage):
+        lookups = 0
+
+        def load_exercises(self):
+            CountingExerciseStorage.lookups += 1
+            return super().load_exercises()
+
+    rng = random.Random(seed)
+    storage = CountingExerciseStorage()
+    storage.save_exercises([f'exercise {idx:05d}' for idx in range(exercises)])
+    workout_planning_screen.SUGGESTION_DELAY = delay
+    exercise_input = workout_planning_screen.ExerciseInput(exercise_storage=storage)
+    Window.add_widget(exercise_input)
+    exercise_input.focus = True
+
+    def wait(seconds: float) -> None:
+        until = time.perf_counter() + seconds
+        while time.perf_counter() < until:
+            Clock.tick()
+
+    keystrokes = []
+    latencies = []
+    for _ in range(names):
+        name = f'exercise {rng.randrange(exercises):05d}'
+        exercise_input.text = ''
+        wait(0.2)
+        for end in range(1, len(name) + 1):
+            wait(1 / rng.uniform(10, 20))
+            started = time.perf_counter()
+            exercise_input.text = name[:end]
+            keystrokes.append(time.perf_counter() - started)
+        typed = time.perf_counter()
+        while not (exercise_input._dropdown_open and exercise_input.suggestion_buttons[0].text == name):  # pylint: disable=protected-access
+            Clock.tick()
+        latencies.append(time.perf_counter() - typed)
+    Window.remove_widget(exercise_input)
+
+    return {
+        'keystroke ms': statistics.mean(keystrokes) * 1000,
+        'max keystroke ms': max(keystrokes) * 1000,
+        'lookups per name': CountingExerciseStorage.lookups / names,
+        'latency ms': statistics.mean(latencies) * 1000,
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exercises', type=int, default=10_000, help='Number of saved exercises.')
+    parser.add_argument('--names', type=int, default=10, help='Number of exercise names typed.')
+    args = parser.parse_args()
+
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.chdir(SRC_DIR)
+    from src.screens.workout_planning_screen import SUGGESTION_DELAY  # pylint: disable=import-outside-toplevel
+
+    for delay in (SUGGESTION_DELAY, 0):
+        results = run(args.exercises, args.names, delay)
+        print(f'delay {delay:.2f} s: ' + ', '.join(f'{name} {value:.2f}' for name, value in results.items()))
+
+
+if __name__ == '__main__':
+    main()
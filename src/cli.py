@@ -0,0 +1,362 @@
+"""Command line interface for working with xrcs data without starting the app.
+
+The CLI only uses the storage and models, and never imports Kivy, so it starts quickly and can run on
+servers and in CI. The models, and the modules of the import, export, sync and backup commands, are
+only imported by the commands using them.
+
+The export, stats, history and verify commands work with any storage backend, selected with `--backend`
+or the `XRCS_STORAGE_BACKEND` environment variable like in the app. The other commands work on the
+files of the json backend and fail on other backends.
+
+Usage:
+    python -m src.cli --data-dir DIR [--backend NAME]
+        {import,export,stats,history,compact,upgrade,dedup,merge,sync,backup,restore,verify} ...
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+from collections import Counter
+
+from .storage.backends import BACKEND_VARIABLE, DEFAULT_BACKEND, Storages, backend_names, open_storages
+from .storage.formats import EXPORT_FORMATS, FORMATS, guess_format
+from .storage.storage import ExerciseStorage, WorkoutStorage
+
+
+def _storages(args: argparse.Namespace) -> Storages:
+    """Open the storages of the selected backend in the data directory."""
+    return open_storages(args.backend, args.data_dir)
+
+
+def _json_storages(args: argparse.Namespace) -> tuple[WorkoutStorage, ExerciseStorage]:
+    """Create the storages of the json backend in the data directory."""
+    return (
+        WorkoutStorage(filename=os.path.join(args.data_dir, 'workouts.json')),
+        ExerciseStorage(filename=os.path.join(args.data_dir, 'exercises.json')),
+    )
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    """Import workouts from a json, json lines or csv file."""
+    from .storage.importer import import_workouts  # pylint: disable=import-outside-toplevel
+
+    workout_storage, exercise_storage = _json_storages(args)
+    try:
+        opener = gzip.open if args.file.lower().endswith('.gz') else open
+        with opener(args.file, 'rt', encoding='utf-8', newline='') as file_:
+            report = import_workouts(
+                file_,
+                guess_format(args.file, args.format),
+                workout_storage,
+                exercise_storage,
+                skip_invalid=args.skip_invalid,
+                chunk_size=args.chunk_size,
+                workers=args.workers,
+            )
+    except (ValueError, csv.Error) as err:
+        print(f'unreadable file: {err}, nothing imported', file=sys.stderr)
+        return 1
+
+    for row, error in report.errors:
+        print(f'row {row}: {error}', file=sys.stderr)
+    if report.errors and not args.skip_invalid:
+        print(f'{len(report.errors)} invalid rows, nothing imported', file=sys.stderr)
+        return 1
+    print(
+        f'imported {report.imported} workouts, skipped {report.duplicates} duplicates '
+        f'and {len(report.errors)} invalid rows'
+    )
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Export workouts to a json, json lines, csv or columnar file."""
+    from .storage.exporter import export_workouts, open_output  # pylint: disable=import-outside-toplevel
+
+    workout_storage = _storages(args).workouts
+    with open_output(args.output, compress=args.compress) as file_:
+        count = export_workouts(
+            workout_storage,
+            file_,
+            guess_format(args.output or '', args.format),
+            since=args.since,
+            until=args.until,
+            exercises=args.exercise,
+        )
+    if args.output:
+        print(f'exported {count} workouts')
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    """Print statistics about the saved workouts."""
+    storages = _storages(args)
+    workout_storage, exercise_storage = storages.workouts, storages.exercises
+    workouts = sets = reps = 0
+    volume = 0.0
+    dates = []
+    exercises: Counter[str] = Counter()
+    for workout in workout_storage.iter_workouts():
+        workouts += 1
+        if workout.get('date'):
+            dates.append(workout['date'])
+        for exercise in workout['exercises']:
+            exercises[exercise['name'].lower()] += 1
+            sets += exercise['sets']
+            reps += exercise['sets'] * exercise['reps']
+            volume += exercise['sets'] * exercise['reps'] * (exercise.get('weight') or 0)
+
+    stats = {
+        'workouts': workouts,
+        'exercises': len(exercise_storage.load_exercises() or []),
+        'sets': sets,
+        'reps': reps,
+        'volume_kg': volume,
+        'first_date': min(dates, default=None),
+        'last_date': max(dates, default=None),
+        'top_exercises': exercises.most_common(args.top),
+        # Share of dead entries of the change log, only kept by the json backend
+        'dead_ratio': getattr(workout_storage, 'dead_ratio', None),
+    }
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        for key, value in stats.items():
+            print(f'{key}: {value}')
+    return 0
+
+
+def cmd_history(args: argparse.Namespace) -> int:
+    """Print every performance of an exercise, read from the exercise posting lists."""
+    workout_storage = _storages(args).workouts
+    history = workout_storage.exercise_history(args.exercise)
+    if args.json:
+        print(json.dumps(history))
+        return 0
+    for performance in history:
+        weight = f' @ {performance["weight"]:g} kg' if performance.get('weight') is not None else ''
+        print(f'{performance["date"]}  {performance["workout"]}: {performance["sets"]} x {performance["reps"]}{weight}')
+    print(f'{len(history)} performances of {args.exercise}')
+    return 0
+
+
+def cmd_compact(args: argparse.Namespace) -> int:
+    """Fold the change log into the workout file."""
+    workout_storage, _ = _json_storages(args)
+    before = workout_storage.dead_ratio
+    workout_storage.compact()
+    print(f'dead ratio {before:.2f} -> {workout_storage.dead_ratio:.2f}')
+    return 0
+
+
+def cmd_upgrade(args: argparse.Namespace) -> int:
+    """Rewrite workouts saved with an outdated schema version."""
+    workout_storage, _ = _json_storages(args)
+    print(f'upgraded {workout_storage.upgrade_schema()} workouts')
+    return 0
+
+
+def cmd_merge(args: argparse.Namespace) -> int:
+    """Merge the workouts file of another device into the saved workouts."""
+    workout_storage, exercise_storage = _json_storages(args)
+    other = WorkoutStorage(filename=args.file)
+    if not os.path.exists(other.filename):
+        print(f'{args.file} does not exist', file=sys.stderr)
+        return 1
+    changed = workout_storage.merge(other.iter_workouts())
+    exercise_storage.save_exercises(
+        [exercise['name'] for workout in other.iter_workouts() for exercise in workout['exercises']]
+    )
+    print(f'merged {changed} workouts')
+    return 0
+
+
+def cmd_dedup(args: argparse.Namespace) -> int:
+    """Remove duplicate saved workouts."""
+    workout_storage, _ = _json_storages(args)
+    print(f'removed {workout_storage.deduplicate()} duplicate workouts')
+    return 0
+
+
+def cmd_sync(args: argparse.Namespace) -> int:
+    """Sync the workouts with a sync server."""
+    from .storage.sync import SyncError, sync_workouts  # pylint: disable=import-outside-toplevel
+
+    workout_storage, _ = _json_storages(args)
+    try:
+        result = sync_workouts(workout_storage, args.user, host=args.host, port=args.port)
+    except (OSError, SyncError) as err:
+        print(f'sync failed: {err}', file=sys.stderr)
+        return 1
+    print(f'pushed {result.pushed} changes, pulled {result.pulled} changes')
+    return 0
+
+
+def _backup_dir(args: argparse.Namespace) -> str:
+    """Return the backup directory, `backups` in the data directory by default."""
+    return args.backup_dir or os.path.join(args.data_dir, 'backups')
+
+
+def cmd_backup(args: argparse.Namespace) -> int:
+    """Back up the storage files incrementally."""
+    from .storage.backup import create_backup, list_snapshots  # pylint: disable=import-outside-toplevel
+
+    if args.list:
+        for snapshot in list_snapshots(_backup_dir(args)):
+            print(snapshot)
+        return 0
+    result = create_backup(args.data_dir, _backup_dir(args), full=args.full)
+    print(
+        f'snapshot {result.snapshot}: {result.files} files, '
+        f'{result.chunks} new chunks, {result.bytes_written} bytes written'
+    )
+    return 0
+
+
+def cmd_restore(args: argparse.Namespace) -> int:
+    """Restore the storage files from a backup snapshot."""
+    from .storage.backup import BackupError, restore_backup  # pylint: disable=import-outside-toplevel
+
+    try:
+        snapshot = restore_backup(_backup_dir(args), args.data_dir, args.snapshot)
+    except BackupError as err:
+        print(f'restore failed: {err}', file=sys.stderr)
+        return 1
+    print(f'restored snapshot {snapshot}')
+    return 0
+
+
+def cmd_verify(args: argparse.Namespace) -> int:
+    """Check that the stored data is readable and valid."""
+    from pydantic import ValidationError  # pylint: disable=import-outside-toplevel
+
+    from .models.exercise import Workout  # pylint: disable=import-outside-toplevel
+
+    storages = _storages(args)
+    workout_storage, exercise_storage = storages.workouts, storages.exercises
+    problems = []
+    ids: set[str] = set()
+    count = 0
+    try:
+        for workout in workout_storage.iter_workouts():
+            count += 1
+            if workout['id'] in ids:
+                problems.append(f'duplicate workout id {workout["id"]}')
+            ids.add(workout['id'])
+            try:
+                Workout(**{key: value for key, value in workout.items() if key != 'id'})
+            except ValidationError as err:
+                problems.append(f'invalid workout {workout["id"]}: {err}')
+    except (json.JSONDecodeError, KeyError, TypeError) as err:
+        problems.append(f'unreadable workout file: {err}')
+
+    try:
+        exercises = exercise_storage.load_exercises() or []
+        if not all(isinstance(name, str) for name in exercises):
+            problems.append('exercise names must be strings')
+    except (json.JSONDecodeError, TypeError) as err:
+        problems.append(f'unreadable exercise file: {err}')
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    print(f'checked {count} workouts, found {len(problems)} problems')
+    return 1 if problems else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of the CLI."""
+    parser = argparse.ArgumentParser(prog='xrcs', description='Work with xrcs workout data.')
+    parser.add_argument('--data-dir', default='.', help='Directory with the storage files.')
+    parser.add_argument(
+        '--backend',
+        default=os.environ.get(BACKEND_VARIABLE, DEFAULT_BACKEND),
+        help=f'Storage backend, one of {", ".join(backend_names())}. ${BACKEND_VARIABLE} or json by default.',
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='Import workouts from a file.')
+    import_parser.add_argument('file', help='File to import.')
+    import_parser.add_argument('--format', choices=FORMATS, help='File format, guessed from the extension.')
+    import_parser.add_argument('--skip-invalid', action='store_true', help='Import valid rows if some are invalid.')
+    import_parser.add_argument('--workers', type=int, help='Number of validation processes, one per CPU by default.')
+    import_parser.add_argument('--chunk-size', type=int, default=1000, help='Rows validated at a time by a process.')
+    import_parser.set_defaults(func=cmd_import, json_only=True)
+
+    export_parser = commands.add_parser('export', help='Export workouts to a file.')
+    export_parser.add_argument('--output', '-o', help='File to write, stdout if not given.')
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, help='File format, guessed from the extension.')
+    export_parser.add_argument('--since', help='First date to export, as YYYY-MM-DD.')
+    export_parser.add_argument('--until', help='Last date to export, as YYYY-MM-DD.')
+    export_parser.add_argument('--exercise', action='append', help='Only export this exercise, can be repeated.')
+    export_parser.add_argument('--compress', action='store_true', help='Compress with gzip, implied by a .gz output.')
+    export_parser.set_defaults(func=cmd_export)
+
+    stats_parser = commands.add_parser('stats', help='Print workout statistics.')
+    stats_parser.add_argument('--top', type=int, default=5, help='Number of most frequent exercises to show.')
+    stats_parser.add_argument('--json', action='store_true', help='Print statistics as json.')
+    stats_parser.set_defaults(func=cmd_stats)
+
+    history_parser = commands.add_parser('history', help='Print every performance of an exercise.')
+    history_parser.add_argument('exercise', help='Name of the exercise, case insensitive.')
+    history_parser.add_argument('--json', action='store_true', help='Print the performances as json.')
+    history_parser.set_defaults(func=cmd_history)
+
+    compact_parser = commands.add_parser('compact', help='Fold the change log into the workout file.')
+    compact_parser.set_defaults(func=cmd_compact, json_only=True)
+
+    upgrade_parser = commands.add_parser('upgrade', help='Upgrade the workout file to the current schema.')
+    upgrade_parser.set_defaults(func=cmd_upgrade, json_only=True)
+
+    dedup_parser = commands.add_parser('dedup', help='Remove duplicate saved workouts.')
+    dedup_parser.set_defaults(func=cmd_dedup, json_only=True)
+
+    merge_parser = commands.add_parser('merge', help='Merge the workouts file of another device.')
+    merge_parser.add_argument('file', help='Workouts file to merge, with its change log next to it.')
+    merge_parser.set_defaults(func=cmd_merge, json_only=True)
+
+    sync_parser = commands.add_parser('sync', help='Sync the workouts with a sync server.')
+    sync_parser.add_argument('--user', required=True, help='Name of the user on the sync server.')
+    sync_parser.add_argument('--host', default='127.0.0.1', help='Host of the sync server.')
+    sync_parser.add_argument('--port', type=int, default=8765, help='Port of the sync server.')
+    sync_parser.set_defaults(func=cmd_sync, json_only=True)
+
+    backup_parser = commands.add_parser('backup', help='Back up the storage files incrementally.')
+    backup_parser.add_argument('--backup-dir', help='Backup directory, backups in the data directory by default.')
+    backup_parser.add_argument('--full', action='store_true', help='Read all files again, even if unchanged.')
+    backup_parser.add_argument('--list', action='store_true', help='List the snapshots instead of backing up.')
+    backup_parser.set_defaults(func=cmd_backup, json_only=True)
+
+    restore_parser = commands.add_parser('restore', help='Restore the storage files from a backup.')
+    restore_parser.add_argument('snapshot', nargs='?', help='Snapshot to restore, the latest by default.')
+    restore_parser.add_argument('--backup-dir', help='Backup directory, backups in the data directory by default.')
+    restore_parser.set_defaults(func=cmd_restore, json_only=True)
+
+    verify_parser = commands.add_parser('verify', help='Check the stored data.')
+    verify_parser.set_defaults(func=cmd_verify)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the CLI.
+
+    Args:
+        argv: Command line arguments, sys.argv if not given.
+
+    Returns:
+        Exit code.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.backend not in backend_names():
+        parser.error(f'unknown storage backend {args.backend!r}, expecting one of {", ".join(backend_names())}')
+    if getattr(args, 'json_only', False) and args.backend != 'json':
+        print(f'{args.command} only works with the json backend, not {args.backend}', file=sys.stderr)
+        return 1
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
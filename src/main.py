@@ -1,11 +1,16 @@
 from kivy.app import App
+from kivy.logger import Logger
 from kivy.uix.screenmanager import ScreenManager
 
 from .screens.main_screen import MainScreen
 from .screens.profile_screen import ProfileScreen
 from .screens.workout_list_screen import WorkoutListScreen
 from .screens.workout_planning_screen import WorkoutPlanningScreen
-from .storage.storage import ProfileStorage
+from .storage.backends import get_storages
+from .storage.write_behind import get_write_queue
+
+# Seconds the app waits for pending storage writes when it is paused or stopped
+FLUSH_TIMEOUT = 5.0
 
 
 class ExerciseApp(App):
@@ -21,7 +26,7 @@ class ExerciseApp(App):
         The method creates a screen manager and add all screens to it.
         The screen manager is then returned as the root widget.
         """
-        self.storage = ProfileStorage()  # pylint: disable=attribute-defined-outside-init
+        self.storage = get_storages().profile  # pylint: disable=attribute-defined-outside-init
         sm = ScreenManager()
 
         sm.add_widget(ProfileScreen(name='profile'))
@@ -33,6 +38,30 @@ class ExerciseApp(App):
 
         return sm
 
+    def on_pause(self):
+        """Persist pending storage writes before the app is paused.
+
+        Returns:
+            True to allow the app to pause.
+        """
+        self._flush_writes()
+        return True
+
+    def on_stop(self):
+        """Persist pending storage writes before the app is stopped."""
+        self._flush_writes()
+
+    @staticmethod
+    def _flush_writes():
+        """Persist pending storage writes, logging a failing or slow write instead of crashing the app.
+
+        Failed writes stay queued and are retried by the write-behind queue.
+        """
+        try:
+            get_write_queue().flush(FLUSH_TIMEOUT)
+        except Exception as e:  # pylint: disable=broad-except
+            Logger.error('Pending storage writes were not persisted: %s', e)
+
 
 if __name__ == '__main__':
     # Run application
@@ -1,4 +1,4 @@
-from datetime import date, datetime
+from datetime import datetime
 
 from pydantic import BaseModel, PositiveFloat, PositiveInt, model_validator
 
@@ -36,7 +36,13 @@ class Workout(BaseModel):
 
     @model_validator(mode='after')
     def set_dates(self) -> 'Workout':
-        """Set date and datetime fields."""
-        self.date = date.today().isoformat()
-        self.datetime = datetime.now().isoformat()
+        """Set date and datetime fields if not given.
+
+        A missing datetime is set to the current time and a missing date to the date of the datetime,
+        so imported and synced workouts keep the dates they were performed on.
+        """
+        if self.datetime is None:
+            self.datetime = datetime.now().isoformat()
+        if self.date is None:
+            self.date = datetime.fromisoformat(self.datetime).date().isoformat()
         return self
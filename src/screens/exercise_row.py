@@ -0,0 +1,131 @@
+from collections.abc import Callable
+from typing import TypeVar
+
+from pydantic import ValidationError
+
+from ..models.exercise import Exercise
+from ..storage.session_journal import ROW_FIELDS
+
+# Hint texts of the sets, reps and weight inputs of a row
+ROW_HINTS = ('Sets', 'Reps', 'Weight (kg)')
+
+# Background colors of a valid input and of an invalid input of a row
+VALID_COLOR = (1, 1, 1, 1)
+INVALID_COLOR = (1, 0.6, 0.6, 1)
+
+N = TypeVar('N', int, float)
+
+
+class ExerciseRow:
+    """View model of an exercise row of the workout planning screen.
+
+    The row keeps direct references to its name, sets, reps and weight inputs and validates them
+    whenever one of them is edited, so the exercise of the row is ready before the workout is saved.
+    Invalid inputs are tinted while the row has any text.
+
+    Attributes:
+        widget: Layout showing the inputs of the row.
+        exercise: Exercise of the row, None if the row is invalid or has no name.
+        invalid: Names of the invalid fields of the row.
+        on_edit: Function called with the row, the name and the new text of an edited input.
+    """
+
+    FIELDS = ROW_FIELDS
+
+    def __init__(self, widget, name, sets, reps, weight):
+        """Initialize the row and validate its inputs.
+
+        Args:
+            widget: Layout showing the inputs of the row.
+            name: Input of the exercise name.
+            sets: Input of the number of sets.
+            reps: Input of the number of reps.
+            weight: Input of the weight, in kg.
+        """
+        self.widget = widget
+        self.name = name
+        self.sets = sets
+        self.reps = reps
+        self.weight = weight
+        self.exercise: Exercise | None = None
+        self.invalid: frozenset[str] = frozenset()
+        self.on_edit: Callable[[ExerciseRow, str, str], None] | None = None
+        for field in self.inputs:
+            field.bind(text=self._on_text)
+        self.validate()
+
+    @property
+    def inputs(self) -> tuple:
+        """Return the name, sets, reps and weight inputs of the row."""
+        return self.name, self.sets, self.reps, self.weight
+
+    def validate(self) -> None:
+        """Validate the inputs, caching the exercise of a valid row and tinting invalid inputs.
+
+        Sets and reps are required and the weight is optional. A row without a name has no exercise,
+        and is only invalid if its numbers are.
+        """
+        sets = _parse_number(self.sets.text, int)
+        reps = _parse_number(self.reps.text, int)
+        weight = _parse_number(self.weight.text, float) if self.weight.text else None
+        invalid = {field for field, value in (('sets', sets), ('reps', reps)) if value is None}
+        if self.weight.text and weight is None:
+            invalid.add('weight')
+
+        self.exercise = None
+        if sets is not None and reps is not None and not invalid and self.name.text:
+            try:
+                self.exercise = Exercise(name=self.name.text, sets=sets, reps=reps, weight=weight)
+            except ValidationError as e:
+                invalid.update(str(error['loc'][0]) for error in e.errors() if error['loc'])
+
+        if invalid != self.invalid or invalid:
+            self.invalid = frozenset(invalid)
+            self._show_invalid()
+
+    def fill(self, exercise: dict) -> None:
+        """Fill the inputs with an exercise record."""
+        self.name.text = exercise['name']
+        self.sets.text = str(exercise['sets'])
+        self.reps.text = str(exercise['reps'])
+        self.weight.text = f'{exercise["weight"]:g}' if exercise.get('weight') is not None else ''
+
+    def set_texts(self, texts: dict[str, str]) -> None:
+        """Set the texts of the inputs, by field name."""
+        for name, field in zip(self.FIELDS, self.inputs, strict=True):
+            field.text = texts.get(name, '')
+
+    def show_hints(self, hints: tuple[str, str, str] = ROW_HINTS) -> None:
+        """Show hints in the sets, reps and weight inputs, the default hints if none are given."""
+        for field, hint in zip((self.sets, self.reps, self.weight), hints, strict=True):
+            field.hint_text = hint
+
+    def reset(self) -> None:
+        """Clear the inputs and restore the default hints before the row is reused."""
+        for field in self.inputs:
+            field.focus = False
+            field.text = ''
+        self.show_hints()
+
+    def _on_text(self, instance, value):
+        """Validate the row when one of its inputs is edited, and report the edit to `on_edit`."""
+        self.validate()
+        if self.on_edit is not None:
+            name = next(name for name, field in zip(self.FIELDS, self.inputs, strict=True) if field is instance)
+            self.on_edit(self, name, value)
+
+    def _show_invalid(self) -> None:
+        """Tint the invalid inputs, unless every input of the row is empty."""
+        blank = not any(field.text for field in self.inputs)
+        for name, field in zip(self.FIELDS, self.inputs, strict=True):
+            color = INVALID_COLOR if name in self.invalid and not blank else VALID_COLOR
+            if tuple(field.background_color) != color:
+                field.background_color = color
+
+
+def _parse_number(text: str, parse: Callable[[str], N]) -> N | None:
+    """Parse the text of a number input, None if it is not a number."""
+    try:
+        return parse(text)
+    except ValueError:
+        return None
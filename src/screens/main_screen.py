@@ -2,7 +2,7 @@ from kivy.lang.builder import Builder
 from kivy.logger import Logger
 from kivy.uix.screenmanager import Screen
 
-from ..storage.storage import ProfileStorage
+from ..storage.backends import get_storages
 
 Builder.load_file('screens/screens.kv')
 
@@ -17,7 +17,7 @@ class MainScreen(Screen):
         """Instantiate main screen and load profile data."""
         super().__init__(**kwargs)
         Logger.info('Starting main screen')
-        self.storage = ProfileStorage()
+        self.storage = get_storages().profile
 
         # Load profile data
         profile_data = self.storage.load_profile()
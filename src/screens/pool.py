@@ -0,0 +1,82 @@
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+T = TypeVar('T')
+
+
+class WidgetPool(Generic[T]):
+    """Pool of widgets recycled instead of being rebuilt.
+
+    Widgets are built by the factory when the pool is empty, and reset when they are released, so an
+    acquired widget always looks freshly built.
+    """
+
+    def __init__(self, factory: Callable[[], T], reset: Callable[[T], None] | None = None, max_size: int = 64):
+        """Initialize the pool.
+
+        Args:
+            factory: Function building a new widget.
+            reset: Function restoring the initial state of a released widget.
+            max_size: Maximum number of free widgets kept, released widgets beyond it are dropped.
+        """
+        self.factory = factory
+        self.reset = reset
+        self.max_size = max_size
+        self._free: list[T] = []
+        self._warming = None
+
+    def __len__(self) -> int:
+        """Return the number of free widgets."""
+        return len(self._free)
+
+    def acquire(self) -> T:
+        """Return a free widget, building one if the pool is empty."""
+        if self._free:
+            return self._free.pop()
+        return self.factory()
+
+    def release(self, widget: T) -> None:
+        """Reset a widget that is no longer shown and keep it for reuse.
+
+        Args:
+            widget: Widget removed from its parent.
+        """
+        if self.reset is not None:
+            self.reset(widget)
+        if len(self._free) < self.max_size:
+            self._free.append(widget)
+
+    def prewarm(self, count: int) -> None:
+        """Build widgets until the pool has the given number of free widgets.
+
+        Args:
+            count: Number of free widgets to reach.
+        """
+        for _ in range(min(count, self.max_size) - len(self._free)):
+            self._free.append(self.factory())
+
+    def prewarm_idle(self, count: int, per_frame: int = 2) -> None:
+        """Build widgets a few per frame until the pool has the given number of free widgets.
+
+        Building in the frames after the screen is shown keeps startup fast and leaves widgets ready
+        before the user needs them.
+
+        Args:
+            count: Number of free widgets to reach.
+            per_frame: Number of widgets built per frame.
+        """
+        if self._warming is not None:
+            self._warming.cancel()
+
+        def build(dt):  # pylint: disable=unused-argument
+            self.prewarm(min(count, len(self._free) + per_frame))
+            if len(self._free) >= min(count, self.max_size):
+                Logger.debug('Widget pool warmed with %d widgets', len(self._free))
+                self._warming = None
+                return False
+            return True
+
+        self._warming = Clock.schedule_interval(build, 0)
@@ -5,7 +5,7 @@ from kivy.uix.popup import Popup
 from kivy.uix.screenmanager import Screen
 
 from ..models.profile import Profile
-from ..storage.storage import ProfileStorage
+from ..storage.backends import get_storages
 
 Builder.load_file('screens/screens.kv')
 
@@ -22,7 +22,7 @@ class ProfileScreen(Screen):
         """Instantiate profile screen."""
         super().__init__(**kwargs)
         Logger.info('Starting profile screen')
-        self.storage = ProfileStorage()
+        self.storage = get_storages().profile
 
     def save_profile(self, instance):  # pylint: disable=unused-argument
         """Save new profile.
@@ -4,7 +4,7 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.screenmanager import Screen
 
-from ..storage.storage import WorkoutStorage
+from ..storage.backends import get_storages
 
 Builder.load_file('screens/screens.kv')
 
@@ -20,7 +20,7 @@ class WorkoutListScreen(Screen):
         """Initialize workout list screen and load workout storage."""
         super().__init__(**kwargs)
         Logger.info('Starting workout list screen')
-        self.storage = WorkoutStorage()
+        self.storage = get_storages().workouts
         self.refresh_workouts()
 
     def create_workout_item(self, workout: dict):
@@ -1,22 +1,60 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+from kivy.clock import Clock
 from kivy.lang.builder import Builder
 from kivy.logger import Logger
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
+from kivy.uix.dropdown import DropDown
 from kivy.uix.popup import Popup
 from kivy.uix.screenmanager import Screen
 from kivy.uix.textinput import TextInput
 
-from ..models.exercise import Exercise, Workout
-from ..storage.storage import ExerciseStorage, WorkoutStorage
+from ..models.exercise import Workout
+from ..storage.backends import ExerciseBackend, get_storages
+from ..storage.exercise_index import ExerciseIndex
+from ..storage.session_index import SessionIndex
+from .exercise_row import ROW_HINTS, ExerciseRow
+from .pool import WidgetPool
 
 Builder.load_file('screens/screens.kv')
 
+# Suggestions shown in the dropdown of an exercise input
+MAX_SUGGESTIONS = 5
+
+# Pause in typing, in seconds, before suggestions are looked up
+SUGGESTION_DELAY = 0.15
+
+# Suggestion lookups and saves run on a single thread, so a large catalog or a slow write never blocks the UI
+_LOOKUPS = ThreadPoolExecutor(max_workers=1, thread_name_prefix='suggestions')
+
+# Rows built ahead in idle frames, enough for a long session
+PREWARM_ROWS = 30
+
+# Seconds a save waits for the workout to be persisted before reporting a failure
+SAVE_TIMEOUT = 10.0
+
 
 class ExerciseInput(TextInput):
-    """Custom exercise input with dropdown suggestions."""
+    """Custom exercise input with dropdown suggestions.
+
+    The input owns a single dropdown with a fixed set of suggestion buttons, created when suggestions
+    are first shown and updated in place. Suggestions are looked up off the UI thread once typing
+    pauses. Picking a suggestion dispatches `on_select` with the exercise, and editing it afterwards
+    dispatches `on_select` with an empty name.
+    """
+
+    __events__ = ('on_select',)
 
-    def __init__(self, exercise_storage: ExerciseStorage, **kwargs):
-        """Initialize exercise input."""
+    def __init__(self, exercise_storage: ExerciseBackend, exercise_index: ExerciseIndex | None = None, **kwargs):
+        """Initialize exercise input.
+
+        Args:
+            exercise_storage: Storage of the exercise names.
+            exercise_index: Index ranking the suggestions, shared by the inputs of a screen.
+            **kwargs: Keyword arguments of the text input.
+        """
         super().__init__(
             multiline=False,
             hint_text='Exercise Name',
@@ -25,67 +63,126 @@ class ExerciseInput(TextInput):
             **kwargs,
         )
         self.exercise_storage = exercise_storage
+        self.exercise_index = exercise_index or ExerciseIndex(exercise_storage)
         self.dropdown = None
+        self.suggestion_buttons: list[Button] = []
+        self._shown = 0
+        self._dropdown_open = False
+        self._pending = None
+        self._generation = 0
+        self._selected = None
         # Only bind to text changes, not focus
         self.bind(text=self._on_text)  # pylint: disable=no-member
 
     def _create_dropdown(self):
-        """Create new dropdown instance."""
-        from kivy.uix.dropdown import DropDown
-
-        if self.dropdown:
-            self.dropdown.dismiss()
+        """Create the dropdown and its suggestion buttons."""
         self.dropdown = DropDown()
+        self.dropdown.bind(on_dismiss=self._on_dismiss)  # pylint: disable=no-member
+        self.suggestion_buttons = []
+        for _ in range(MAX_SUGGESTIONS):
+            btn = Button(size_hint_y=None, height=30)
+            btn.bind(on_release=self._on_suggestion)  # pylint: disable=no-member
+            self.suggestion_buttons.append(btn)
+        self._shown = 0
 
     def _update_dropdown(self, text: str = ''):
-        """Update dropdown suggestions."""
-        # Don't create dropdown for empty text
-        if not text:
-            if self.dropdown:
-                self.dropdown.dismiss()
-                self.dropdown = None
-            return
+        """Update dropdown suggestions.
 
-        self._create_dropdown()
-        exercises = self.exercise_storage.load_exercises() or []
-
-        # If no exercises, don't show dropdown
-        if not exercises:
+        The lookup is debounced: it starts once typing pauses for `SUGGESTION_DELAY` seconds, and a
+        new keystroke cancels a pending lookup and discards the results of a running one.
+        """
+        self._cancel_lookup()
+        if not text:
+            self._show_suggestions([])
             return
+        self._pending = Clock.schedule_once(partial(self._lookup, text, self._generation), SUGGESTION_DELAY)
+
+    def _cancel_lookup(self):
+        """Cancel the pending lookup and discard the results of a running one."""
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        self._generation += 1
+
+    def _lookup(self, text: str, generation: int, dt):  # pylint: disable=unused-argument
+        """Find suggestions off the UI thread and show them from the UI thread."""
+        self._pending = None
+        future = _LOOKUPS.submit(self._find_suggestions, text)
+        future.add_done_callback(
+            lambda future: Clock.schedule_once(partial(self._apply_suggestions, generation, future))
+        )
 
-        filtered = [ex for ex in exercises if text.lower() in ex.lower()]
-
-        # If no matches, don't show dropdown
-        if not filtered:
+    def _apply_suggestions(self, generation: int, future: Future, dt):  # pylint: disable=unused-argument
+        """Show the suggestions of a finished lookup, unless the text changed since it started."""
+        if generation != self._generation:
             return
-
-        # Create button for each filtered exercise
-        for exercise in filtered[:5]:  # Limit to 5 suggestions
-            btn = Button(
-                text=exercise,
-                size_hint_y=None,
-                height=30,
-            )
-            # Fix the lambda to capture the current value
-            btn.bind(on_release=lambda btn, ex=exercise: self._select_exercise(ex))  # pylint: disable=no-member
-            self.dropdown.add_widget(btn)  # type: ignore
+        try:
+            suggestions = future.result()
+        except Exception as e:  # pylint: disable=broad-except
+            Logger.error('Exercise suggestions failed: %s', e)
+            suggestions = []
+        self._show_suggestions(suggestions)
+
+    def _find_suggestions(self, text: str) -> list[str]:
+        """Return the best ranked saved exercises matching the text. Runs on a lookup thread."""
+        return self.exercise_index.suggest(text, MAX_SUGGESTIONS)
+
+    def _show_suggestions(self, suggestions: list[str]):
+        """Show suggestions in the recycled buttons, opening or closing the dropdown only when needed."""
+        if self.dropdown is None:
+            if not suggestions:
+                return
+            self._create_dropdown()
+
+        for btn, suggestion in zip(self.suggestion_buttons, suggestions, strict=False):
+            if btn.text != suggestion:
+                btn.text = suggestion
+        # Attach or detach the buttons whose visibility changed
+        while self._shown < len(suggestions):
+            self.dropdown.add_widget(self.suggestion_buttons[self._shown])  # type: ignore
+            self._shown += 1
+        while self._shown > len(suggestions):
+            self._shown -= 1
+            self.dropdown.remove_widget(self.suggestion_buttons[self._shown])  # type: ignore
+
+        visible = bool(suggestions) and self.focus
+        if visible and not self._dropdown_open:
+            self._dropdown_open = True
+            self.dropdown.open(self)  # type: ignore
+        elif not visible and self._dropdown_open:
+            self._dropdown_open = False
+            self.dropdown.dismiss()  # type: ignore
 
     def _on_text(self, instance, value):  # pylint: disable=unused-argument
         """Handle text change event."""
-        # Only update dropdown when we have text
+        if self._selected is not None and value != self._selected:
+            self._selected = None
+            self.dispatch('on_select', '')
+        # Only show suggestions when we have text
         if value and self.focus:
             self._update_dropdown(value)
-            if self.dropdown and self.dropdown.children:
-                self.dropdown.open(self)
-        elif self.dropdown:
-            self.dropdown.dismiss()
+        else:
+            self._cancel_lookup()
+            self._show_suggestions([])
+
+    def _on_suggestion(self, btn):
+        """Handle a press on a suggestion button."""
+        self._select_exercise(btn.text)
+
+    def _on_dismiss(self, dropdown):  # pylint: disable=unused-argument
+        """Keep track of a dropdown dismissed by a touch outside of it."""
+        self._dropdown_open = False
 
     def _select_exercise(self, exercise):
         """Select exercise from dropdown."""
         self.text = exercise
-        if self.dropdown:
-            self.dropdown.dismiss()
-            self.dropdown = None
+        self._cancel_lookup()
+        self._show_suggestions([])
+        self._selected = exercise
+        self.dispatch('on_select', exercise)
+
+    def on_select(self, exercise):
+        """Handle the selection of an exercise, an empty name once the selected text is edited."""
 
 
 class WorkoutPlanningScreen(Screen):
@@ -98,43 +195,88 @@ class WorkoutPlanningScreen(Screen):
     def __init__(self, **kwargs):
         """Initialize workout planning screen.
 
-        During initialization, the screen creates an instance of the exercise and workout storage
-        and initializes the list of exercise rows.
+        During initialization, the screen gets the exercise and workout storages of the app, the
+        index ranking exercise suggestions and the index of the previous sessions, both loaded off the
+        UI thread, and restores the unsaved session recorded by the session journal, if any.
         """
         super().__init__(**kwargs)
         Logger.info('Starting workout planning screen')
-        self.exercise_storage = ExerciseStorage()
-        self.workout_storage = WorkoutStorage()
+        storages = get_storages()
+        self.exercise_storage = storages.exercises
+        self.workout_storage = storages.workouts
+        self.journal = storages.journal
+        self.exercise_index = ExerciseIndex(self.exercise_storage, self.workout_storage)
+        self.session_index = SessionIndex(self.workout_storage)
+        _LOOKUPS.submit(self.exercise_index.suggest, '', 1)
+        _LOOKUPS.submit(self.session_index.workout_names)
+        self.session_dropdown = None
+        # New exercise names the user was warned about and may save anyway
+        self._flagged_names = set()
+        # Misspelling lookup or write of the workout being saved, if any
+        self._saving: Future | None = None
         self.exercise_rows = []
+        self.row_pool = WidgetPool(self._build_row, reset=self._reset_row)
+
+        self._restore_session()
+        self.ids.workout_name.bind(text=self._on_name_text)  # pylint: disable=no-member
+        self.row_pool.prewarm_idle(PREWARM_ROWS)
+
+    def _restore_session(self):
+        """Restore the workout name and rows recorded by the session journal, or add an empty row."""
+        session = self.journal.restore()
+        with self.journal.paused():
+            self.ids.workout_name.text = session['name']
+            for texts in session['rows']:
+                self.add_exercise_input(None)
+                self.exercise_rows[-1].set_texts(texts)
+        if self.exercise_rows:
+            Logger.info('Restored workout session with %d exercises', len(self.exercise_rows))
+        else:
+            self.add_exercise_input(None)
+
+    def _on_name_text(self, instance, value):  # pylint: disable=unused-argument
+        """Record an edit of the workout name in the session journal."""
+        self.journal.set_name(value)
 
-        self.add_exercise_input(None)
+    def _on_row_edit(self, row: ExerciseRow, field: str, text: str):
+        """Record an edit of a shown row in the session journal."""
+        if row in self.exercise_rows:
+            self.journal.edit_row(self.exercise_rows.index(row), field, text)
 
     def add_exercise_input(self, instance):  # pylint: disable=unused-argument
         """Add exercise input fields.
 
-        Create a new row with input fields for exercise name, sets, reps, and weight.
+        Add a row with input fields for exercise name, sets, reps, and weight, reusing a pooled row.
         """
         Logger.info('Adding exercise')
+        row = self.row_pool.acquire()
+        self.ids.exercise_layout.add_widget(row.widget)
+        self.exercise_rows.append(row)
+        self.journal.add_row()
+        Logger.info(self.exercise_rows)
+
+    def _build_row(self) -> ExerciseRow:
+        """Build an exercise row with its input fields and remove button."""
         exercise_box = BoxLayout(orientation='horizontal', size_hint_y=None, height=40, spacing=5)
         inputs = {
-            'name': ExerciseInput(exercise_storage=self.exercise_storage),
+            'name': ExerciseInput(exercise_storage=self.exercise_storage, exercise_index=self.exercise_index),
             'sets': TextInput(
                 multiline=False,
-                hint_text='Sets',
+                hint_text=ROW_HINTS[0],
                 size_hint_x=0.15,
                 input_filter='int',
                 write_tab=False,
             ),
             'reps': TextInput(
                 multiline=False,
-                hint_text='Reps',
+                hint_text=ROW_HINTS[1],
                 size_hint_x=0.15,
                 input_filter='int',
                 write_tab=False,
             ),
             'weight': TextInput(
                 multiline=False,
-                hint_text='Weight (kg)',
+                hint_text=ROW_HINTS[2],
                 size_hint_x=0.15,
                 input_filter='float',
                 write_tab=False,
@@ -143,6 +285,9 @@ class WorkoutPlanningScreen(Screen):
 
         for _, input_field in inputs.items():
             exercise_box.add_widget(input_field)
+        row = ExerciseRow(exercise_box, **inputs)
+        row.on_edit = self._on_row_edit
+        inputs['name'].bind(on_select=partial(self._show_last_performance, row))  # pylint: disable=no-member
 
         # Remove button
         remove_btn = Button(
@@ -150,14 +295,32 @@ class WorkoutPlanningScreen(Screen):
             size_hint_x=0.1,
             background_color=(1, 0, 0, 1),
         )
-        remove_btn.bind(on_press=lambda x: self.remove_row(exercise_box))  # pylint: disable=no-member
+        remove_btn.bind(on_press=lambda x: self.remove_row(row))  # pylint: disable=no-member
         exercise_box.add_widget(remove_btn)
+        return row
 
-        self.ids.exercise_layout.add_widget(exercise_box)
-        self.exercise_rows.append(exercise_box)
-        Logger.info(self.exercise_rows)
+    def _show_last_performance(self, row: ExerciseRow, instance, exercise: str):  # pylint: disable=unused-argument
+        """Show the last performance of the exercise picked in a row as hints of its inputs.
 
-    def remove_row(self, row: BoxLayout):
+        The sets, reps and weight inputs show their default hints again once the exercise is edited.
+        """
+        performance = self.session_index.last_performance(exercise) if exercise else None
+        hints = ROW_HINTS
+        if performance is not None:
+            weight = performance.get('weight')
+            hints = (
+                f'Last: {performance["sets"]}',
+                f'Last: {performance["reps"]}',
+                f'Last: {weight:g} kg' if weight is not None else ROW_HINTS[2],
+            )
+        row.show_hints(hints)
+
+    @staticmethod
+    def _reset_row(row: ExerciseRow):
+        """Clear the input fields of a row before it is reused."""
+        row.reset()
+
+    def remove_row(self, row: ExerciseRow):
         """Remove exercise row.
 
         Remove the given exercise row from the screen.
@@ -167,8 +330,10 @@ class WorkoutPlanningScreen(Screen):
         """
         if len(self.exercise_rows) > 1:
             Logger.info('Removing exercise row')
+            self.journal.remove_row(self.exercise_rows.index(row))
             self.exercise_rows.remove(row)
-            self.ids.exercise_layout.remove_widget(row)
+            self.ids.exercise_layout.remove_widget(row.widget)
+            self.row_pool.release(row)
             Logger.info(self.exercise_rows)
         else:
             Logger.warning('Cannot remove last remaining exercise row')
@@ -176,8 +341,14 @@ class WorkoutPlanningScreen(Screen):
     def save_workout(self, instance):  # pylint: disable=unused-argument
         """Save workout.
 
-        Saves the workout with the given name and exercises to the database.
+        Saves the workout with the given name and exercises to the database, with a single save, and
+        discards the session journal. The rows validate their inputs as they are edited, so saving only
+        collects their exercises. New exercise names that look like misspellings of saved ones are
+        flagged first, and saved if the user saves again. Misspellings are looked up and the workout is
+        written off the UI thread, and saves are ignored until the workout is persisted.
         """
+        if self._saving is not None:
+            return
         Logger.info('Saving workout...')
 
         # Validate workout name
@@ -185,36 +356,9 @@ class WorkoutPlanningScreen(Screen):
             self._show_error_popup('Workout name is required')
             return
 
-        # Validate exercises
-        exercises = []
-        invalid_rows = []
-
-        for idx, row in enumerate(self.exercise_rows):
-            try:
-                inp_row = {
-                    'name': row.children[4].text,
-                    'sets': int(row.children[3].text),
-                    'reps': int(row.children[2].text),
-                    'weight': float(row.children[1].text) if row.children[1].text else None,
-                }
-
-                # Skip rows with empty name
-                if not inp_row['name']:
-                    continue
-
-                Logger.info('Exercise %d: %s', idx, inp_row)
-
-                # Create exercise with validated input
-                exercise = Exercise(**inp_row)
-                exercises.append(exercise)
-                Logger.debug('Successfully processed row %s', idx + 1)
-
-                # Add exercise to database
-                self.exercise_storage.save_exercise(exercise_name=exercise.name)
-
-            except (ValueError, IndexError) as e:
-                Logger.error('Invalid input for row %s: %s', idx + 1, e)
-                invalid_rows.append(idx + 1)
+        # Collect the exercises validated by the rows
+        invalid_rows = [idx + 1 for idx, row in enumerate(self.exercise_rows) if row.invalid]
+        exercises = [row.exercise for row in self.exercise_rows if row.exercise is not None]
 
         if invalid_rows:
             self._show_error_popup(f'Invalid input in rows: {", ".join(map(str, invalid_rows))}')
@@ -224,14 +368,74 @@ class WorkoutPlanningScreen(Screen):
             self._show_error_popup('No valid exercises added')
             return
 
-        # Create workout model
+        # Flag new exercise names that look like misspellings of saved ones, once
+        workout_name = self.ids.workout_name.text
+        names = [exercise.name for exercise in exercises if exercise.name.lower() not in self._flagged_names]
+        if not names:
+            self._save(workout_name, exercises)
+            return
+        future = self._saving = _LOOKUPS.submit(self._find_misspellings, names)
+        future.add_done_callback(
+            lambda future: Clock.schedule_once(partial(self._on_misspellings, workout_name, exercises, future))
+        )
+
+    def _find_misspellings(self, names: list[str]) -> dict[str, str]:
+        """Return the closest saved name of the new exercise names looking misspelled. Runs on a lookup thread."""
+        misspelled = {}
+        for name in names:
+            similar = self.exercise_index.near_duplicates(name)
+            if similar:
+                misspelled[name.lower()] = similar[0]
+        return misspelled
+
+    def _on_misspellings(self, workout_name: str, exercises: list, future: Future, dt):  # pylint: disable=unused-argument
+        """Flag the misspelled exercise names found by a lookup, or save the workout if there are none."""
+        self._saving = None
+        try:
+            misspelled = future.result()
+        except Exception as e:  # pylint: disable=broad-except
+            Logger.error('Misspelling lookup failed: %s', e)
+            misspelled = {}
+        if misspelled:
+            self._flagged_names.update(misspelled)
+            suggestions = ', '.join(f'{name} (did you mean {similar}?)' for name, similar in misspelled.items())
+            self._show_error_popup(f'Possible misspellings: {suggestions}. Save again to keep them.')
+            return
+        self._save(workout_name, exercises)
+
+    def _save(self, workout_name: str, exercises: list):
+        """Write a workout with the given name and exercises off the UI thread.
+
+        The inputs and the session journal are kept until the workout is persisted, see `_on_saved`.
+        """
         workout = Workout(
-            name=self.ids.workout_name.text,
+            name=workout_name,
             exercises=exercises,
         )
-
-        # Save workout
+        names = [exercise.name for exercise in exercises]
+        future = self._saving = _LOOKUPS.submit(self._write_workout, workout, names)
+        future.add_done_callback(lambda future: Clock.schedule_once(partial(self._on_saved, workout, future)))
+
+    def _write_workout(self, workout: Workout, names: list[str]):
+        """Save a workout and its exercise names and wait until it is persisted. Runs on a lookup thread."""
+        for name in names:
+            self.exercise_storage.save_exercise(exercise_name=name)
         self.workout_storage.save_workout(workout)
+        self.workout_storage.flush(SAVE_TIMEOUT)
+
+    def _on_saved(self, workout: Workout, future: Future, dt):  # pylint: disable=unused-argument
+        """Rank a persisted workout, discard the session journal and return to the main screen."""
+        self._saving = None
+        try:
+            future.result()
+        except Exception as e:  # pylint: disable=broad-except
+            # Saving again is safe, as a workout equal to a saved one is not saved twice
+            Logger.error('Saved workout was not persisted: %s', e)
+            self._show_error_popup('Workout could not be written, save again to retry')
+            return
+
+        self.exercise_index.record_workout(workout)
+        self.session_index.record_workout(workout)
 
         # Clear inputs
         self.clear_inputs()
@@ -239,6 +443,53 @@ class WorkoutPlanningScreen(Screen):
         # Return to main screen
         self.manager.current = 'main'
 
+    def show_previous_workouts(self, instance):
+        """Show previous workouts.
+
+        Open a dropdown of the previous workouts containing the workout name, most recently performed
+        first. Picking one fills the rows with its last session.
+
+        Args:
+            instance: Widget the dropdown opens from.
+        """
+        names = self.session_index.workout_names(self.ids.workout_name.text, MAX_SUGGESTIONS)
+        if not names:
+            self._show_error_popup('No previous workouts found')
+            return
+        if self.session_dropdown is None:
+            self.session_dropdown = DropDown()
+        self.session_dropdown.clear_widgets()
+        for name in names:
+            btn = Button(text=name, size_hint_y=None, height=30)
+            btn.bind(on_release=self._on_previous_workout)  # pylint: disable=no-member
+            self.session_dropdown.add_widget(btn)
+        self.session_dropdown.open(instance)
+
+    def _on_previous_workout(self, btn):
+        """Handle a press on a previous workout."""
+        self.session_dropdown.dismiss()  # type: ignore
+        self.repeat_session(btn.text)
+
+    def repeat_session(self, name: str):
+        """Repeat a previous workout.
+
+        Fill the rows with the exercises of the last session of the workout, from the session index.
+        With the progress toggle down, the exercises are progressed following their recent performances.
+
+        Args:
+            name: Name of the workout.
+        """
+        exercises = self.session_index.next_session(name, progress=self.ids.progress.state == 'down')
+        if not exercises:
+            self._show_error_popup(f'No previous session of {name}')
+            return
+        Logger.info('Repeating workout %s', name)
+        self.clear_inputs()
+        self.ids.workout_name.text = name
+        for exercise in exercises:
+            self.add_exercise_input(None)
+            self.exercise_rows[-1].fill(exercise)
+
     def _show_error_popup(self, message):
         """Show error popup with the given message."""
         # Create content and add to the popup
@@ -261,8 +512,12 @@ class WorkoutPlanningScreen(Screen):
         popup.open()
 
     def clear_inputs(self):
-        """Clear all inputs after saving."""
+        """Clear all inputs after saving, and discard the session journal."""
         Logger.debug('Clearing all inputs')
-        self.ids.workout_name.text = ''
-        self.ids.exercise_layout.clear_widgets()
-        self.exercise_rows.clear()
+        with self.journal.paused():
+            self.ids.workout_name.text = ''
+            self.ids.exercise_layout.clear_widgets()
+            for row in self.exercise_rows:
+                self.row_pool.release(row)
+            self.exercise_rows.clear()
+        self.journal.discard()
@@ -0,0 +1,245 @@
+"""Headless workout server for many users.
+
+The server validates requests with the app models and stores every user's data in a directory of its
+own, spread over shard directories. Each shard has a write-behind queue, so saves of concurrent users
+of a shard are batched into group commits, and the storages of recently active users are kept open
+in a bounded pool. Storage calls run on a thread pool, so reads of different users run concurrently.
+
+The protocol runs over a TCP connection with one json message per line, see `src.storage.sync`.
+Requests carry an `"op"`, the `"user"` and the arguments of the op, responses carry `"ok"` and
+either the `"result"` or an `"error"`.
+
+Usage:
+    python -m src.server --directory DIR --port 8080
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pydantic import ValidationError
+
+from .models.exercise import Workout
+from .models.profile import Profile
+from .storage.backends import DEFAULT_BACKEND, Storages, backend_names, open_storages
+from .storage.sync import MAX_MESSAGE_SIZE, send_message
+from .storage.sync_server import USER_PATTERN
+from .storage.write_behind import WriteBehindQueue
+
+
+class ShardedStore:
+    """Per-user storages spread over shard directories, with a pool of open storages.
+
+    The data of a user is kept in `<directory>/shard-<n>/<user>`, where the shard is derived from a hash
+    of the user name. All storages of a shard share a write-behind queue.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        shards: int = 16,
+        max_open: int = 1024,
+        durable: bool = True,
+        backend: str = DEFAULT_BACKEND,
+    ):
+        """Initialize the store.
+
+        Args:
+            directory: Directory with the shard directories.
+            shards: Number of shards.
+            max_open: Maximum number of users whose storages are kept open.
+            durable: Wait until saves are persisted before answering.
+            backend: Storage backend of the users, see `storage.backends`.
+        """
+        self.directory = directory
+        self.backend = backend
+        self.shards = shards
+        self.max_open = max_open
+        self.durable = durable
+        self._writers = [WriteBehindQueue(max_delay=0.05) for _ in range(shards)]
+        self._open: OrderedDict[str, Storages] = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def shard(self, user: str) -> int:
+        """Return the shard of a user."""
+        return int.from_bytes(hashlib.blake2b(user.encode('utf-8'), digest_size=4).digest(), 'big') % self.shards
+
+    async def get(self, user: str) -> Storages:
+        """Return the storages of a user, opening them if needed.
+
+        Raises:
+            ValueError: If the user name is not a safe file name.
+        """
+        if not USER_PATTERN.fullmatch(user):
+            raise ValueError(f'Invalid user {user!r}')
+        async with self._lock:
+            storages = self._open.get(user)
+            if storages is not None:
+                self._open.move_to_end(user)
+                return storages
+
+            shard = self.shard(user)
+            directory = os.path.join(self.directory, f'shard-{shard:02d}', user)
+            storages = await asyncio.to_thread(
+                open_storages, self.backend, directory, writer=self._writers[shard], durable=self.durable
+            )
+            self._open[user] = storages
+            # Closed storages keep no state of their own, their pending writes stay in the shard queue
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+            return storages
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Persist the pending writes of all shards."""
+        for writer in self._writers:
+            writer.flush(timeout)
+
+
+def _save_workout(storages: Storages, request: dict) -> str:
+    """Save a workout and its exercise names."""
+    workout = Workout(**request['workout'])
+    workout_id = storages.workouts.save_workout(workout)
+    storages.exercises.save_exercises([exercise.name for exercise in workout.exercises])
+    return workout_id
+
+
+def _update_workout(storages: Storages, request: dict) -> None:
+    """Replace a saved workout."""
+    storages.workouts.update_workout(request['id'], Workout(**request['workout']))
+
+
+def _load_profile(storages: Storages, request: dict) -> dict | None:
+    """Load the profile as json data."""
+    profile = storages.profile.load_profile()
+    return profile.model_dump(mode='json') if profile is not None else None
+
+
+# Handlers of the ops, called on the thread pool with the storages of the user and the request
+OPS: dict[str, Callable[[Storages, dict], Any]] = {
+    'save_workout': _save_workout,
+    'update_workout': _update_workout,
+    'delete_workout': lambda storages, request: storages.workouts.delete_workout(request['id']),
+    'load_workouts': lambda storages, request: storages.workouts.load_workouts() or [],
+    'get_workout': lambda storages, request: storages.workouts.get_workout(request['id']),
+    'exercise_history': lambda storages, request: storages.workouts.exercise_history(request['exercise']),
+    'load_exercises': lambda storages, request: storages.exercises.load_exercises() or [],
+    'save_profile': lambda storages, request: storages.profile.save_profile(Profile(**request['profile'])),
+    'load_profile': _load_profile,
+}
+
+
+class WorkoutServer:
+    """Asyncio server storing the workouts, exercises and profiles of many users."""
+
+    def __init__(self, store: ShardedStore, pool_size: int = 32):
+        """Initialize the server.
+
+        Args:
+            store: Store with the data of the users.
+            pool_size: Number of threads running storage calls.
+        """
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='storage')
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> tuple[str, int]:
+        """Start listening for clients.
+
+        Args:
+            host: Host to listen on.
+            port: Port to listen on, a free port if 0.
+
+        Returns:
+            Host and port the server listens on.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_MESSAGE_SIZE)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        """Stop the server and persist all pending writes."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.store.flush)
+        self._executor.shutdown()
+
+    async def serve_forever(self) -> None:
+        """Serve clients until cancelled."""
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def respond(self, request: dict) -> dict:
+        """Answer a single request."""
+        try:
+            handler = OPS[request['op']]
+            storages = await self.store.get(request['user'])
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, handler, storages, request)
+        except KeyError as err:
+            return {'ok': False, 'error': f'Not found: {err}'}
+        except (ValidationError, ValueError, TypeError) as err:
+            return {'ok': False, 'error': str(err)}
+        except OSError as err:
+            # Includes the TimeoutError of a durable write that was not persisted in time
+            return {'ok': False, 'error': f'Storage error: {err}'}
+        return {'ok': True, 'result': result}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of a client until it disconnects.
+
+        Requests of a connection are answered in order, clients open several connections to send
+        requests concurrently. A malformed request is answered with an error, like any other failed
+        request, and the connection stays open.
+        """
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as err:
+                    response = {'ok': False, 'error': f'Malformed request: {err}'}
+                else:
+                    response = await self.respond(request)
+                await send_message(writer, response)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+
+def main() -> None:
+    """Run the workout server from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', default='server-data', help='Directory where the user data is stored.')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to listen on.')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on.')
+    parser.add_argument('--shards', type=int, default=16, help='Number of shards.')
+    parser.add_argument('--max-open', type=int, default=1024, help='Number of users whose storages are kept open.')
+    parser.add_argument(
+        '--backend', default=DEFAULT_BACKEND, choices=backend_names(), help='Storage backend of the users.'
+    )
+    parser.add_argument('--pool-size', type=int, default=32, help='Number of threads running storage calls.')
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        store = ShardedStore(args.directory, shards=args.shards, max_open=args.max_open, backend=args.backend)
+        server = WorkoutServer(store, args.pool_size)
+        host, port = await server.start(args.host, args.port)
+        print(f'serving on {host}:{port}', flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from typing import IO, Any
+
+
+def fsync_directory(path: str) -> None:
+    """Flush a directory entry to disk so that a rename in it survives a crash.
+
+    Args:
+        path: Path of the directory.
+    """
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _atomic_file(filename: str, mode: str) -> Iterator[IO[Any]]:
+    """Open a temporary file in the given mode and rename it over the target on success."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(prefix=f'.{os.path.basename(filename)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else 'utf-8') as file_:
+            yield file_
+            file_.flush()
+            os.fsync(file_.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    fsync_directory(directory)
+
+
+def atomic_writer(filename: str) -> AbstractContextManager[IO[str]]:
+    """Open a file for writing without ever leaving it partially written.
+
+    The data is written to a temporary file next to the target, flushed to disk and renamed over the
+    target when the context exits. A crash at any point, or an exception within the context, leaves the
+    previous file contents in place.
+
+    Args:
+        filename: Name of the file to write.
+
+    Returns:
+        Context manager yielding the text file object to write to.
+    """
+    return _atomic_file(filename, 'w')
+
+
+def atomic_binary_writer(filename: str) -> AbstractContextManager[IO[bytes]]:
+    """Open a file for writing bytes without ever leaving it partially written, see `atomic_writer`.
+
+    Args:
+        filename: Name of the file to write.
+
+    Returns:
+        Context manager yielding the binary file object to write to.
+    """
+    return _atomic_file(filename, 'wb')
+
+
+def atomic_write_json(filename: str, data: Any) -> None:
+    """Write data as json to a file without ever leaving it partially written.
+
+    Args:
+        filename: Name of the file to write.
+        data: Json serializable data.
+    """
+    with atomic_writer(filename) as file_:
+        json.dump(data, file_)
+
+
+def append_lines(filename: str, lines: list[str]) -> None:
+    """Append lines to a file and flush them to disk.
+
+    A crash during the append can only leave the last line partially written. Such a torn line is
+    terminated before appending, so that it stays a line of its own that readers can skip.
+
+    Args:
+        filename: Name of the file to append to.
+        lines: Lines to append, without line endings.
+    """
+    data = ''.join(line + '\n' for line in lines).encode('utf-8')
+    with open(filename, 'ab+') as file_:
+        if file_.seek(0, os.SEEK_END) > 0:
+            file_.seek(-1, os.SEEK_END)
+            if file_.read(1) != b'\n':
+                data = b'\n' + data
+        file_.write(data)
+        file_.flush()
+        os.fsync(file_.fileno())
@@ -0,0 +1,246 @@
+"""Storage backends and the registry selecting them by configuration.
+
+A backend stores the profile, exercises and workouts of a user behind the protocols below. The app
+screens, the workout server and the conformance kit (`conformance`) only rely on these protocols, so
+backends can be swapped without touching them. Backends must give the same results for the same
+calls, the shared record helpers in `records` make that easy.
+
+Built-in backends:
+
+- `json`: the json files of `storage`, with a change log and sync support. The default.
+- `jsonl`: workouts in an append-only json lines file, see `jsonl`.
+- `sqlite`: a SQLite database, see `sqlite_storage`.
+- `memory`: in-memory storages for tests, nothing is persisted, see `memory`.
+
+The app uses the backend named by the `XRCS_STORAGE_BACKEND` environment variable, storing its data in
+the `XRCS_DATA_DIR` directory, the working directory by default. Backends persisting their data also
+keep the journal of the workout being planned there, see `session_journal`.
+"""
+
+import os
+import threading
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Protocol, runtime_checkable
+
+from .session_journal import SessionJournal
+from .write_behind import WriteBehindQueue, get_write_queue
+
+if TYPE_CHECKING:
+    from ..models.exercise import Workout
+    from ..models.profile import Profile
+
+BACKEND_VARIABLE = 'XRCS_STORAGE_BACKEND'
+DATA_DIR_VARIABLE = 'XRCS_DATA_DIR'
+DEFAULT_BACKEND = 'json'
+
+
+@runtime_checkable
+class ProfileBackend(Protocol):
+    """Storage of the user profile."""
+
+    def save_profile(self, profile: 'Profile') -> None:
+        """Save the profile, replacing a saved one."""
+
+    def load_profile(self) -> 'Profile | None':
+        """Load the profile, None if no profile was saved."""
+
+    def profile_exists(self) -> bool:
+        """Return whether a profile was saved."""
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Persist pending writes."""
+
+
+@runtime_checkable
+class ExerciseBackend(Protocol):
+    """Storage of the exercise names, lower cased and without repeats, in the order they were saved."""
+
+    def save_exercise(self, exercise_name: str) -> None:
+        """Save an exercise name."""
+
+    def save_exercises(self, exercise_names: list[str]) -> None:
+        """Save several exercise names."""
+
+    def load_exercises(self) -> list | None:
+        """Load the exercise names, None or an empty list if none were saved."""
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Persist pending writes."""
+
+
+@runtime_checkable
+class WorkoutBackend(Protocol):
+    """Storage of workout records, in the order they were saved.
+
+    Records are built with the helpers of `records`: saving a workout equal to a saved one, see
+    `merge.content_hash`, returns the id of the saved one, and an edit keeps the position, id and dates
+    of the workout.
+    """
+
+    def save_workout(self, workout: 'Workout') -> str:
+        """Save a workout and return its id."""
+
+    def save_workouts(self, workouts: list['Workout']) -> list[str]:
+        """Save several workouts and return their ids."""
+
+    def update_workout(self, workout_id: str, workout: 'Workout') -> None:
+        """Replace a saved workout, raising KeyError if it does not exist."""
+
+    def delete_workout(self, workout_id: str) -> None:
+        """Delete a saved workout, raising KeyError if it does not exist."""
+
+    def load_workouts(self) -> list[dict] | None:
+        """Load all workout records, None or an empty list if none were saved."""
+
+    def get_workout(self, workout_id: str) -> dict | None:
+        """Load a single workout record, None if it does not exist."""
+
+    def iter_workouts(self) -> Iterator[dict]:
+        """Iterate over the workout records, in the order of `load_workouts`."""
+
+    def exercise_history(self, exercise_name: str) -> list[dict]:
+        """Return the performances of an exercise, matched ignoring case, in the order of `load_workouts`.
+
+        Performances are built with `records.exercise_performance` from an index of the exercises of the
+        saved workouts, so the cost grows with the performances and not with the saved workouts.
+        """
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Persist pending writes."""
+
+
+@dataclass
+class Storages:
+    """Storages of a single user."""
+
+    profile: ProfileBackend
+    exercises: ExerciseBackend
+    workouts: WorkoutBackend
+    # Journal of the workout being planned, only kept in memory unless the backend gives it a file
+    journal: SessionJournal = field(default_factory=SessionJournal)
+
+
+# Opens the storages in a data directory, with an optional write-behind queue and durability
+BackendFactory = Callable[[str, WriteBehindQueue | None, bool], Storages]
+
+_BACKENDS: dict[str, BackendFactory] = {}
+
+
+def register_backend(name: str) -> Callable[[BackendFactory], BackendFactory]:
+    """Register a backend factory under a name.
+
+    Args:
+        name: Name selecting the backend.
+
+    Returns:
+        Decorator registering a function that takes the data directory, a write-behind queue or None
+        and whether writes must be persisted before returning, and returns the storages. Backends
+        without deferred writes can ignore the queue.
+    """
+
+    def register(factory: BackendFactory) -> BackendFactory:
+        _BACKENDS[name] = factory
+        return factory
+
+    return register
+
+
+def backend_names() -> list[str]:
+    """Return the names of the registered backends."""
+    return sorted(_BACKENDS)
+
+
+def open_storages(
+    backend: str = DEFAULT_BACKEND, directory: str = '.', writer: WriteBehindQueue | None = None, durable: bool = False
+) -> Storages:
+    """Open the storages of a backend.
+
+    Args:
+        backend: Name of a registered backend.
+        directory: Data directory of the backend, created if needed.
+        writer: Write-behind queue for the backends that defer writes.
+        durable: Wait until deferred writes are persisted.
+
+    Returns:
+        The profile, exercise and workout storages.
+
+    Raises:
+        ValueError: If no backend is registered under the name.
+    """
+    try:
+        factory = _BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f'Unknown storage backend {backend!r}, expecting one of {backend_names()}') from None
+    os.makedirs(directory, exist_ok=True)
+    return factory(directory, writer, durable)
+
+
+_default_storages: Storages | None = None
+_default_storages_lock = threading.Lock()
+
+
+def get_storages() -> Storages:
+    """Return the storages shared by the app screens, configured by the environment."""
+    global _default_storages  # pylint: disable=global-statement
+    with _default_storages_lock:
+        if _default_storages is None:
+            _default_storages = open_storages(
+                os.environ.get(BACKEND_VARIABLE, DEFAULT_BACKEND),
+                os.environ.get(DATA_DIR_VARIABLE, '.'),
+                writer=get_write_queue(),
+            )
+        return _default_storages
+
+
+def _journal(directory: str, durable: bool) -> SessionJournal:
+    """Return the session journal of the backends persisting their data in a directory."""
+    return SessionJournal(os.path.join(directory, 'session.jsonl'), durable=durable)
+
+
+# Built-in backends import their modules when opened, so unused backends are never loaded
+
+
+@register_backend('json')
+def _open_json(directory: str, writer: WriteBehindQueue | None, durable: bool) -> Storages:
+    from .storage import ExerciseStorage, ProfileStorage, WorkoutStorage  # pylint: disable=import-outside-toplevel
+
+    return Storages(
+        profile=ProfileStorage(os.path.join(directory, 'profile.json'), writer=writer, durable=durable),
+        exercises=ExerciseStorage(os.path.join(directory, 'exercises.json'), writer=writer, durable=durable),
+        workouts=WorkoutStorage(os.path.join(directory, 'workouts.json'), writer=writer, durable=durable),
+        journal=_journal(directory, durable),
+    )
+
+
+@register_backend('jsonl')
+def _open_jsonl(directory: str, writer: WriteBehindQueue | None, durable: bool) -> Storages:
+    from .jsonl import JsonLinesWorkoutStorage  # pylint: disable=import-outside-toplevel
+
+    storages = _open_json(directory, writer, durable)
+    storages.workouts = JsonLinesWorkoutStorage(os.path.join(directory, 'workouts.jsonl'))
+    return storages
+
+
+@register_backend('sqlite')
+def _open_sqlite(directory: str, writer: WriteBehindQueue | None, durable: bool) -> Storages:
+    from .sqlite_storage import SqliteDatabase  # pylint: disable=import-outside-toplevel
+
+    database = SqliteDatabase(os.path.join(directory, 'xrcs.sqlite3'))
+    return Storages(
+        profile=database.profile,
+        exercises=database.exercises,
+        workouts=database.workouts,
+        journal=_journal(directory, durable),
+    )
+
+
+@register_backend('memory')
+def _open_memory(directory: str, writer: WriteBehindQueue | None, durable: bool) -> Storages:
+    from . import memory  # pylint: disable=import-outside-toplevel
+
+    return Storages(
+        profile=memory.MemoryProfileStorage(),
+        exercises=memory.MemoryExerciseStorage(),
+        workouts=memory.MemoryWorkoutStorage(),
+    )
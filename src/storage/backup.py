@@ -0,0 +1,292 @@
+"""Incremental content-addressed backups of the storage files.
+
+Files are split into chunks at content-defined boundaries, so an edit or an append only changes the
+chunks around it. Chunks are stored compressed under the sha256 digest of their content in
+`<directory>/chunks`, and every backup writes a snapshot manifest listing the chunks of each file to
+`<directory>/snapshots`. A backup only writes the chunks the backup directory does not have yet.
+
+Files unchanged since the previous snapshot are not read again, and files that only grew, like the
+change log of the workouts, are only read from their last chunk on. The cost of a backup therefore
+follows the size of the changes rather than the size of the history.
+"""
+
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import BinaryIO
+
+from .atomic import atomic_binary_writer, atomic_write_json
+from .locking import file_lock
+
+# Chunk sizes in bytes. Chunks are cut after a `}` or a line break whose preceding window of bytes
+# hashes to zero under the mask, so boundaries fall between json records and move along with them.
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+_BOUNDARY_MASK = (1 << 7) - 1
+_WINDOW = 128
+_CANDIDATES = re.compile(rb'[}\n]')
+_READ_SIZE = 1 << 20
+
+# Companion files written next to a storage file, backed up and restored together with it
+_COMPANIONS = ('.log', '.outbox', '.sync')
+
+
+class BackupError(Exception):
+    """Raised when a snapshot cannot be found or restored."""
+
+
+@dataclass
+class BackupResult:
+    """Result of a backup.
+
+    Attributes:
+        snapshot: Id of the written snapshot.
+        files: Number of backed up files.
+        chunks: Number of chunks added to the backup directory.
+        bytes_written: Compressed size of the added chunks.
+    """
+
+    snapshot: str
+    files: int = 0
+    chunks: int = 0
+    bytes_written: int = 0
+
+
+def _find_cut(data: bytes, start: int) -> int | None:
+    """Return the end of the chunk starting at `start`, None if the data ends before a boundary."""
+    limit = min(len(data), start + MAX_CHUNK_SIZE)
+    for match in _CANDIDATES.finditer(data, start + MIN_CHUNK_SIZE - 1, limit):
+        end = match.end()
+        if zlib.crc32(data[end - _WINDOW : end]) & _BOUNDARY_MASK == 0:
+            return end
+    return start + MAX_CHUNK_SIZE if len(data) - start >= MAX_CHUNK_SIZE else None
+
+
+def iter_chunks(file_: BinaryIO) -> Iterator[bytes]:
+    """Split a file into content-defined chunks.
+
+    A boundary only depends on the bytes right before it and on the previous boundary, so chunking
+    data after a change finds the boundaries, and chunks, of the unchanged data again.
+
+    Args:
+        file_: File object opened in binary mode.
+
+    Yields:
+        Chunks of at most `MAX_CHUNK_SIZE` bytes, in file order.
+    """
+    buffer = b''
+    start = 0
+    eof = False
+    while True:
+        cut = _find_cut(buffer, start)
+        if cut is None:
+            if eof:
+                if start < len(buffer):
+                    yield buffer[start:]
+                return
+            block = file_.read(_READ_SIZE)
+            eof = not block
+            buffer = buffer[start:] + block
+            start = 0
+            continue
+        yield buffer[start:cut]
+        start = cut
+
+
+def list_snapshots(directory: str) -> list[str]:
+    """Return the ids of the snapshots in a backup directory, oldest first.
+
+    Args:
+        directory: Backup directory.
+    """
+    snapshots = os.path.join(directory, 'snapshots')
+    if not os.path.isdir(snapshots):
+        return []
+    return sorted(name.removesuffix('.json') for name in os.listdir(snapshots) if name.endswith('.json'))
+
+
+def load_snapshot(directory: str, snapshot: str) -> dict:
+    """Load a snapshot manifest.
+
+    Args:
+        directory: Backup directory.
+        snapshot: Id of the snapshot.
+
+    Returns:
+        Manifest with the id, the creation time and the size and chunks of every file.
+
+    Raises:
+        BackupError: If the snapshot does not exist.
+    """
+    try:
+        with open(os.path.join(directory, 'snapshots', f'{snapshot}.json'), encoding='utf-8') as file_:
+            return json.load(file_)
+    except FileNotFoundError as err:
+        raise BackupError(f'Snapshot {snapshot} does not exist') from err
+
+
+def create_backup(data_dir: str, directory: str, full: bool = False) -> BackupResult:
+    """Back up the storage files of a data directory.
+
+    Each storage file is read together with its companion files while holding its file lock, so the
+    workout file and its change log are backed up in a consistent state. Writes still pending in a
+    write-behind queue are not backed up.
+
+    Args:
+        data_dir: Directory with the storage files.
+        directory: Backup directory, created if needed.
+        full: Read all files again instead of relying on the file sizes and times of the previous
+            snapshot. Chunks already stored are still not written again.
+
+    Returns:
+        Backup result with the id of the new snapshot.
+    """
+    snapshots = list_snapshots(directory)
+    previous = load_snapshot(directory, snapshots[-1])['files'] if snapshots and not full else {}
+    created = datetime.now(UTC)
+    result = BackupResult(snapshot=created.strftime('%Y%m%dT%H%M%S%fZ'))
+
+    files = {}
+    for owner, names in _groups(_storage_files(data_dir)).items():
+        with file_lock(os.path.join(data_dir, owner)):
+            for name in names:
+                files[name] = _backup_file(os.path.join(data_dir, name), previous.get(name), directory, result)
+    result.files = len(files)
+
+    os.makedirs(os.path.join(directory, 'snapshots'), exist_ok=True)
+    manifest = {'id': result.snapshot, 'created': created.isoformat(), 'files': files}
+    atomic_write_json(os.path.join(directory, 'snapshots', f'{result.snapshot}.json'), manifest)
+    return result
+
+
+def restore_backup(directory: str, data_dir: str, snapshot: str | None = None) -> str:
+    """Restore the storage files of a snapshot.
+
+    Files are replaced atomically, and companion files not in the snapshot, like a change log written
+    after the backup, are removed. Other files in the data directory are left untouched.
+
+    Args:
+        directory: Backup directory.
+        data_dir: Directory to restore the storage files to, created if needed.
+        snapshot: Id of the snapshot, the latest snapshot if None.
+
+    Returns:
+        Id of the restored snapshot.
+
+    Raises:
+        BackupError: If the snapshot does not exist or one of its chunks is missing or corrupted.
+    """
+    if snapshot is None:
+        snapshots = list_snapshots(directory)
+        if not snapshots:
+            raise BackupError(f'No snapshots in {directory}')
+        snapshot = snapshots[-1]
+    files = load_snapshot(directory, snapshot)['files']
+    missing = {digest for entry in files.values() for digest, _ in entry['chunks'] if not _has_chunk(directory, digest)}
+    if missing:
+        raise BackupError(f'Snapshot {snapshot} misses {len(missing)} chunks')
+
+    os.makedirs(data_dir, exist_ok=True)
+    existing = _groups(_storage_files(data_dir))
+    for owner, names in _groups(files).items():
+        with file_lock(os.path.join(data_dir, owner)):
+            for name in names:
+                with atomic_binary_writer(os.path.join(data_dir, name)) as file_:
+                    for digest, _ in files[name]['chunks']:
+                        file_.write(_read_chunk(directory, digest))
+            for name in existing.get(owner, []):
+                if name not in files:
+                    os.remove(os.path.join(data_dir, name))
+    return snapshot
+
+
+def _storage_files(data_dir: str) -> list[str]:
+    """Return the names of the storage files in a data directory, leaving out locks and temporary files."""
+    return sorted(
+        name
+        for name in os.listdir(data_dir)
+        if not name.startswith('.')
+        and not name.endswith(('.lock', '.tmp'))
+        and os.path.isfile(os.path.join(data_dir, name))
+    )
+
+
+def _groups(names: list[str] | dict) -> dict[str, list[str]]:
+    """Group file names by the storage file they belong to."""
+    groups: dict[str, list[str]] = {}
+    for name in names:
+        owner = next((name.removesuffix(suffix) for suffix in _COMPANIONS if name.endswith(suffix)), name)
+        groups.setdefault(owner, []).append(name)
+    return groups
+
+
+def _backup_file(filename: str, previous: dict | None, directory: str, result: BackupResult) -> dict:
+    """Store the chunks of a file and return its manifest entry."""
+    stat = os.stat(filename)
+    entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino}
+    if previous is not None and all(previous[key] == entry[key] for key in ('size', 'mtime_ns', 'inode')):
+        return {**entry, 'chunks': previous['chunks']}
+
+    chunks: list[list] = []
+    with open(filename, 'rb') as file_:
+        if (
+            previous is not None
+            and previous['chunks']
+            and previous['inode'] == stat.st_ino
+            and previous['size'] < stat.st_size
+        ):
+            # Files written by appending keep their inode and their data, so chunking resumes at the
+            # start of the last chunk, which was cut by the end of the file rather than a boundary
+            digest, size = previous['chunks'][-1]
+            offset = previous['size'] - size
+            file_.seek(offset)
+            if hashlib.sha256(file_.read(size)).hexdigest() == digest:
+                chunks = previous['chunks'][:-1]
+                file_.seek(offset)
+            else:
+                file_.seek(0)
+        for chunk in iter_chunks(file_):
+            chunks.append([_store_chunk(directory, chunk, result), len(chunk)])
+    entry['size'] = sum(size for _, size in chunks)
+    return {**entry, 'chunks': chunks}
+
+
+def _chunk_filename(directory: str, digest: str) -> str:
+    """Return the file name of a stored chunk."""
+    return os.path.join(directory, 'chunks', digest[:2], digest)
+
+
+def _has_chunk(directory: str, digest: str) -> bool:
+    """Return whether a chunk is stored."""
+    return os.path.exists(_chunk_filename(directory, digest))
+
+
+def _store_chunk(directory: str, chunk: bytes, result: BackupResult) -> str:
+    """Store a chunk unless it is stored already and return its digest."""
+    digest = hashlib.sha256(chunk).hexdigest()
+    filename = _chunk_filename(directory, digest)
+    if not os.path.exists(filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        data = zlib.compress(chunk)
+        with atomic_binary_writer(filename) as file_:
+            file_.write(data)
+        result.chunks += 1
+        result.bytes_written += len(data)
+    return digest
+
+
+def _read_chunk(directory: str, digest: str) -> bytes:
+    """Read a stored chunk and check it against its digest."""
+    with open(_chunk_filename(directory, digest), 'rb') as file_:
+        try:
+            chunk = zlib.decompress(file_.read())
+        except zlib.error as err:
+            raise BackupError(f'Chunk {digest} is corrupted') from err
+    if hashlib.sha256(chunk).hexdigest() != digest:
+        raise BackupError(f'Chunk {digest} is corrupted')
+    return chunk
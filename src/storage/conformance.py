@@ -0,0 +1,192 @@
+"""Conformance and performance kit for storage backends.
+
+`check_backend` runs the same calls against the storages of a backend and reports where the results
+differ from the semantics of the protocols in `backends`, and `measure_backend` times the common
+operations. Both take a function opening the storages, so they work for backends registered with
+`backends.register_backend` and for storages built by hand alike, and they have no test framework
+dependency.
+"""
+
+import time
+from collections.abc import Callable
+
+from .backends import ExerciseBackend, ProfileBackend, Storages, WorkoutBackend
+
+
+def _workout(idx: int, name: str = 'workout'):
+    """Return a workout with a distinct content for every index."""
+    from ..models.exercise import Exercise, Workout  # pylint: disable=import-outside-toplevel
+
+    return Workout(
+        exercises=[Exercise(name=f'lift {idx % 7}', sets=3, reps=idx % 10 + 1, weight=20.0 + idx)],
+        name=name,
+        datetime=f'2000-01-01T{idx // 60 % 24:02d}:{idx % 60:02d}:00',
+    )
+
+
+def check_backend(open_storages: Callable[[], Storages], persistent: bool = True) -> list[str]:
+    """Check that storages behave as the backend protocols describe.
+
+    Args:
+        open_storages: Function opening the storages of an empty backend. It is called again to check
+            that saved data survives a reopen.
+        persistent: Whether the backend keeps its data across a reopen.
+
+    Returns:
+        Description of every failed check, empty if the backend conforms.
+    """
+    from ..models.profile import Profile  # pylint: disable=import-outside-toplevel
+
+    failures: list[str] = []
+
+    def check(condition: bool, message: str) -> None:
+        if not condition:
+            failures.append(message)
+
+    storages = open_storages()
+    profile, exercises, workouts = storages.profile, storages.exercises, storages.workouts
+    check(isinstance(profile, ProfileBackend), 'profile storage does not implement ProfileBackend')
+    check(isinstance(exercises, ExerciseBackend), 'exercise storage does not implement ExerciseBackend')
+    check(isinstance(workouts, WorkoutBackend), 'workout storage does not implement WorkoutBackend')
+
+    # Empty storages
+    check(profile.load_profile() is None, 'load_profile of an empty storage is not None')
+    check(not profile.profile_exists(), 'profile_exists of an empty storage is true')
+    check(not exercises.load_exercises(), 'load_exercises of an empty storage is not empty')
+    check(not workouts.load_workouts(), 'load_workouts of an empty storage is not empty')
+    check(list(workouts.iter_workouts()) == [], 'iter_workouts of an empty storage is not empty')
+    check(workouts.get_workout('missing') is None, 'get_workout of an unknown id is not None')
+
+    # Profile
+    saved_profile = Profile(name='Conformance', dob='1990-01-01', weight=80.0)
+    profile.save_profile(saved_profile)
+    check(profile.profile_exists(), 'profile_exists is false after save_profile')
+    check(profile.load_profile() == saved_profile, 'load_profile does not return the saved profile')
+    saved_profile = Profile(name='Conformance', dob='1990-01-01', weight=75.5)
+    profile.save_profile(saved_profile)
+    check(profile.load_profile() == saved_profile, 'save_profile does not replace the saved profile')
+
+    # Exercises
+    exercises.save_exercise('Squat')
+    exercises.save_exercises(['Bench', 'squat', 'Row', 'bench'])
+    exercises.save_exercise('ROW')
+    expected_exercises = ['squat', 'bench', 'row']
+    check(exercises.load_exercises() == expected_exercises, 'exercise names are not lower cased, unique and in order')
+
+    # Workouts
+    first = workouts.save_workout(_workout(0))
+    ids = workouts.save_workouts([_workout(1), _workout(2), _workout(3)])
+    check(len({first, *ids}) == 4, 'saved workouts do not get unique ids')
+    check(workouts.save_workout(_workout(2)) == ids[1], 'saving a duplicate does not return the id of the saved copy')
+    batch_ids = workouts.save_workouts([_workout(4), _workout(4)])
+    check(batch_ids[0] == batch_ids[1], 'duplicates within a batch do not get the same id')
+    records = workouts.load_workouts() or []
+    check(
+        [record['id'] for record in records] == [first, *ids, batch_ids[0]],
+        'load_workouts is not in the order of saves',
+    )
+    check(len(records) == 5, f'expected 5 workouts after duplicate saves, got {len(records)}')
+    check(list(workouts.iter_workouts()) == records, 'iter_workouts does not match load_workouts')
+    check(workouts.get_workout(ids[0]) == records[1], 'get_workout does not return the saved record')
+    for loaded in (
+        (workouts.load_workouts() or [])[0],
+        workouts.get_workout(first) or {},
+        next(workouts.iter_workouts()),
+    ):
+        loaded['name'] = 'changed'
+        loaded['exercises'][0]['sets'] = 99
+    check(workouts.get_workout(first) == records[0], 'changing a loaded workout changes the saved record')
+
+    original = workouts.get_workout(ids[0]) or {}
+    workouts.update_workout(ids[0], _workout(10, name='edited'))
+    edited = workouts.get_workout(ids[0]) or {}
+    check(edited.get('name') == 'edited', 'update_workout does not replace the workout')
+    check(
+        (edited.get('date'), edited.get('datetime')) == (original.get('date'), original.get('datetime')),
+        'update_workout does not keep the dates of the workout',
+    )
+    check([record['id'] for record in workouts.load_workouts() or []][1] == ids[0], 'update_workout moves the workout')
+    workouts.delete_workout(ids[1])
+    check(workouts.get_workout(ids[1]) is None, 'delete_workout does not remove the workout')
+    check(
+        ids[1] not in [record['id'] for record in workouts.iter_workouts()], 'iter_workouts returns a deleted workout'
+    )
+    expected_history = [
+        (record['id'], position)
+        for record in workouts.load_workouts() or []
+        for position, exercise in enumerate(record['exercises'])
+        if exercise['name'].lower() == 'lift 3'
+    ]
+    history = workouts.exercise_history(' LIFT 3')
+    check(
+        [(performance['workout_id'], performance['position']) for performance in history] == expected_history,
+        'exercise_history does not match the saved workouts after edits and deletes',
+    )
+    check(
+        all(performance['name'] == 'lift 3' and performance['workout'] for performance in history),
+        'exercise_history does not return performance records',
+    )
+    check(workouts.exercise_history('lift 2') == [], 'exercise_history returns a deleted workout')
+    check(workouts.exercise_history('missing') == [], 'exercise_history of an unknown exercise is not empty')
+    for method, args in (('update_workout', ('missing', _workout(0))), ('delete_workout', ('missing',))):
+        try:
+            getattr(workouts, method)(*args)
+        except KeyError:
+            pass
+        else:
+            failures.append(f'{method} of an unknown id does not raise KeyError')
+
+    for storage in (profile, exercises, workouts):
+        storage.flush()
+    expected_workouts = workouts.load_workouts()
+
+    if persistent:
+        reopened = open_storages()
+        check(reopened.profile.load_profile() == saved_profile, 'the profile does not survive a reopen')
+        check(reopened.exercises.load_exercises() == expected_exercises, 'the exercises do not survive a reopen')
+        check(reopened.workouts.load_workouts() == expected_workouts, 'the workouts do not survive a reopen')
+        check(reopened.workouts.exercise_history('lift 3') == history, 'the exercise history does not survive a reopen')
+    return failures
+
+
+def measure_backend(open_storages: Callable[[], Storages], workouts: int = 1000) -> dict[str, float]:
+    """Measure the throughput of the common workout operations of a backend.
+
+    Args:
+        open_storages: Function opening the storages of an empty backend.
+        workouts: Number of workouts used by every operation.
+
+    Returns:
+        Operations per second of each operation.
+    """
+    storage = open_storages().workouts
+    half = workouts // 2
+    results = {}
+
+    def measure(name: str, count: int, operation: Callable[[], object]) -> None:
+        started = time.perf_counter()
+        operation()
+        storage.flush()
+        results[name] = count / max(time.perf_counter() - started, 1e-9)
+
+    ids: list[str] = []
+    measure('save', half, lambda: ids.extend(storage.save_workout(_workout(idx)) for idx in range(half)))
+    batch = [_workout(idx) for idx in range(half, workouts)]
+    measure('batch save', len(batch), lambda: ids.extend(storage.save_workouts(batch)))
+    measure('load', workouts, storage.load_workouts)
+    measure('iter', workouts, lambda: sum(1 for _ in storage.iter_workouts()))
+    measure('get', len(ids), lambda: [storage.get_workout(workout_id) for workout_id in ids])
+    measure('history', 7, lambda: [storage.exercise_history(f'lift {idx}') for idx in range(7)])
+    edits = ids[:half]
+
+    def update() -> None:
+        for workout_id in edits:
+            storage.update_workout(workout_id, _workout(-1))
+
+    def delete() -> None:
+        for workout_id in edits:
+            storage.delete_workout(workout_id)
+
+    measure('update', len(edits), update)
+    measure('delete', len(edits), delete)
+    return results
@@ -0,0 +1,292 @@
+"""Index of saved exercises ranked by how often and how recently they were performed.
+
+Every performance of an exercise adds a weight to its score that halves every `HALF_LIFE_DAYS`, so an
+exercise done every week outranks one done many times a year ago. Scores are kept as the logarithm
+of the sum of `exp(DECAY * timestamp)` over the performances: the ranking then never changes with the
+passage of time, and a new performance updates a score in constant time.
+
+Names are indexed by the prefixes of their words, each prefix holding its names sorted by rank, so
+the best matches of a query are the first names of a single list. Queries matching no name fall back
+to names containing the query, then to the names matching the query with its misspelled words
+corrected: the words of the names are indexed for typo tolerant lookups, see `fuzzy`, so corrections
+never compare the query with every name.
+"""
+
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterable
+from heapq import nsmallest
+from itertools import accumulate, product
+from typing import TYPE_CHECKING
+
+from .fuzzy import MAX_DISTANCE, DeletionIndex, edit_distance
+from .records import workout_timestamp
+
+if TYPE_CHECKING:
+    from ..models.exercise import Workout
+    from .backends import ExerciseBackend, WorkoutBackend
+
+HALF_LIFE_DAYS = 30
+DECAY = math.log(2) / (HALF_LIFE_DAYS * 24 * 3600)
+
+# Longer queries are looked up by their first characters and then filtered
+MAX_PREFIX = 12
+
+# Shortest query matched with typos, and corrections tried per misspelled word
+MIN_FUZZY_LENGTH = 3
+MAX_CORRECTIONS = 3
+
+_WORD = re.compile(r'\w+')
+_WORD_START = re.compile(r'\b\w')
+
+
+def _add_log(a: float, b: float) -> float:
+    """Return log(exp(a) + exp(b)) without overflowing."""
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+class ExerciseIndex:
+    """Ranked prefix index of the exercise names of a user.
+
+    The index is built from the storages on the first query, picks up newly saved exercise names on
+    later queries and is told about new workouts by `record_workout`. It is safe to query from a lookup
+    thread while the UI thread records workouts.
+    """
+
+    def __init__(
+        self,
+        exercise_storage: 'ExerciseBackend',
+        workout_storage: 'WorkoutBackend | None' = None,
+        refresh_interval: float = 1.0,
+    ):
+        """Initialize the index.
+
+        Args:
+            exercise_storage: Storage of the exercise names.
+            workout_storage: Storage of the workout history ranking the names, if any.
+            refresh_interval: Minimum time in seconds between reads of the exercise names, so queries
+                do not copy the whole catalog.
+        """
+        self.exercise_storage = exercise_storage
+        self.workout_storage = workout_storage
+        self.refresh_interval = refresh_interval
+        self._refreshed: float | None = None
+        self._names: list[str] = []
+        self._lower: list[str] = []
+        self._haystack: str | None = None
+        self._offsets: list[int] = []
+        self._positions: dict[str, int] = {}
+        self._scores: dict[str, float] = {}
+        self._buckets: dict[str, list[tuple[float, int]]] = {}
+        self._vocabulary: list[str] = []
+        self._words: dict[str, int] = {}
+        self._fuzzy = DeletionIndex()
+        self._catalog_size = 0
+        self._history_loaded = False
+        self._lock = threading.Lock()
+
+    def suggest(self, text: str, k: int = 5) -> list[str]:
+        """Return the best ranked exercise names matching a text.
+
+        Names with a word starting with the text are returned in rank order. Only if there are none,
+        names containing the text inside a word are returned, in rank order as well, which takes a
+        search through all names. If there are still none, the words of the text are corrected for typos and
+        the names matching the corrected text are returned, closest first.
+
+        Args:
+            text: Text typed by the user.
+            k: Maximum number of names.
+
+        Returns:
+            Exercise names, as saved.
+        """
+        query = text.lower()
+        with self._lock:
+            self._sync()
+            matches = self._word_matches(query, k)
+            if not matches:
+                matches = self._infix_matches(query, k)
+            if not matches and len(query.strip()) >= MIN_FUZZY_LENGTH:
+                found: dict[int, None] = {}
+                for corrected in self._corrected_queries(query, partial=True):
+                    found.update(dict.fromkeys(self._word_matches(corrected, k)))
+                    if len(found) >= k:
+                        break
+                matches = list(found)[:k]
+            return [self._names[position] for position in matches]
+
+    def near_duplicates(self, name: str) -> list[str]:
+        """Return the saved exercise names that look like misspellings of a new name.
+
+        Args:
+            name: Exercise name about to be saved.
+
+        Returns:
+            Saved names within a small edit distance of the name, closest first, or an empty list if
+            the name itself is saved.
+        """
+        query = name.strip().lower()
+        with self._lock:
+            self._sync()
+            if query in self._positions or len(query) < MIN_FUZZY_LENGTH:
+                return []
+            corrected = self._corrected_queries(query, partial=False)
+            return [self._names[self._positions[name]] for name in corrected if name in self._positions]
+
+    def record_workout(self, workout: 'Workout | dict') -> None:
+        """Rank the exercises of a newly saved workout.
+
+        Args:
+            workout: Workout model instance or record.
+        """
+        record = workout if isinstance(workout, dict) else workout.model_dump()
+        with self._lock:
+            # A history loaded later already has the workout
+            if self._history_loaded:
+                self._record(record)
+
+    def _sync(self) -> None:
+        """Add newly saved exercise names and load the history once. Must hold `_lock`."""
+        now = time.monotonic()
+        if self._refreshed is not None and now - self._refreshed < self.refresh_interval:
+            return
+        self._refreshed = now
+        names = self.exercise_storage.load_exercises() or []
+        # The exercise names are only ever appended
+        for name in names[self._catalog_size :]:
+            if name.lower() not in self._positions:
+                self._add_name(name)
+        self._catalog_size = len(names)
+        if not self._history_loaded and self.workout_storage is not None:
+            self._history_loaded = True
+            for record in self.workout_storage.iter_workouts():
+                self._record(record)
+
+    def _add_name(self, name: str) -> None:
+        """Add a name, unranked. Must hold `_lock`."""
+        position = len(self._names)
+        self._names.append(name)
+        self._lower.append(name.lower())
+        self._haystack = None
+        self._positions[name.lower()] = position
+        self._scores[name.lower()] = -math.inf
+        for prefix in self._prefixes(name.lower()):
+            self._buckets.setdefault(prefix, []).append((math.inf, position))
+        for word in _WORD.findall(name.lower()):
+            if word not in self._words:
+                self._words[word] = len(self._vocabulary)
+                self._fuzzy.add(word, len(self._vocabulary))
+                self._vocabulary.append(word)
+
+    def _word_matches(self, query: str, k: int) -> list[int]:
+        """Return the positions of the best ranked names with a word starting with a query. Must hold `_lock`."""
+        matches = []
+        for _, position in self._buckets.get(query[:MAX_PREFIX], ()):
+            name = self._lower[position]
+            if len(query) <= MAX_PREFIX or (query in name and self._starts_word(name, query)):
+                matches.append(position)
+                if len(matches) == k:
+                    break
+        return matches
+
+    def _infix_matches(self, query: str, k: int) -> list[int]:
+        """Return the positions of the best ranked names containing a query. Must hold `_lock`."""
+        if '\n' in query:
+            return []
+        if self._haystack is None:
+            # All names in a single string are searched much faster than one by one
+            self._haystack = '\n'.join(self._lower)
+            self._offsets = list(accumulate((len(name) + 1 for name in self._lower[:-1]), initial=0))
+        found = set()
+        start = self._haystack.find(query)
+        while start != -1:
+            position = bisect_right(self._offsets, start) - 1
+            found.add(position)
+            start = self._haystack.find(query, self._offsets[position] + len(self._lower[position]))
+        return nsmallest(k, found, key=lambda position: (-self._scores[self._lower[position]], position))
+
+    def _corrected_queries(self, query: str, partial: bool) -> list[str]:
+        """Return the query with its misspelled words corrected, closest first. Must hold `_lock`.
+
+        Every word is replaced by a saved word within its allowed distance, the corrections of a query
+        adding up to at most `fuzzy.MAX_DISTANCE`. The last word of a partial query may be the start
+        of a saved word, as the user may not have typed the whole name.
+        """
+        tokens = list(_WORD.finditer(query))
+        options = []
+        for idx, token in enumerate(tokens):
+            last = partial and idx == len(tokens) - 1 and token.end() == len(query)
+            corrections = self._word_corrections(token.group(), last)
+            if not corrections:
+                return []
+            options.append(corrections)
+        corrected = []
+        for combination in product(*options):
+            distance = sum(distance for distance, _ in combination)
+            if 0 < distance <= MAX_DISTANCE:
+                parts = []
+                end = 0
+                for token, (_, word) in zip(tokens, combination, strict=True):
+                    parts += [query[end : token.start()], word]
+                    end = token.end()
+                corrected.append((distance, ''.join(parts) + query[end:]))
+        return [text for _, text in sorted(corrected)]
+
+    def _word_corrections(self, word: str, partial: bool) -> list[tuple[int, str]]:
+        """Return the distance and text of the saved words a word may be a misspelling of. Must hold `_lock`."""
+        # A partial word is saved if it starts a saved word, its prefixes are bucket keys
+        saved_words = self._buckets if partial else self._words
+        if word in saved_words:
+            return [(0, word)]
+        max_distance = 0 if len(word) <= 2 else 1 if len(word) <= 4 else MAX_DISTANCE
+        corrections: dict[str, int] = {}
+        for key in self._fuzzy.candidates(word, max_distance):
+            saved = self._vocabulary[key]
+            targets = [saved]
+            if partial:
+                targets += [saved[:length] for length in range(len(word) - 1, len(word) + 2)]
+            # Prefer corrections as long as the word, so partial words are not cut short
+            distance, _, target = min(
+                (edit_distance(word, target, max_distance), abs(len(target) - len(word)), target) for target in targets
+            )
+            if distance <= max_distance:
+                corrections[target] = min(distance, corrections.get(target, distance))
+        return sorted((distance, target) for target, distance in corrections.items())[:MAX_CORRECTIONS]
+
+    def _record(self, record: dict) -> None:
+        """Add the performances of the exercises of a workout to their scores. Must hold `_lock`."""
+        timestamp = workout_timestamp(record)
+        if timestamp is None:
+            return
+        for name in dict.fromkeys(exercise['name'].lower() for exercise in record.get('exercises', [])):
+            if name not in self._positions:
+                self._add_name(name)
+            position = self._positions[name]
+            old = self._scores[name]
+            new = self._scores[name] = _add_log(old, DECAY * timestamp)
+            for prefix in self._prefixes(name):
+                bucket = self._buckets[prefix]
+                del bucket[bisect_left(bucket, (-old, position))]
+                insort(bucket, (-new, position))
+
+    @staticmethod
+    def _prefixes(name: str) -> Iterable[str]:
+        """Return the indexed prefixes of a lower cased name: the empty prefix and the word prefixes."""
+        prefixes = {''}
+        for match in _WORD_START.finditer(name):
+            start = match.start()
+            end = min(len(name), start + MAX_PREFIX)
+            prefixes.update(name[start:stop] for stop in range(start + 1, end + 1))
+        return prefixes
+
+    @staticmethod
+    def _starts_word(name: str, query: str) -> bool:
+        """Return whether a word of a lower cased name starts with the query."""
+        return any(name.startswith(query, match.start()) for match in _WORD_START.finditer(name))
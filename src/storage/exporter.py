@@ -0,0 +1,97 @@
+import gzip
+import io
+import sys
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import TextIO
+
+from .backends import WorkoutBackend
+from .formats import write_workouts
+
+
+@contextmanager
+def open_output(filename: str | None, compress: bool = False) -> Iterator[TextIO]:
+    """Open a file to export to, compressing it with gzip if requested.
+
+    Args:
+        filename: Name of the file to write, stdout if None.
+        compress: Compress the output with gzip. Always done for file names ending with `.gz`.
+
+    Yields:
+        Text file object to write to.
+    """
+    compress = compress or bool(filename and filename.lower().endswith('.gz'))
+    if filename is None and not compress:
+        yield sys.stdout
+    elif filename is None:
+        with (
+            gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb') as binary,
+            io.TextIOWrapper(binary, encoding='utf-8', newline='') as file_,
+        ):
+            yield file_
+    elif compress:
+        with gzip.open(filename, 'wt', encoding='utf-8', newline='') as file_:
+            yield file_
+    else:
+        with open(filename, 'w', encoding='utf-8', newline='') as file_:
+            yield file_
+
+
+def filter_workouts(
+    workouts: Iterable[dict], since: str | None = None, until: str | None = None, exercises: Iterable[str] | None = None
+) -> Iterator[dict]:
+    """Select workouts by date and exercise.
+
+    Args:
+        workouts: Workout data.
+        since: First date to include, as an iso date.
+        until: Last date to include, as an iso date.
+        exercises: Names of the exercises to include, case insensitive. Other exercises are removed from
+            the workouts and workouts without any of them are skipped.
+
+    Yields:
+        Selected workout data.
+    """
+    names = {name.lower() for name in exercises} if exercises else None
+    for workout in workouts:
+        date = workout.get('date') or ''
+        if (since is not None or until is not None) and not date:
+            continue
+        if (since is not None and date < since) or (until is not None and date > until):
+            continue
+        if names is not None:
+            selected = [exercise for exercise in workout['exercises'] if exercise['name'].lower() in names]
+            if not selected:
+                continue
+            workout = {**workout, 'exercises': selected}
+        yield workout
+
+
+def export_workouts(
+    workout_storage: WorkoutBackend,
+    file_: TextIO,
+    fmt: str,
+    since: str | None = None,
+    until: str | None = None,
+    exercises: Iterable[str] | None = None,
+    row_group_size: int = 1000,
+) -> int:
+    """Export saved workouts to a file.
+
+    The workouts are streamed from the storage, so memory use does not grow with the number of saved
+    workouts.
+
+    Args:
+        workout_storage: Storage to export the workouts from.
+        file_: File object opened in text mode, see `open_output`.
+        fmt: File format, one of `formats.EXPORT_FORMATS`.
+        since: First date to export, as an iso date.
+        until: Last date to export, as an iso date.
+        exercises: Names of the exercises to export, all if None.
+        row_group_size: Number of rows per row group of the columnar format.
+
+    Returns:
+        Number of exported workouts.
+    """
+    workouts = filter_workouts(workout_storage.iter_workouts(), since=since, until=until, exercises=exercises)
+    return write_workouts(file_, fmt, workouts, row_group_size=row_group_size)
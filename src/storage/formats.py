@@ -0,0 +1,172 @@
+import csv
+import json
+import os
+from collections.abc import Iterable, Iterator
+from typing import Any, TextIO
+
+from .streaming import iter_json_array
+
+FORMATS = ('json', 'jsonl', 'csv')
+EXPORT_FORMATS = (*FORMATS, 'columnar')
+
+# Workouts are stored in csv files with one row per exercise, rows of the same workout follow each other
+CSV_COLUMNS = ('workout', 'date', 'datetime', 'notes', 'exercise', 'sets', 'reps', 'weight')
+EXPORT_COLUMNS = ('id', *CSV_COLUMNS)
+
+
+def guess_format(filename: str, fmt: str | None = None) -> str:
+    """Return the given format or guess it from the file extension.
+
+    Args:
+        filename: Name of the file.
+        fmt: Explicitly requested format.
+
+    Returns:
+        One of `EXPORT_FORMATS`, json if the extension is unknown. A `.gz` suffix is ignored.
+    """
+    if fmt:
+        return fmt
+    if filename.lower().endswith('.gz'):
+        filename = filename[:-3]
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    return extension if extension in EXPORT_FORMATS else 'json'
+
+
+def read_rows(file_: TextIO, fmt: str) -> Iterator[tuple[int, Any]]:
+    """Read workout records from a file one at a time.
+
+    Json lines are not parsed here, so that parsing can be done together with validation. Csv rows of
+    the same workout are grouped into a single record.
+
+    Args:
+        file_: File object opened in text mode, with `newline=''` for csv files.
+        fmt: One of `FORMATS`.
+
+    Yields:
+        Row number and workout record, or the unparsed line for json lines files. The row number is
+        the position in a json array, the line in a json lines file or the first line of the workout
+        in a csv file.
+
+    Raises:
+        json.JSONDecodeError: If a json file does not contain a valid json array.
+        ValueError: If the format is unknown.
+    """
+    if fmt == 'json':
+        yield from enumerate(iter_json_array(file_), start=1)
+    elif fmt == 'jsonl':
+        yield from ((row, line) for row, line in enumerate(file_, start=1) if line.strip())
+    elif fmt == 'csv':
+        yield from _read_csv(file_)
+    else:
+        raise ValueError(f'Unknown format {fmt}')
+
+
+def _read_csv(file_: TextIO) -> Iterator[tuple[int, dict]]:
+    """Read workout records from a csv file with one row per exercise."""
+    reader = csv.DictReader(file_)
+    # Key, first line and record of the workout being grouped
+    key: tuple[str | None, ...] | None = None
+    first_row = 0
+    workout: dict | None = None
+    for row in reader:
+        row = {column: value or None for column, value in row.items()}
+        row_key = (row.get('id'), row.get('workout'), row.get('date'), row.get('datetime'), row.get('notes'))
+        if workout is None or row_key != key:
+            if workout is not None:
+                yield first_row, workout
+            key = row_key
+            first_row = reader.line_num
+            workout = {
+                'name': row.get('workout'),
+                'date': row.get('date'),
+                'datetime': row.get('datetime'),
+                'notes': row.get('notes'),
+                'exercises': [],
+            }
+        workout['exercises'].append(
+            {'name': row.get('exercise'), 'sets': row.get('sets'), 'reps': row.get('reps'), 'weight': row.get('weight')}
+        )
+    if workout is not None:
+        yield first_row, workout
+
+
+def flatten(workout: dict) -> Iterator[dict]:
+    """Flatten a workout into rows with one exercise each.
+
+    Args:
+        workout: Workout data.
+
+    Yields:
+        Rows with the `EXPORT_COLUMNS` as keys.
+    """
+    for exercise in workout['exercises']:
+        yield {
+            'id': workout.get('id'),
+            'workout': workout.get('name'),
+            'date': workout.get('date'),
+            'datetime': workout.get('datetime'),
+            'notes': workout.get('notes'),
+            'exercise': exercise.get('name'),
+            'sets': exercise.get('sets'),
+            'reps': exercise.get('reps'),
+            'weight': exercise.get('weight'),
+        }
+
+
+def write_workouts(file_: TextIO, fmt: str, workouts: Iterable[dict], row_group_size: int = 1000) -> int:
+    """Write workouts to a file one at a time.
+
+    The columnar format is a json lines file of row groups. Each line holds up to `row_group_size`
+    flattened exercise rows as `{"rows": n, "columns": {column: [values]}}`, so columns can be read
+    without parsing the other columns of a row.
+
+    Args:
+        file_: File object opened in text mode, with `newline=''` for csv files.
+        fmt: One of `EXPORT_FORMATS`.
+        workouts: Workout data.
+        row_group_size: Number of rows per row group of the columnar format.
+
+    Returns:
+        Number of written workouts.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    count = 0
+
+    def counted() -> Iterator[dict]:
+        nonlocal count
+        for workout in workouts:
+            count += 1
+            yield workout
+
+    if fmt == 'json':
+        file_.write('[')
+        for idx, workout in enumerate(counted()):
+            file_.write((', ' if idx else '') + json.dumps(workout))
+        file_.write(']\n')
+    elif fmt == 'jsonl':
+        for workout in counted():
+            file_.write(json.dumps(workout) + '\n')
+    elif fmt == 'csv':
+        writer = csv.DictWriter(file_, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for workout in counted():
+            writer.writerows(flatten(workout))
+    elif fmt == 'columnar':
+        columns: dict[str, list] = {column: [] for column in EXPORT_COLUMNS}
+        rows = 0
+        for workout in counted():
+            for row in flatten(workout):
+                for column, value in row.items():
+                    columns[column].append(value)
+                rows += 1
+                if rows == row_group_size:
+                    file_.write(json.dumps({'rows': rows, 'columns': columns}) + '\n')
+                    columns = {column: [] for column in EXPORT_COLUMNS}
+                    rows = 0
+        if rows:
+            file_.write(json.dumps({'rows': rows, 'columns': columns}) + '\n')
+    else:
+        raise ValueError(f'Unknown format {fmt}')
+    return count
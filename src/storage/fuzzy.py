@@ -0,0 +1,88 @@
+"""Typo tolerant matching of names.
+
+Names are indexed by the strings left after deleting up to `MAX_DISTANCE` characters from their
+prefixes, as in SymSpell: two strings within that edit distance always share such a deletion, so the
+candidates of a query are found with a few dictionary lookups instead of comparing it with every name.
+Candidates are then checked with the edit distance.
+"""
+
+from collections.abc import Iterable
+from itertools import combinations
+
+MAX_DISTANCE = 2
+
+# Only the first characters of names are indexed, which keeps the index small. The shortest prefix
+# indexed leaves a character after the maximum number of deletions.
+PREFIX_LENGTH = 7
+MIN_PREFIX_LENGTH = MAX_DISTANCE + 1
+
+
+def edit_distance(a: str, b: str, max_distance: int = MAX_DISTANCE) -> int:
+    """Return the edit distance between two strings, counting a swap of adjacent characters as one edit.
+
+    Args:
+        a: First string.
+        b: Second string.
+        max_distance: Distance beyond which the strings are not compared further.
+
+    Returns:
+        The edit distance, or `max_distance + 1` if it is larger than `max_distance`.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def deletions(text: str, max_distance: int = MAX_DISTANCE) -> set[str]:
+    """Return the strings left after deleting up to `max_distance` characters from a text."""
+    result = {text}
+    for count in range(1, min(max_distance, len(text)) + 1):
+        for positions in combinations(range(len(text)), count):
+            result.add(''.join(char for idx, char in enumerate(text) if idx not in positions))
+    return result
+
+
+class DeletionIndex:
+    """Index finding the names within a small edit distance of a query."""
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._deletions: dict[str, list[int]] = {}
+
+    def add(self, name: str, key: int) -> None:
+        """Index a lower cased name.
+
+        The prefixes of the name from `MIN_PREFIX_LENGTH` to `PREFIX_LENGTH` characters are indexed, so
+        a query matches the start of a name that is longer than the query.
+
+        Args:
+            name: Name to index.
+            key: Key returned by lookups for the name.
+        """
+        keys = set()
+        for length in range(min(MIN_PREFIX_LENGTH, len(name)), min(PREFIX_LENGTH, len(name)) + 1):
+            keys.update(deletions(name[:length]))
+        for deletion in keys:
+            self._deletions.setdefault(deletion, []).append(key)
+
+    def candidates(self, query: str, max_distance: int = MAX_DISTANCE) -> Iterable[int]:
+        """Return the keys of the names that may start within `max_distance` edits of a lower cased query.
+
+        The candidates must be checked with `edit_distance`.
+        """
+        found: set[int] = set()
+        for deletion in deletions(query[:PREFIX_LENGTH], max_distance):
+            found.update(self._deletions.get(deletion, ()))
+        return found
@@ -0,0 +1,130 @@
+import collections
+import itertools
+import json
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, TextIO
+
+from .formats import read_rows
+from .storage import ExerciseStorage, WorkoutStorage
+
+
+@dataclass
+class ImportReport:
+    """Result of a bulk import.
+
+    Attributes:
+        imported: Number of imported workouts.
+        duplicates: Number of valid workouts skipped because they were saved already.
+        errors: Row number and error message of every invalid row.
+    """
+
+    imported: int = 0
+    duplicates: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+
+class _Rollback(Exception):
+    """Raised to abort the storage transaction of an import with invalid rows."""
+
+
+def _validate_chunk(rows: list[tuple[int, Any]]) -> tuple[list[dict], list[tuple[int, str]]]:
+    """Parse and validate a chunk of rows, run in the worker processes."""
+    from pydantic import ValidationError  # pylint: disable=import-outside-toplevel
+
+    from ..models.exercise import Workout  # pylint: disable=import-outside-toplevel
+
+    valid = []
+    errors = []
+    for row, record in rows:
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            if not isinstance(record, dict):
+                raise TypeError('Expecting a json object')
+            record.pop('id', None)
+            valid.append(Workout(**record).model_dump())
+        except (ValidationError, ValueError, TypeError) as err:
+            errors.append((row, str(err)))
+    return valid, errors
+
+
+def _validated_chunks(
+    rows: Iterable[tuple[int, Any]], chunk_size: int, executor: Executor | None, workers: int
+) -> Iterator[tuple[list[dict], list[tuple[int, str]]]]:
+    """Validate rows in chunks, in order, keeping at most two chunks per worker in flight."""
+    chunks = iter(lambda: list(itertools.islice(rows, chunk_size)), [])
+    if executor is None:
+        yield from map(_validate_chunk, chunks)
+        return
+    in_flight: collections.deque = collections.deque()
+    for chunk in chunks:
+        in_flight.append(executor.submit(_validate_chunk, chunk))
+        if len(in_flight) >= 2 * workers:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def import_workouts(
+    file_: TextIO,
+    fmt: str,
+    workout_storage: WorkoutStorage,
+    exercise_storage: ExerciseStorage,
+    skip_invalid: bool = False,
+    chunk_size: int = 1000,
+    workers: int | None = None,
+) -> ImportReport:
+    """Import workouts from a file in a single storage transaction.
+
+    The file is streamed and validated in chunks across worker processes, and the valid workouts are
+    streamed into the workout file, so memory use does not grow with the size of the file. Workouts
+    that are saved already are skipped, so importing a file again does not duplicate workouts. Exercise
+    names of the imported workouts are added to the exercise storage once the workouts are written.
+
+    Args:
+        file_: File object opened in text mode, with `newline=''` for csv files.
+        fmt: File format, one of `formats.FORMATS`.
+        workout_storage: Storage to import the workouts to.
+        exercise_storage: Storage to add the exercise names to.
+        skip_invalid: Import the valid rows if some are invalid. Otherwise nothing is imported.
+        chunk_size: Number of rows validated at a time by a worker.
+        workers: Number of worker processes, the number of CPUs if None. Validation runs in the calling
+            process if 1 or less.
+
+    Returns:
+        Import report with the number of imported workouts and the errors of invalid rows.
+    """
+    workers = workers or os.cpu_count() or 1
+    report = ImportReport()
+    names: set[str] = set()
+    valid_count = 0
+
+    def records(executor: Executor | None) -> Iterator[dict]:
+        nonlocal valid_count
+        for valid, errors in _validated_chunks(read_rows(file_, fmt), chunk_size, executor, workers):
+            report.errors.extend(errors)
+            if report.errors and not skip_invalid:
+                # Keep validating to report all invalid rows, but do not write anything
+                continue
+            for record in valid:
+                valid_count += 1
+                names.update(exercise['name'] for exercise in record['exercises'])
+                yield record
+        if report.errors and not skip_invalid:
+            raise _Rollback
+
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                report.imported = workout_storage.bulk_append(records(executor))
+        else:
+            report.imported = workout_storage.bulk_append(records(None))
+    except _Rollback:
+        return report
+
+    report.duplicates = valid_count - report.imported
+    exercise_storage.save_exercises(list(names))
+    return report
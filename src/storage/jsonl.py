@@ -0,0 +1,242 @@
+"""Workout storage backend keeping workouts in an append-only json lines file.
+
+Every save, edit and delete appends a `put` or `del` entry to the file, so a write never rewrites the
+saved workouts. The file is replayed into an index of the live workouts when it changes, and rewritten
+with only the live workouts once most of its entries are dead. The exercise posting lists, see
+`postings`, are built from the index on the first history query and kept up to date by the writes.
+"""
+
+import json
+import os
+import threading
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from .atomic import append_lines, atomic_writer
+from .locking import file_lock
+from .merge import content_hash
+from .postings import ExercisePostings
+from .records import copy_workout_record, edited_workout_record, new_workout_record
+from .schema import migrate
+
+if TYPE_CHECKING:
+    from ..models.exercise import Workout
+
+
+class JsonLinesWorkoutStorage:
+    """Workout storage appending changes to a json lines file.
+
+    Writes hold an advisory lock on the file, so several processes can share it.
+    """
+
+    def __init__(self, filename: str = 'workouts.jsonl', compact_min_entries: int = 32):
+        """Initialize the storage class.
+
+        Args:
+            filename: Name of the json lines file.
+            compact_min_entries: Minimum number of entries before the file is compacted.
+        """
+        self.filename = filename
+        self.compact_min_entries = compact_min_entries
+        self._index: dict[str, dict] = {}
+        self._hashes: dict[str, str] | None = None
+        self._postings: ExercisePostings | None = None
+        self._entries = 0
+        self._signature: tuple | None = None
+        self._lock = threading.RLock()
+
+    def save_workout(self, workout: 'Workout') -> str:
+        """Save a workout.
+
+        Args:
+            workout: Workout model instance.
+
+        Returns:
+            Id of the saved workout, the id of the saved copy for a duplicate.
+        """
+        return self.save_workouts([workout])[0]
+
+    def save_workouts(self, workouts: list['Workout']) -> list[str]:
+        """Save several workouts with a single append.
+
+        Args:
+            workouts: Workout model instances.
+
+        Returns:
+            Ids of the saved workouts, the id of the saved copy for duplicates.
+        """
+        records = [new_workout_record(workout) for workout in workouts]
+        ids = []
+        with self._lock, file_lock(self.filename):
+            index = self._load_index()
+            hashes = self._content_index()
+            new = []
+            for record in records:
+                digest = content_hash(record)
+                if digest not in hashes:
+                    hashes[digest] = record['id']
+                    new.append(record)
+                ids.append(hashes[digest])
+            self._append([{'op': 'put', 'id': record['id'], 'workout': record} for record in new])
+            index.update((record['id'], record) for record in new)
+            if self._postings is not None:
+                for record in new:
+                    self._postings.add(record)
+        return ids
+
+    def update_workout(self, workout_id: str, workout: 'Workout') -> None:
+        """Replace a saved workout.
+
+        Args:
+            workout_id: Id of the workout to replace.
+            workout: Workout model instance with the new data.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
+        """
+        with self._lock, file_lock(self.filename):
+            index = self._load_index()
+            record = edited_workout_record(index[workout_id], workout)
+            self._append([{'op': 'put', 'id': workout_id, 'workout': record}])
+            index[workout_id] = record
+            if self._postings is not None:
+                self._postings.add(record)
+            self._hashes = None
+            self._maybe_compact()
+
+    def delete_workout(self, workout_id: str) -> None:
+        """Delete a saved workout.
+
+        Args:
+            workout_id: Id of the workout to delete.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
+        """
+        with self._lock, file_lock(self.filename):
+            index = self._load_index()
+            if workout_id not in index:
+                raise KeyError(workout_id)
+            self._append([{'op': 'del', 'id': workout_id}])
+            del index[workout_id]
+            if self._postings is not None:
+                self._postings.remove(workout_id)
+            self._hashes = None
+            self._maybe_compact()
+
+    def load_workouts(self) -> list[dict] | None:
+        """Load copies of all workout records.
+
+        Returns:
+            List of workout data or None if the file does not exist.
+        """
+        with self._lock:
+            index = self._load_index()
+            if not index and not os.path.exists(self.filename):
+                return None
+            return [copy_workout_record(workout) for workout in index.values()]
+
+    def get_workout(self, workout_id: str) -> dict | None:
+        """Load a copy of a single workout record, None if it does not exist."""
+        with self._lock:
+            workout = self._load_index().get(workout_id)
+        return copy_workout_record(workout) if workout is not None else None
+
+    def iter_workouts(self) -> Iterator[dict]:
+        """Iterate over the workout records, in the order of `load_workouts`."""
+        yield from self.load_workouts() or []
+
+    def exercise_history(self, exercise_name: str) -> list[dict]:
+        """Return the performances of an exercise, in the order of `load_workouts`.
+
+        The posting lists are kept in memory only, built on the first query of a process, see
+        `postings`.
+
+        Args:
+            exercise_name: Name of the exercise, matched ignoring case.
+
+        Returns:
+            Performance records, see `records.exercise_performance`.
+        """
+        with self._lock:
+            index = self._load_index()
+            if self._postings is None:
+                self._postings = ExercisePostings(index.values())
+            return self._postings.history(exercise_name)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Do nothing, writes are appended right away."""
+
+    def compact(self) -> None:
+        """Rewrite the file with a single entry per live workout."""
+        with self._lock, file_lock(self.filename):
+            self._load_index()
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the file with the live workouts, holding the locks."""
+        with atomic_writer(self.filename) as file_:
+            for record in self._index.values():
+                file_.write(json.dumps({'op': 'put', 'id': record['id'], 'workout': record}) + '\n')
+        self._entries = len(self._index)
+        self._signature = self._file_signature()
+
+    def _maybe_compact(self) -> None:
+        """Compact the file once more than half of its entries are dead, holding the locks."""
+        if self._entries >= self.compact_min_entries and self._entries > 2 * len(self._index):
+            self._compact()
+
+    def _append(self, entries: list[dict]) -> None:
+        """Append entries to the file and keep the cached index valid.
+
+        Must be called holding `_lock` and the file lock, so the signature taken after the append is
+        that of our own write and a write of another process lands after it is taken.
+        """
+        if not entries:
+            return
+        append_lines(self.filename, [json.dumps(entry) for entry in entries])
+        self._entries += len(entries)
+        self._signature = self._file_signature()
+
+    def _load_index(self) -> dict[str, dict]:
+        """Return the id index of live workouts, replaying the file if it changed. Must hold `_lock`."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return self._index
+        index: dict[str, dict] = {}
+        entries = 0
+        if signature is not None:
+            with open(self.filename, encoding='utf-8', errors='replace') as file_:
+                for line in file_:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Lines torn by a crash during an append are skipped
+                        continue
+                    entries += 1
+                    if entry['op'] == 'put':
+                        index[entry['id']] = migrate('workout', entry['workout'])
+                    else:
+                        index.pop(entry['id'], None)
+        self._index = index
+        self._hashes = None
+        self._postings = None
+        self._entries = entries
+        self._signature = signature
+        return index
+
+    def _content_index(self) -> dict[str, str]:
+        """Return the content hash to id index of the live workouts. Must hold `_lock`."""
+        if self._hashes is None:
+            self._hashes = {}
+            for record in self._index.values():
+                self._hashes.setdefault(content_hash(record), record['id'])
+        return self._hashes
+
+    def _file_signature(self) -> tuple | None:
+        """Return a signature of the file that changes whenever it is written, None if it is missing."""
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
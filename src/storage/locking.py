@@ -0,0 +1,29 @@
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+
+@contextmanager
+def file_lock(filename: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock for a storage file.
+
+    The lock is taken on a `<filename>.lock` file next to the storage file, so it survives the storage
+    file being replaced by an atomic write. It serializes writers across threads and processes. On
+    platforms without `fcntl` the lock is a no-op.
+
+    Args:
+        filename: Name of the storage file to lock.
+    """
+    fd = os.open(f'{filename}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
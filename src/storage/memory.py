@@ -0,0 +1,211 @@
+"""In-memory storage backend, for tests and as the reference of the backend semantics.
+
+Nothing is persisted, the data lives as long as the storage objects.
+"""
+
+import threading
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from .merge import content_hash
+from .postings import ExercisePostings
+from .records import copy_workout_record, edited_workout_record, new_exercise_names, new_workout_record
+from .schema import migrate, stamp
+
+if TYPE_CHECKING:
+    from ..models.exercise import Workout
+    from ..models.profile import Profile
+
+
+class MemoryProfileStorage:
+    """Profile storage keeping the profile in memory."""
+
+    def __init__(self) -> None:
+        """Initialize the storage class."""
+        self._data: dict | None = None
+
+    def save_profile(self, profile: 'Profile') -> None:
+        """Save the profile.
+
+        Args:
+            profile: Profile model instance.
+        """
+        self._data = stamp('profile', profile.model_dump())
+
+    def load_profile(self) -> 'Profile | None':
+        """Load the profile.
+
+        Returns:
+            Profile model instance or None if no profile was saved.
+        """
+        if self._data is None:
+            return None
+        from ..models.profile import Profile  # pylint: disable=import-outside-toplevel
+
+        return Profile(**migrate('profile', self._data))
+
+    def profile_exists(self) -> bool:
+        """Return whether a profile was saved."""
+        return self._data is not None
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Do nothing, writes are never deferred."""
+
+
+class MemoryExerciseStorage:
+    """Exercise storage keeping the exercise names in memory."""
+
+    def __init__(self) -> None:
+        """Initialize the storage class."""
+        self._names: list[str] | None = None
+        self._lock = threading.Lock()
+
+    def save_exercise(self, exercise_name: str) -> None:
+        """Save an exercise name.
+
+        Args:
+            exercise_name: Name of the exercise to save.
+        """
+        self.save_exercises([exercise_name])
+
+    def save_exercises(self, exercise_names: list[str]) -> None:
+        """Save several exercise names.
+
+        Args:
+            exercise_names: Names of the exercises to save.
+        """
+        with self._lock:
+            names = new_exercise_names(exercise_names, self._names or [])
+            if names:
+                self._names = [*(self._names or []), *names]
+
+    def load_exercises(self) -> list | None:
+        """Load the exercise names.
+
+        Returns:
+            List of exercise names or None if none were saved.
+        """
+        return list(self._names) if self._names is not None else None
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Do nothing, writes are never deferred."""
+
+
+class MemoryWorkoutStorage:
+    """Workout storage keeping the workout records in memory, indexed by id, content hash and exercise."""
+
+    def __init__(self) -> None:
+        """Initialize the storage class."""
+        self._workouts: dict[str, dict] | None = None
+        self._hashes: dict[str, str] | None = None
+        self._postings = ExercisePostings()
+        self._lock = threading.Lock()
+
+    def save_workout(self, workout: 'Workout') -> str:
+        """Save a workout.
+
+        Args:
+            workout: Workout model instance.
+
+        Returns:
+            Id of the saved workout, the id of the saved copy for a duplicate.
+        """
+        return self.save_workouts([workout])[0]
+
+    def save_workouts(self, workouts: list['Workout']) -> list[str]:
+        """Save several workouts.
+
+        Args:
+            workouts: Workout model instances.
+
+        Returns:
+            Ids of the saved workouts, the id of the saved copy for duplicates.
+        """
+        records = [new_workout_record(workout) for workout in workouts]
+        ids = []
+        with self._lock:
+            if self._workouts is None:
+                self._workouts = {}
+            hashes = self._content_index()
+            for record in records:
+                digest = content_hash(record)
+                if digest not in hashes:
+                    hashes[digest] = record['id']
+                    self._workouts[record['id']] = record
+                    self._postings.add(record)
+                ids.append(hashes[digest])
+        return ids
+
+    def update_workout(self, workout_id: str, workout: 'Workout') -> None:
+        """Replace a saved workout.
+
+        Args:
+            workout_id: Id of the workout to replace.
+            workout: Workout model instance with the new data.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
+        """
+        with self._lock:
+            workouts = self._workouts or {}
+            workouts[workout_id] = edited_workout_record(workouts[workout_id], workout)
+            self._postings.add(workouts[workout_id])
+            self._hashes = None
+
+    def delete_workout(self, workout_id: str) -> None:
+        """Delete a saved workout.
+
+        Args:
+            workout_id: Id of the workout to delete.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
+        """
+        with self._lock:
+            workouts = self._workouts or {}
+            del workouts[workout_id]
+            self._postings.remove(workout_id)
+            self._hashes = None
+
+    def load_workouts(self) -> list[dict] | None:
+        """Load copies of all workout records.
+
+        Returns:
+            List of workout data or None if no workout was saved.
+        """
+        with self._lock:
+            if self._workouts is None:
+                return None
+            return [copy_workout_record(workout) for workout in self._workouts.values()]
+
+    def get_workout(self, workout_id: str) -> dict | None:
+        """Load a copy of a single workout record, None if it does not exist."""
+        workout = (self._workouts or {}).get(workout_id)
+        return copy_workout_record(workout) if workout is not None else None
+
+    def iter_workouts(self) -> Iterator[dict]:
+        """Iterate over the workout records, in the order of `load_workouts`."""
+        yield from self.load_workouts() or []
+
+    def exercise_history(self, exercise_name: str) -> list[dict]:
+        """Return the performances of an exercise, in the order of `load_workouts`.
+
+        Args:
+            exercise_name: Name of the exercise, matched ignoring case.
+
+        Returns:
+            Performance records, see `records.exercise_performance`.
+        """
+        with self._lock:
+            return self._postings.history(exercise_name)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Do nothing, writes are never deferred."""
+
+    def _content_index(self) -> dict[str, str]:
+        """Return the content hash to id index, rebuilt after edits and deletes."""
+        if self._hashes is None:
+            self._hashes = {}
+            for record in (self._workouts or {}).values():
+                self._hashes.setdefault(content_hash(record), record['id'])
+        return self._hashes
@@ -0,0 +1,105 @@
+"""Conflict-free merge of workout histories.
+
+Histories are merged as grow-only sets of workouts: a workout is never lost by a merge. Workouts are
+identified by their id, or by a hash of their content if they were saved without a stable id, and
+competing versions of the same workout are resolved by last-writer-wins on their version. The merge
+is commutative, associative and idempotent, so histories can be merged in any order and any number
+of times.
+"""
+
+import hashlib
+import json
+from collections.abc import Iterable
+
+
+def canonical_workout(workout: dict) -> dict:
+    """Return the content identifying a workout in a canonical form.
+
+    Args:
+        workout: Workout data.
+
+    Returns:
+        Name, datetime and exercises of the workout, with exercise names lower cased and numbers
+        normalized, so that equal workouts give equal data. The datetime is cut to the minute, so that a
+        workout saved twice in quick succession gives equal data as well.
+    """
+    return {
+        'name': workout['name'].strip(),
+        'datetime': (workout.get('datetime') or '')[:16] or None,
+        'exercises': [
+            {
+                'name': exercise['name'].strip().lower(),
+                'sets': int(exercise['sets']),
+                'reps': int(exercise['reps']),
+                'weight': float(exercise['weight']) if exercise.get('weight') is not None else None,
+            }
+            for exercise in workout['exercises']
+        ],
+    }
+
+
+def content_hash(workout: dict) -> str:
+    """Return a hash of the canonical content of a workout.
+
+    Args:
+        workout: Workout data.
+
+    Returns:
+        Hex digest identifying the content of the workout.
+    """
+    canonical = canonical_workout(workout)
+    # The repr of a tuple of strings and numbers is stable and quicker to build than json
+    data = (canonical['name'], canonical['datetime'], tuple(tuple(e.values()) for e in canonical['exercises']))
+    return hashlib.sha256(repr(data).encode('utf-8')).hexdigest()[:32]
+
+
+def workout_key(workout: dict) -> str:
+    """Return the key identifying a workout across histories.
+
+    Positional ids of workouts saved without an id differ between devices, so such workouts are
+    identified by their content instead.
+    """
+    workout_id = workout.get('id')
+    return workout_id if workout_id and not workout_id.startswith('legacy-') else content_hash(workout)
+
+
+def version_key(workout: dict) -> tuple[int, str]:
+    """Return the order of competing versions of a workout, the greatest wins.
+
+    Versions are compared first, ties are broken by the content so that every device picks the same
+    winner.
+    """
+    return workout.get('version', 0), json.dumps(workout, sort_keys=True)
+
+
+def merge_workouts(*histories: Iterable[dict]) -> list[dict]:
+    """Merge workout histories.
+
+    Runs in O(n log n) for n workouts in total: a single pass keeps the winning version per key, then
+    the workouts are sorted.
+
+    Args:
+        histories: Workout data of each history.
+
+    Returns:
+        Merged workouts ordered by datetime and key. Workouts saved without a stable id get their
+        content hash as id.
+    """
+    merged: dict[str, dict] = {}
+    for history in histories:
+        for workout in history:
+            key = workout_key(workout)
+            workout = {**workout, 'id': key}
+            current = merged.get(key)
+            if current is None or version_key(workout) > version_key(current):
+                merged[key] = workout
+    return sorted(merged.values(), key=lambda workout: (workout.get('datetime') or '', workout['id']))
+
+
+def change_key(change: dict) -> tuple[int, str]:
+    """Return the order of competing sync changes of a workout, see `version_key`.
+
+    A deleted workout loses against a workout saved with the same version.
+    """
+    workout = json.dumps(change['workout'], sort_keys=True) if change['op'] == 'put' else ''
+    return change['version'], workout
@@ -0,0 +1,77 @@
+"""Posting lists of the exercises of saved workouts.
+
+A posting list holds, for an exercise name, the workouts performing the exercise and the positions
+of the exercise in them, sorted in the order of the workouts. The history of an exercise is then
+read from its posting list, in time proportional to its performances rather than to all workouts.
+The storages keeping their workouts in memory keep an `ExercisePostings` next to them, the SQLite
+backend keeps the posting lists in a table, see `sqlite_storage`.
+
+The posting lists of the file backends are not persisted: each process builds them by scanning its
+workouts on its first history query, then keeps them up to date as it saves, edits and deletes.
+Only the later queries of a process cost time proportional to the matches.
+"""
+
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+
+from .records import exercise_key, exercise_performance
+
+
+class ExercisePostings:
+    """Posting lists of the exercises of workout records, updated as workouts are saved, edited and deleted."""
+
+    def __init__(self, workouts: Iterable[dict] = ()):
+        """Index workout records.
+
+        Args:
+            workouts: Workout records, in the order of the storage.
+        """
+        # Order of every workout, kept when it is replaced
+        self._order: dict[str, int] = {}
+        self._workouts: dict[str, dict] = {}
+        # Lower cased exercise name to sorted (workout order, position) postings
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._ids: list[str] = []
+        for workout in workouts:
+            self.add(workout)
+
+    def add(self, workout: dict) -> None:
+        """Index a workout, after the indexed ones or in the place of the workout it replaces."""
+        if workout['id'] in self._order:
+            self.remove(workout['id'], keep_order=True)
+        else:
+            self._order[workout['id']] = len(self._ids)
+            self._ids.append(workout['id'])
+        order = self._order[workout['id']]
+        self._workouts[workout['id']] = workout
+        for position, exercise in enumerate(workout['exercises']):
+            insort(self._postings.setdefault(exercise_key(exercise['name']), []), (order, position))
+
+    def remove(self, workout_id: str, keep_order: bool = False) -> None:
+        """Remove a workout from the posting lists.
+
+        Args:
+            workout_id: Id of the workout, ignored if it is not indexed.
+            keep_order: Keep the place of the workout for a replacement.
+        """
+        workout = self._workouts.pop(workout_id, None)
+        if workout is None:
+            return
+        order = self._order[workout_id] if keep_order else self._order.pop(workout_id)
+        for position, exercise in enumerate(workout['exercises']):
+            postings = self._postings[exercise_key(exercise['name'])]
+            del postings[bisect_left(postings, (order, position))]
+
+    def history(self, exercise_name: str) -> list[dict]:
+        """Return the performances of an exercise, in the order of the workouts.
+
+        Args:
+            exercise_name: Name of the exercise, matched ignoring case.
+
+        Returns:
+            Performance records, see `records.exercise_performance`.
+        """
+        return [
+            exercise_performance(self._workouts[self._ids[order]], position)
+            for order, position in self._postings.get(exercise_key(exercise_name), ())
+        ]
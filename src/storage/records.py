@@ -0,0 +1,87 @@
+"""Stored records shared by all storage backends.
+
+The helpers build the records written by the storages, so every backend stores the same data for
+the same calls, see `backends`.
+"""
+
+import time
+import uuid
+from collections.abc import Iterable
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from .schema import stamp
+
+if TYPE_CHECKING:
+    from ..models.exercise import Workout
+
+
+def new_workout_record(workout: 'Workout') -> dict:
+    """Return the record of a newly saved workout, with a new id and the current schema version."""
+    return stamp('workout', {'id': uuid.uuid4().hex, **workout.model_dump()})
+
+
+def edited_workout_record(saved: dict, workout: 'Workout') -> dict:
+    """Return the record replacing a saved workout.
+
+    The workout keeps its id and original date and gets a new version, the time of the edit in
+    nanoseconds, so the latest edit wins when histories are merged.
+
+    Args:
+        saved: Record of the saved workout.
+        workout: Workout model instance with the new data.
+    """
+    return stamp(
+        'workout',
+        {
+            'id': saved['id'],
+            **workout.model_dump(),
+            'date': saved.get('date'),
+            'datetime': saved.get('datetime'),
+            'version': time.time_ns(),
+        },
+    )
+
+
+def copy_workout_record(record: dict) -> dict:
+    """Return a copy of a workout record and of its exercises, safe to change without changing the stored one."""
+    return {**record, 'exercises': [dict(exercise) for exercise in record['exercises']]}
+
+
+def new_exercise_names(exercise_names: Iterable[str], saved: Iterable[str]) -> list[str]:
+    """Return the lower cased exercise names that are not saved yet, without repeats and in order."""
+    saved = set(saved)
+    return [name for name in dict.fromkeys(name.lower() for name in exercise_names) if name not in saved]
+
+
+def exercise_key(exercise_name: str) -> str:
+    """Return the key of an exercise name in the exercise indexes, lower cased without surrounding spaces."""
+    return exercise_name.strip().lower()
+
+
+def exercise_performance(workout: dict, position: int) -> dict:
+    """Return the record of a performance of an exercise.
+
+    Args:
+        workout: Record of the workout performing the exercise.
+        position: Position of the exercise in the workout.
+
+    Returns:
+        The exercise record with the id, name and dates of the workout and the position.
+    """
+    return {
+        **workout['exercises'][position],
+        'workout_id': workout['id'],
+        'workout': workout['name'],
+        'date': workout.get('date'),
+        'datetime': workout.get('datetime'),
+        'position': position,
+    }
+
+
+def workout_timestamp(record: dict) -> float | None:
+    """Return the time a workout was performed, None if its record has no valid datetime."""
+    try:
+        return datetime.fromisoformat(record.get('datetime') or '').timestamp()
+    except ValueError:
+        return None
@@ -0,0 +1,102 @@
+"""Schema versions of stored records and their migrations.
+
+Stored workouts and profiles carry the version of the schema they were written with in a
+`schema_version` field, records written before versions were introduced have version 0. Records are
+migrated lazily when they are read, by applying the registered migrations one version at a time, so
+a schema change never requires migrating whole files at startup. Storages write records with the
+current version, and `storage.WorkoutStorage.upgrade_schema` rewrites outdated workouts in the
+background.
+
+A schema change bumps the version in `SCHEMA_VERSIONS` and registers a migration from the previous
+version:
+
+    @migration('workout', 1)
+    def _split_name(record: dict) -> dict:
+        ...
+"""
+
+from collections.abc import Callable
+
+SCHEMA_FIELD = 'schema_version'
+
+# Current schema version of each kind of record
+SCHEMA_VERSIONS = {'workout': 1, 'profile': 1}
+
+# Migrations by kind of record and the version they upgrade from
+_MIGRATIONS: dict[tuple[str, int], Callable[[dict], dict]] = {}
+
+
+def migration(kind: str, version: int) -> Callable[[Callable[[dict], dict]], Callable[[dict], dict]]:
+    """Register a migration of records from a schema version to the next one.
+
+    Args:
+        kind: Kind of record, a key of `SCHEMA_VERSIONS`.
+        version: Version the migration upgrades from.
+
+    Returns:
+        Decorator registering a function that takes a record and returns the upgraded record. The
+        function must not modify the record it is given.
+    """
+
+    def register(func: Callable[[dict], dict]) -> Callable[[dict], dict]:
+        _MIGRATIONS[(kind, version)] = func
+        return func
+
+    return register
+
+
+def is_current(kind: str, record: dict) -> bool:
+    """Return whether a record has the current schema version, or a newer one."""
+    return record.get(SCHEMA_FIELD, 0) >= SCHEMA_VERSIONS[kind]
+
+
+def migrate(kind: str, record: dict) -> dict:
+    """Upgrade a record to the current schema version.
+
+    Records of the current version are returned as is, so reading current data costs a single lookup
+    per record. Records written by a newer version of the app are returned unchanged as well.
+
+    Args:
+        kind: Kind of record, a key of `SCHEMA_VERSIONS`.
+        record: Stored record.
+
+    Returns:
+        The record with the current schema version.
+
+    Raises:
+        ValueError: If a migration of the record is missing.
+    """
+    version = record.get(SCHEMA_FIELD, 0)
+    current = SCHEMA_VERSIONS[kind]
+    while version < current:
+        try:
+            func = _MIGRATIONS[(kind, version)]
+        except KeyError:
+            raise ValueError(f'No migration of {kind} records from schema version {version}') from None
+        record = func(record)
+        version += 1
+        record[SCHEMA_FIELD] = version
+    return record
+
+
+def stamp(kind: str, record: dict) -> dict:
+    """Set the current schema version on a record written from a model and return it."""
+    record[SCHEMA_FIELD] = SCHEMA_VERSIONS[kind]
+    return record
+
+
+@migration('workout', 0)
+def _fill_workout_defaults(record: dict) -> dict:
+    """Fill in the optional fields, which early workouts could leave out."""
+    record = {**record, 'exercises': [{'weight': None, **exercise} for exercise in record.get('exercises', [])]}
+    for key in ('date', 'datetime', 'notes'):
+        record.setdefault(key, None)
+    if record['date'] is None and record['datetime']:
+        record['date'] = record['datetime'][:10]
+    return record
+
+
+@migration('profile', 0)
+def _version_profile(record: dict) -> dict:
+    """Version 1 only adds the schema version, the fields of a profile are unchanged."""
+    return dict(record)
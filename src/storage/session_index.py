@@ -0,0 +1,188 @@
+"""Index of the last sessions of every workout, for repeating a workout.
+
+The recent sessions of each workout name, and the last performance of each exercise, are kept in
+memory, so repeating a workout or showing how an exercise was last performed never reads the workout
+history: it is loaded once, on the first lookup, and saved workouts are added as they are saved.
+The index also suggests the next session of a workout, progressing the exercises whose recent
+performances did not go backwards, see `progression`.
+"""
+
+import threading
+from bisect import insort
+from typing import TYPE_CHECKING
+
+from .records import exercise_key, workout_timestamp
+
+if TYPE_CHECKING:
+    from ..models.exercise import Workout
+    from .backends import WorkoutBackend
+
+# Sessions kept per workout name
+HISTORY = 5
+
+# Weight added to a progressed exercise, relative to its weight and rounded to the smallest plates in kg
+WEIGHT_STEP = 0.025
+WEIGHT_ROUNDING = 0.5
+
+
+def progression(performances: list[dict]) -> dict:
+    """Return the suggested next performance of an exercise.
+
+    An exercise performed at least as heavy, and for at least as many sets and reps, as the time before
+    is progressed: by `WEIGHT_STEP` of its weight, rounded to `WEIGHT_ROUNDING` kg and at least that, or
+    by one rep if it is done without weight. An exercise that went backwards, or was performed only
+    once, is repeated as last performed.
+
+    Args:
+        performances: Exercise records of the recent performances of the exercise, oldest first.
+
+    Returns:
+        Exercise record of the next performance.
+    """
+    last = dict(performances[-1])
+    if len(performances) < 2:
+        return last
+    previous = performances[-2]
+    if (
+        (last.get('weight') or 0) < (previous.get('weight') or 0)
+        or last['sets'] < previous['sets']
+        or last['reps'] < previous['reps']
+    ):
+        return last
+    if last.get('weight') is None:
+        last['reps'] += 1
+    else:
+        step = max(WEIGHT_ROUNDING, round(last['weight'] * WEIGHT_STEP / WEIGHT_ROUNDING) * WEIGHT_ROUNDING)
+        last['weight'] += step
+    return last
+
+
+class SessionIndex:
+    """Recent sessions of the workouts of a user, by workout name, and last performances of the exercises.
+
+    Workout and exercise names are matched ignoring case. The index is safe to use from several threads, so it can
+    be loaded off the UI thread.
+    """
+
+    def __init__(self, workout_storage: 'WorkoutBackend', history: int = HISTORY):
+        """Initialize the index.
+
+        Args:
+            workout_storage: Storage of the workout history.
+            history: Number of sessions kept per workout name.
+        """
+        self.workout_storage = workout_storage
+        self.history = history
+        # Sessions of each lower cased workout name as (timestamp, order, record), oldest first
+        self._sessions: dict[str, list[tuple[float, int, dict]]] = {}
+        # Last performance of each lower cased exercise name as (timestamp, order, exercise record)
+        self._performances: dict[str, tuple[float, int, dict]] = {}
+        self._recorded = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def workout_names(self, text: str = '', k: int = 5) -> list[str]:
+        """Return the names of previous workouts containing a text, most recently performed first.
+
+        Args:
+            text: Text typed by the user, an empty text matches every workout.
+            k: Maximum number of names.
+
+        Returns:
+            Workout names, as last saved.
+        """
+        query = text.strip().lower()
+        with self._lock:
+            self._load()
+            latest = [sessions[-1] for key, sessions in self._sessions.items() if query in key]
+        latest.sort(reverse=True, key=lambda session: session[:2])
+        return [record['name'] for _, _, record in latest[:k]]
+
+    def last_session(self, name: str) -> dict | None:
+        """Return the record of the last session of a workout, None if it was never performed."""
+        with self._lock:
+            self._load()
+            sessions = self._sessions.get(name.strip().lower())
+            return sessions[-1][2] if sessions else None
+
+    def last_performance(self, exercise_name: str) -> dict | None:
+        """Return the exercise record of the last performance of an exercise, in any workout.
+
+        Args:
+            exercise_name: Name of the exercise, matched ignoring case.
+
+        Returns:
+            Exercise record, None if the exercise was never performed.
+        """
+        with self._lock:
+            self._load()
+            performance = self._performances.get(exercise_key(exercise_name))
+            return performance[2] if performance else None
+
+    def next_session(self, name: str, progress: bool = False) -> list[dict] | None:
+        """Return the exercises of the next session of a workout.
+
+        Args:
+            name: Name of the workout.
+            progress: Whether to progress the exercises following their recent performances,
+                otherwise they are repeated as last performed.
+
+        Returns:
+            Exercise records in the order of the last session, None if the workout was never performed.
+        """
+        with self._lock:
+            self._load()
+            sessions = [record for _, _, record in self._sessions.get(name.strip().lower(), [])]
+        if not sessions:
+            return None
+        if not progress:
+            return [dict(exercise) for exercise in sessions[-1]['exercises']]
+        # Performances of every exercise in the kept sessions, oldest first
+        performances: dict[str, list[dict]] = {}
+        for record in sessions:
+            for exercise_name, exercise in {exercise_key(ex['name']): ex for ex in record['exercises']}.items():
+                performances.setdefault(exercise_name, []).append(exercise)
+        return [
+            progression([*performances[exercise_key(exercise['name'])][:-1], exercise])
+            for exercise in sessions[-1]['exercises']
+        ]
+
+    def record_workout(self, workout: 'Workout | dict') -> None:
+        """Add a newly saved workout.
+
+        Args:
+            workout: Workout model instance or record.
+        """
+        record = workout if isinstance(workout, dict) else workout.model_dump()
+        with self._lock:
+            # A history loaded later already has the workout
+            if self._loaded:
+                self._record(record)
+
+    def _load(self) -> None:
+        """Load the history once. Must hold `_lock`."""
+        if not self._loaded:
+            self._loaded = True
+            for record in self.workout_storage.iter_workouts():
+                self._record(record)
+
+    def _record(self, record: dict) -> None:
+        """Add a session, dropping the oldest one of its workout beyond `history`. Must hold `_lock`.
+
+        The exercises of the session become the last performances of their names, unless the history
+        has later ones.
+        """
+        timestamp = workout_timestamp(record)
+        if timestamp is None or not record.get('exercises'):
+            return
+        sessions = self._sessions.setdefault(record['name'].strip().lower(), [])
+        # The order keeps sessions saved at the same time in the order they were saved
+        insort(sessions, (timestamp, self._recorded, record), key=lambda session: session[:2])
+        for exercise in record['exercises']:
+            key = exercise_key(exercise['name'])
+            last = self._performances.get(key)
+            if last is None or last[:2] <= (timestamp, self._recorded):
+                self._performances[key] = (timestamp, self._recorded, exercise)
+        self._recorded += 1
+        if len(sessions) > self.history:
+            del sessions[0]
@@ -0,0 +1,174 @@
+"""Journal of the workout being planned, so an unsaved session survives the app being killed.
+
+Every edit of the workout planning screen appends a small json entry to a json lines file, kept open
+between appends, so recording an edit never touches the workout history and costs a single buffered
+write. On start the journal is replayed to restore the session, and rewritten with one entry per
+non-empty input. Once the workout is saved, with a single save to the workout storage, and the save
+is persisted, the journal is discarded.
+
+Entries:
+
+- `{"op": "name", "text": ...}`: the workout name was edited.
+- `{"op": "add"}`: an empty exercise row was added after the other rows.
+- `{"op": "edit", "row": i, "field": ..., "text": ...}`: an input of the i-th row was edited.
+- `{"op": "remove", "row": i}`: the i-th row was removed.
+"""
+
+import json
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import BinaryIO
+
+from .atomic import atomic_writer
+
+# Inputs of an exercise row, in the order they are shown
+ROW_FIELDS = ('name', 'sets', 'reps', 'weight')
+
+
+def _empty_row() -> dict[str, str]:
+    """Return the input texts of an empty exercise row."""
+    return dict.fromkeys(ROW_FIELDS, '')
+
+
+class SessionJournal:
+    """Append-only journal of the inputs of the workout being planned.
+
+    The journal is meant for the UI thread. Appends are flushed to the operating system, so they
+    survive the app being killed; a durable journal also flushes them to disk.
+    """
+
+    def __init__(self, filename: str | None = None, durable: bool = False):
+        """Initialize the journal.
+
+        Args:
+            filename: Name of the journal file. If None, the session is only kept in memory.
+            durable: Flush every append to disk, surviving power loss at the cost of slower appends.
+        """
+        self.filename = filename
+        self.durable = durable
+        self._name = ''
+        self._rows: list[dict[str, str]] = []
+        self._file: BinaryIO | None = None
+        self._paused = False
+
+    def session(self) -> dict:
+        """Return the recorded session, with the workout name and the input texts of every row."""
+        return {'name': self._name, 'rows': [dict(row) for row in self._rows]}
+
+    def set_name(self, text: str) -> None:
+        """Record an edit of the workout name."""
+        if not self._paused and text != self._name:
+            self._name = text
+            self._append({'op': 'name', 'text': text})
+
+    def add_row(self) -> None:
+        """Record an empty exercise row added after the other rows."""
+        if self._paused:
+            return
+        self._rows.append(_empty_row())
+        self._append({'op': 'add'})
+
+    def edit_row(self, row: int, field: str, text: str) -> None:
+        """Record an edit of an input of a row.
+
+        Args:
+            row: Position of the row.
+            field: Name of the input, one of `ROW_FIELDS`.
+            text: New text of the input.
+        """
+        if not self._paused and self._rows[row][field] != text:
+            self._rows[row][field] = text
+            self._append({'op': 'edit', 'row': row, 'field': field, 'text': text})
+
+    def remove_row(self, row: int) -> None:
+        """Record the removal of the row at the given position."""
+        if self._paused:
+            return
+        del self._rows[row]
+        self._append({'op': 'remove', 'row': row})
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Ignore the edits made within the context, such as the edits restoring the recorded session."""
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    def restore(self) -> dict:
+        """Replay the journal file and compact it.
+
+        Returns:
+            The restored session, see `session`, empty if there is no journal.
+        """
+        self.close()
+        self._name, self._rows = '', []
+        entries = 0
+        if self.filename is not None and os.path.exists(self.filename):
+            with open(self.filename, encoding='utf-8', errors='replace') as file_:
+                for line in file_:
+                    try:
+                        self._replay(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, IndexError, TypeError):
+                        # Lines torn by a crash during an append are skipped
+                        continue
+                    entries += 1
+        snapshot = self._snapshot()
+        if self.filename is not None and entries > len(snapshot):
+            with atomic_writer(self.filename) as file_:
+                file_.writelines(json.dumps(entry) + '\n' for entry in snapshot)
+        return self.session()
+
+    def discard(self) -> None:
+        """Forget the session and remove the journal file, once the workout is saved or cleared."""
+        self.close()
+        self._name, self._rows = '', []
+        if self.filename is not None and os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _replay(self, entry: dict) -> None:
+        """Apply an entry of the journal file to the session."""
+        if entry['op'] == 'name':
+            self._name = entry['text']
+        elif entry['op'] == 'add':
+            self._rows.append(_empty_row())
+        elif entry['op'] == 'edit':
+            if entry['field'] not in ROW_FIELDS:
+                raise KeyError(entry['field'])
+            self._rows[entry['row']][entry['field']] = entry['text']
+        elif entry['op'] == 'remove':
+            del self._rows[entry['row']]
+
+    def _snapshot(self) -> list[dict]:
+        """Return the fewest entries recording the session."""
+        entries: list[dict] = [{'op': 'name', 'text': self._name}] if self._name else []
+        for idx, row in enumerate(self._rows):
+            entries.append({'op': 'add'})
+            entries.extend(
+                {'op': 'edit', 'row': idx, 'field': field, 'text': text} for field, text in row.items() if text
+            )
+        return entries
+
+    def _append(self, entry: dict) -> None:
+        """Append an entry to the journal file, opening it on the first append."""
+        if self.filename is None:
+            return
+        if self._file is None:
+            self._file = open(self.filename, 'ab+')  # noqa: SIM115  # pylint: disable=consider-using-with
+            # Terminate a line torn by a crash, so that it stays a line of its own
+            if self._file.seek(0, os.SEEK_END) > 0:
+                self._file.seek(-1, os.SEEK_END)
+                if self._file.read(1) != b'\n':
+                    self._file.write(b'\n')
+        self._file.write(json.dumps(entry).encode('utf-8') + b'\n')
+        self._file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
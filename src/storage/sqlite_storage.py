@@ -0,0 +1,318 @@
+"""SQLite storage backend.
+
+The profile, exercises and workouts of a user are kept in a single SQLite database. Workout records are
+stored as json next to their content hash, which is indexed, so saving checks for duplicates without
+loading the saved workouts, and edits and deletes only touch a single row. The exercises of the
+workouts are indexed in a table of posting lists, see `postings`, written in the same transaction as
+the workouts. The database runs in WAL mode, so reads do not block writes of other processes.
+"""
+
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from .merge import content_hash
+from .records import edited_workout_record, exercise_key, exercise_performance, new_exercise_names, new_workout_record
+from .schema import migrate, stamp
+
+if TYPE_CHECKING:
+    from ..models.exercise import Workout
+    from ..models.profile import Profile
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile (key INTEGER PRIMARY KEY CHECK (key = 0), data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS exercises (position INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS workouts (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workouts_hash ON workouts (hash);
+CREATE TABLE IF NOT EXISTS exercise_postings (
+    exercise TEXT NOT NULL,
+    workout INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (exercise, workout, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS exercise_postings_workout ON exercise_postings (workout);
+"""
+
+
+def _index_exercises(connection: sqlite3.Connection, workout: int, record: dict) -> None:
+    """Add the exercises of a workout, by its position in the workouts table, to the posting lists."""
+    connection.executemany(
+        'INSERT OR IGNORE INTO exercise_postings (exercise, workout, position) VALUES (?, ?, ?)',
+        [(exercise_key(exercise['name']), workout, idx) for idx, exercise in enumerate(record['exercises'])],
+    )
+
+
+class SqliteDatabase:
+    """Connection to a SQLite database with the storages of a user.
+
+    Attributes:
+        profile: Profile storage.
+        exercises: Exercise storage.
+        workouts: Workout storage.
+    """
+
+    def __init__(self, filename: str = 'xrcs.sqlite3'):
+        """Open the database, creating its tables if needed.
+
+        Args:
+            filename: Name of the database file.
+        """
+        self.filename = filename
+        # The connection is shared by the threads of the app and serialized by the lock
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.lock = threading.RLock()
+        with self.lock, self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            indexed = self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'exercise_postings'").fetchone()
+            self.connection.executescript(_SCHEMA)
+            # Databases created before the posting lists are indexed once
+            if indexed is None:
+                for position, data in self.connection.execute('SELECT position, data FROM workouts').fetchall():
+                    _index_exercises(self.connection, position, json.loads(data))
+        self.profile = SqliteProfileStorage(self)
+        self.exercises = SqliteExerciseStorage(self)
+        self.workouts = SqliteWorkoutStorage(self)
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self.lock:
+            self.connection.close()
+
+
+class SqliteProfileStorage:
+    """Profile storage in a SQLite database."""
+
+    def __init__(self, database: SqliteDatabase):
+        """Initialize the storage class.
+
+        Args:
+            database: Database storing the profile.
+        """
+        self.database = database
+
+    def save_profile(self, profile: 'Profile') -> None:
+        """Save the profile.
+
+        Args:
+            profile: Profile model instance.
+        """
+        data = json.dumps(stamp('profile', profile.model_dump()))
+        with self.database.lock, self.database.connection as connection:
+            connection.execute('INSERT OR REPLACE INTO profile (key, data) VALUES (0, ?)', (data,))
+
+    def load_profile(self) -> 'Profile | None':
+        """Load the profile.
+
+        Returns:
+            Profile model instance or None if no profile was saved.
+        """
+        with self.database.lock:
+            row = self.database.connection.execute('SELECT data FROM profile').fetchone()
+        if row is None:
+            return None
+        from ..models.profile import Profile  # pylint: disable=import-outside-toplevel
+
+        return Profile(**migrate('profile', json.loads(row[0])))
+
+    def profile_exists(self) -> bool:
+        """Return whether a profile was saved."""
+        with self.database.lock:
+            return self.database.connection.execute('SELECT 1 FROM profile').fetchone() is not None
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Do nothing, writes are committed right away."""
+
+
+class SqliteExerciseStorage:
+    """Exercise storage in a SQLite database."""
+
+    def __init__(self, database: SqliteDatabase):
+        """Initialize the storage class.
+
+        Args:
+            database: Database storing the exercise names.
+        """
+        self.database = database
+
+    def save_exercise(self, exercise_name: str) -> None:
+        """Save an exercise name.
+
+        Args:
+            exercise_name: Name of the exercise to save.
+        """
+        self.save_exercises([exercise_name])
+
+    def save_exercises(self, exercise_names: list[str]) -> None:
+        """Save several exercise names in a single transaction.
+
+        Args:
+            exercise_names: Names of the exercises to save.
+        """
+        names = new_exercise_names(exercise_names, ())
+        with self.database.lock, self.database.connection as connection:
+            connection.executemany('INSERT OR IGNORE INTO exercises (name) VALUES (?)', [(name,) for name in names])
+
+    def load_exercises(self) -> list | None:
+        """Load the exercise names.
+
+        Returns:
+            List of exercise names, in the order they were saved.
+        """
+        with self.database.lock:
+            rows = self.database.connection.execute('SELECT name FROM exercises ORDER BY position').fetchall()
+        return [name for (name,) in rows]
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Do nothing, writes are committed right away."""
+
+
+class SqliteWorkoutStorage:
+    """Workout storage in a SQLite database."""
+
+    def __init__(self, database: SqliteDatabase):
+        """Initialize the storage class.
+
+        Args:
+            database: Database storing the workouts.
+        """
+        self.database = database
+
+    def save_workout(self, workout: 'Workout') -> str:
+        """Save a workout.
+
+        Args:
+            workout: Workout model instance.
+
+        Returns:
+            Id of the saved workout, the id of the saved copy for a duplicate.
+        """
+        return self.save_workouts([workout])[0]
+
+    def save_workouts(self, workouts: list['Workout']) -> list[str]:
+        """Save several workouts in a single transaction.
+
+        Args:
+            workouts: Workout model instances.
+
+        Returns:
+            Ids of the saved workouts, the id of the saved copy for duplicates.
+        """
+        records = [new_workout_record(workout) for workout in workouts]
+        ids = []
+        with self.database.lock, self.database.connection as connection:
+            saved: dict[str, str] = {}
+            for record in records:
+                digest = content_hash(record)
+                if digest not in saved:
+                    row = connection.execute(
+                        'SELECT id FROM workouts WHERE hash = ? ORDER BY position LIMIT 1', (digest,)
+                    ).fetchone()
+                    if row is None:
+                        cursor = connection.execute(
+                            'INSERT INTO workouts (id, hash, data) VALUES (?, ?, ?)',
+                            (record['id'], digest, json.dumps(record)),
+                        )
+                        assert cursor.lastrowid is not None
+                        _index_exercises(connection, cursor.lastrowid, record)
+                    saved[digest] = row[0] if row is not None else record['id']
+                ids.append(saved[digest])
+        return ids
+
+    def update_workout(self, workout_id: str, workout: 'Workout') -> None:
+        """Replace a saved workout, keeping its position.
+
+        Args:
+            workout_id: Id of the workout to replace.
+            workout: Workout model instance with the new data.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
+        """
+        with self.database.lock, self.database.connection as connection:
+            saved = self._get(workout_id)
+            if saved is None:
+                raise KeyError(workout_id)
+            record = edited_workout_record(saved, workout)
+            connection.execute(
+                'UPDATE workouts SET hash = ?, data = ? WHERE id = ?',
+                (content_hash(record), json.dumps(record), workout_id),
+            )
+            (position,) = connection.execute('SELECT position FROM workouts WHERE id = ?', (workout_id,)).fetchone()
+            connection.execute('DELETE FROM exercise_postings WHERE workout = ?', (position,))
+            _index_exercises(connection, position, record)
+
+    def delete_workout(self, workout_id: str) -> None:
+        """Delete a saved workout.
+
+        Args:
+            workout_id: Id of the workout to delete.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
+        """
+        with self.database.lock, self.database.connection as connection:
+            row = connection.execute('SELECT position FROM workouts WHERE id = ?', (workout_id,)).fetchone()
+            if row is None:
+                raise KeyError(workout_id)
+            connection.execute('DELETE FROM exercise_postings WHERE workout = ?', row)
+            connection.execute('DELETE FROM workouts WHERE position = ?', row)
+
+    def load_workouts(self) -> list[dict] | None:
+        """Load all workout records.
+
+        Returns:
+            List of workout data, in the order they were saved.
+        """
+        return list(self.iter_workouts())
+
+    def get_workout(self, workout_id: str) -> dict | None:
+        """Load a single workout record, None if it does not exist."""
+        with self.database.lock:
+            return self._get(workout_id)
+
+    def iter_workouts(self) -> Iterator[dict]:
+        """Iterate over the workout records, in the order of `load_workouts`."""
+        with self.database.lock:
+            rows = self.database.connection.execute('SELECT data FROM workouts ORDER BY position').fetchall()
+        for (data,) in rows:
+            yield migrate('workout', json.loads(data))
+
+    def exercise_history(self, exercise_name: str) -> list[dict]:
+        """Return the performances of an exercise, in the order of `load_workouts`.
+
+        Only the workouts performing the exercise are read, found with the posting lists.
+
+        Args:
+            exercise_name: Name of the exercise, matched ignoring case.
+
+        Returns:
+            Performance records, see `records.exercise_performance`.
+        """
+        with self.database.lock:
+            rows = self.database.connection.execute(
+                'SELECT p.workout, p.position, w.data FROM exercise_postings p '
+                'JOIN workouts w ON w.position = p.workout WHERE p.exercise = ? ORDER BY p.workout, p.position',
+                (exercise_key(exercise_name),),
+            ).fetchall()
+        workouts: dict[int, dict] = {}
+        history = []
+        for workout, position, data in rows:
+            if workout not in workouts:
+                workouts[workout] = migrate('workout', json.loads(data))
+            history.append(exercise_performance(workouts[workout], position))
+        return history
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Do nothing, writes are committed right away."""
+
+    def _get(self, workout_id: str) -> dict | None:
+        """Load a workout record, holding the lock."""
+        row = self.database.connection.execute('SELECT data FROM workouts WHERE id = ?', (workout_id,)).fetchone()
+        return migrate('workout', json.loads(row[0])) if row is not None else None
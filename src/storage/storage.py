@@ -1,41 +1,154 @@
+import itertools
 import json
+import operator
 import os
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager
+from typing import TYPE_CHECKING, Any, TextIO
 
-from ..models.exercise import Workout
-from ..models.profile import Profile
+from .atomic import append_lines, atomic_write_json, atomic_writer
+from .locking import file_lock
+from .merge import change_key, content_hash, merge_workouts, version_key
+from .postings import ExercisePostings
+from .records import copy_workout_record, edited_workout_record, new_exercise_names, new_workout_record
+from .schema import is_current, migrate, stamp
+from .streaming import iter_json_array
+from .write_behind import WriteBehindQueue
 
+if TYPE_CHECKING:
+    # The models are only imported when needed, so the storage can be used without loading pydantic
+    from ..models.exercise import Workout
+    from ..models.profile import Profile
 
-class ProfileStorage:
+
+class _Unchanged(Exception):
+    """Raised to discard a rewrite of a file that would leave it unchanged."""
+
+
+class _QueuedStorage:
+    """Base class for storages whose writes can be deferred to a write-behind queue."""
+
+    def __init__(self, writer: WriteBehindQueue | None = None, durable: bool = False):
+        """Initialize the storage class.
+
+        Args:
+            writer: Write-behind queue persisting the writes. If None, writes are done immediately.
+            durable: Wait until writes submitted to `writer` are persisted. Concurrent durable writes
+                are committed together.
+        """
+        self.writer = writer
+        self.durable = durable
+        self._lock = threading.RLock()
+        # Latest write submitted to the write-behind queue for every key of the storage
+        self._seqs: dict[str, int] = {}
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Persist the pending writes of the storage.
+
+        Writes of other storages sharing the write-behind queue are flushed along, but not waited for.
+
+        Args:
+            timeout: Maximum number of seconds to wait.
+
+        Raises:
+            TimeoutError: If the writes did not finish in time.
+            Exception: The error raised by a failing write of the storage.
+        """
+        if self.writer is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            seqs = list(self._seqs.items())
+        for key, seq in seqs:
+            self.writer.wait(seq, None if deadline is None else max(deadline - time.monotonic(), 0), key=key)
+
+    def _write(
+        self,
+        key: str,
+        payload: Any,
+        write: Callable[[Any], None],
+        merge: Callable[[Any, Any], Any] | None = None,
+    ) -> int | None:
+        """Write the payload immediately or submit it to the write-behind queue.
+
+        Returns:
+            Sequence number of the submitted write, to be passed to `_persisted`.
+        """
+        if self.writer is None:
+            with self._lock:
+                write(payload)
+            return None
+        seq = self.writer.submit(key, payload, write, merge)
+        with self._lock:
+            self._seqs[key] = max(seq, self._seqs.get(key, 0))
+        return seq
+
+    def _persisted(self, seq: int | None) -> None:
+        """Wait until a submitted write is persisted if the storage is durable.
+
+        Must be called after leaving `_guard`.
+        """
+        if seq is not None and self.durable and self.writer is not None:
+            self.writer.wait(seq)
+
+    def _guard(self) -> AbstractContextManager:
+        """Context in which pending writes and stored data are read consistently.
+
+        Only the writes of this storage are held off, so reads of other storages sharing the
+        write-behind queue do not wait for each other or for the writer.
+        """
+        return self.writer.snapshot(*self._keys()) if self.writer is not None else self._lock
+
+    def _keys(self) -> tuple[str, ...]:
+        """Return the keys of the writes of the storage to the write-behind queue."""
+        return (self.filename,)  # type: ignore[attr-defined]
+
+    def _pending(self, key: str) -> Any | None:
+        """Return the payload not yet persisted for a key."""
+        return self.writer.pending(key) if self.writer is not None else None
+
+
+class ProfileStorage(_QueuedStorage):
     """Storage class for saving and loading profile data."""
 
-    def __init__(self, filename: str = 'profile.json'):
+    def __init__(self, filename: str = 'profile.json', writer: WriteBehindQueue | None = None, durable: bool = False):
         """Initialize the storage class.
 
         Args:
             filename: Name of json file to where profile data is stored.
+            writer: Write-behind queue persisting the writes. If None, writes are done immediately.
+            durable: Wait until writes submitted to `writer` are persisted.
         """
+        super().__init__(writer=writer, durable=durable)
         self.filename = filename
 
-    def save_profile(self, profile: Profile) -> None:
+    def save_profile(self, profile: 'Profile') -> None:
         """Save the profile data to the file.
 
         Args:
             profile: Profile model instance.
         """
-        with open(self.filename, 'w', encoding='utf-8') as file_:
-            json.dump(profile.model_dump(), file_)
+        self._persisted(self._write(self.filename, stamp('profile', profile.model_dump()), self._write_profile))
 
-    def load_profile(self) -> Profile | None:
+    def load_profile(self) -> 'Profile | None':
         """Load the profile data from the file.
 
         Returns:
             Profile model instance or None if the file does not exist.
         """
-        if not os.path.exists(self.filename):
-            return None
-        with open(self.filename, encoding='utf-8') as file_:
-            data = json.load(file_)
-            return Profile(**data)
+        with self._guard():
+            data = self._pending(self.filename)
+            if data is None:
+                if not os.path.exists(self.filename):
+                    return None
+                with open(self.filename, encoding='utf-8') as file_:
+                    data = json.load(file_)
+        from ..models.profile import Profile  # pylint: disable=import-outside-toplevel
+
+        return Profile(**migrate('profile', data))
 
     def profile_exists(self) -> bool:
         """Check if the profile file exists.
@@ -43,18 +156,35 @@ class ProfileStorage:
         Returns:
             True if the file exists, False otherwise.
         """
-        return os.path.exists(self.filename)
+        return self._pending(self.filename) is not None or os.path.exists(self.filename)
+
+    def _write_profile(self, data: dict) -> None:
+        """Write the profile data to the file."""
+        with file_lock(self.filename):
+            atomic_write_json(self.filename, data)
 
 
-class ExerciseStorage:
-    """Storage class for saving and loading exercise data."""
+class ExerciseStorage(_QueuedStorage):
+    """Storage class for saving and loading exercise data.
 
-    def __init__(self, filename: str = 'exercises.json'):
+    Saved names are merged into the stored ones under an advisory file lock, so several processes can
+    save exercises to the same file.
+    """
+
+    def __init__(
+        self,
+        filename: str = 'exercises.json',
+        writer: WriteBehindQueue | None = None,
+        durable: bool = False,
+    ):
         """Initialize the storage class.
 
         Args:
             filename: Name of json file to where exercise data is stored.
+            writer: Write-behind queue persisting the writes. If None, writes are done immediately.
+            durable: Wait until writes submitted to `writer` are persisted.
         """
+        super().__init__(writer=writer, durable=durable)
         self.filename = filename
 
     def save_exercise(self, exercise_name: str) -> None:
@@ -63,11 +193,20 @@ class ExerciseStorage:
         Args:
             exercise_name: Name of the exercise to save.
         """
-        exercises = self.load_exercises() or []
-        if exercise_name.lower() not in exercises:
-            exercises.append(exercise_name.lower())
-            with open(self.filename, 'w', encoding='utf-8') as file_:
-                json.dump(exercises, file_)
+        self.save_exercises([exercise_name])
+
+    def save_exercises(self, exercise_names: list[str]) -> None:
+        """Save several exercises with a single write.
+
+        Args:
+            exercise_names: Names of the exercises to save.
+        """
+        with self._guard():
+            names = new_exercise_names(exercise_names, self.load_exercises() or [])
+            if not names:
+                return
+            seq = self._write(self.filename, names, self._add_exercises, operator.add)
+        self._persisted(seq)
 
     def load_exercises(self) -> list | None:
         """Load exercise data.
@@ -75,43 +214,700 @@ class ExerciseStorage:
         Returns:
             List of exercise names or None if the file does not exist.
         """
+        with self._guard():
+            pending = self._pending(self.filename)
+            exercises = self._read_exercises()
+        if exercises is None and pending is None:
+            return None
+        exercises = exercises or []
+        exercises.extend(name for name in dict.fromkeys(pending or []) if name not in exercises)
+        return exercises
+
+    def _read_exercises(self) -> list | None:
+        """Read the exercise names from the file."""
         if not os.path.exists(self.filename):
             return None
         with open(self.filename, encoding='utf-8') as file_:
-            data = json.load(file_)
-        return list(data)
+            return list(json.load(file_))
+
+    def _add_exercises(self, names: list[str]) -> None:
+        """Add exercise names to the file.
+
+        The file is read again under the file lock, so names saved by other processes are kept.
+        """
+        with file_lock(self.filename):
+            exercises = self._read_exercises() or []
+            exercises.extend(name for name in dict.fromkeys(names) if name not in exercises)
+            atomic_write_json(self.filename, exercises)
+
 
+class WorkoutStorage(_QueuedStorage):
+    """Storage class for saving and loading workout data.
 
-class WorkoutStorage:
-    """Storage class for saving and loading workout data."""
+    Workouts are kept in a json array. Edits and deletes are not written into the array, they are
+    appended to a change log next to it (`<filename>.log`) as replacement and tombstone entries and
+    resolved by workout id when reading. Once the share of dead entries passes `compact_threshold`,
+    the change log is folded back into the array in a background thread.
 
-    def __init__(self, filename: str = 'workouts.json'):
+    Writes hold an advisory lock on the workout file, so several processes can share the same files.
+
+    Edited workouts carry a version. Once the workouts are synced (see `sync.SyncClient`), saved workouts
+    carry a version as well and the ids of changed workouts are appended to an outbox
+    (`<filename>.outbox`) until they are pushed.
+    """
+
+    def __init__(
+        self,
+        filename: str = 'workouts.json',
+        compact_threshold: float = 0.5,
+        compact_min_entries: int = 32,
+        writer: WriteBehindQueue | None = None,
+        durable: bool = False,
+    ):
         """Initialize the storage class.
 
         Args:
             filename: Name of json file to where workout data is stored.
+            compact_threshold: Share of dead entries at which the change log is compacted.
+            compact_min_entries: Minimum number of stored entries before compaction is considered.
+            writer: Write-behind queue persisting the writes. If None, writes are done immediately.
+            durable: Wait until writes submitted to `writer` are persisted.
         """
+        super().__init__(writer=writer, durable=durable)
         self.filename = filename
+        self.log_filename = f'{filename}.log'
+        self.outbox_filename = f'{filename}.outbox'
+        self.sync_filename = f'{filename}.sync'
+        self.compact_threshold = compact_threshold
+        self.compact_min_entries = compact_min_entries
+        self._index: dict[str, dict] | None = None
+        self._hashes: dict[str, str] | None = None
+        self._hashes_index: dict[str, dict] | None = None
+        self._postings: ExercisePostings | None = None
+        self._postings_index: dict[str, dict] | None = None
+        self._entries = 0
+        self._signature: tuple | None = None
+        self._compaction: threading.Thread | None = None
+
+    def _keys(self) -> tuple[str, ...]:
+        """Return the keys of the appended workouts and of the appended changes."""
+        return self.filename, self.log_filename
 
-    def save_workout(self, workout: Workout) -> None:
+    def save_workout(self, workout: 'Workout') -> str:
         """Save workout data.
 
         Args:
             workout: Workout model instance.
+
+        Returns:
+            Id of the saved workout.
+        """
+        return self.save_workouts([workout])[0]
+
+    def save_workouts(self, workouts: list['Workout']) -> list[str]:
+        """Save several workouts with a single write.
+
+        Saving is idempotent: a workout with the same content as a saved one, see
+        `merge.canonical_workout`, is not saved again.
+
+        Args:
+            workouts: Workout model instances.
+
+        Returns:
+            Ids of the saved workouts, the id of the saved copy for duplicates.
+        """
+        records = [new_workout_record(workout) for workout in workouts]
+        if not records:
+            return []
+        if self.tracking:
+            version = time.time_ns()
+            for record in records:
+                record['version'] = version
+        with self._guard(), self._lock:
+            index = self._load_index()
+            hashes = self._content_index(index)
+            ids = []
+            new = []
+            for record in records:
+                digest = content_hash(record)
+                if digest not in hashes:
+                    hashes[digest] = record['id']
+                    new.append(record)
+                ids.append(hashes[digest])
+            seq = None
+            if new:
+                seq = self._write(self.filename, new, self._append_workouts, operator.add)
+                index.update((record['id'], record) for record in new)
+                if self._postings is not None and self._postings_index is index:
+                    for record in new:
+                        self._postings.add(record)
+                self._track_change(index, len(new))
+        self._persisted(seq)
+        return ids
+
+    def update_workout(self, workout_id: str, workout: 'Workout') -> None:
+        """Replace a saved workout.
+
+        The replacement is appended to the change log. The workout keeps its original date and gets a
+        new version, the time of the edit in nanoseconds, so the latest edit wins when histories are
+        merged.
+
+        Args:
+            workout_id: Id of the workout to replace.
+            workout: Workout model instance with the new data.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
+        """
+        with self._guard(), self._lock:
+            index = self._load_index()
+            if workout_id not in index:
+                raise KeyError(workout_id)
+            record = edited_workout_record(index[workout_id], workout)
+            change = {'op': 'put', 'id': workout_id, 'workout': record}
+            if self.tracking:
+                change['version'] = record['version']
+            seq = self._write(self.log_filename, [change], self._append_changes, operator.add)
+            index[workout_id] = record
+            if self._postings is not None and self._postings_index is index:
+                self._postings.add(record)
+            self._track_change(index)
+            self._hashes = None
+        self._persisted(seq)
+        self._maybe_compact()
+
+    def delete_workout(self, workout_id: str) -> None:
+        """Delete a saved workout.
+
+        A tombstone for the workout is appended to the change log.
+
+        Args:
+            workout_id: Id of the workout to delete.
+
+        Raises:
+            KeyError: If no workout with the given id exists.
         """
-        workouts = self.load_workouts() or []
-        workouts.append(workout.model_dump())
-        with open(self.filename, 'w', encoding='utf-8') as file_:
-            json.dump(workouts, file_)
+        with self._guard(), self._lock:
+            index = self._load_index()
+            if workout_id not in index:
+                raise KeyError(workout_id)
+            change: dict[str, Any] = {'op': 'del', 'id': workout_id}
+            if self.tracking:
+                change['version'] = time.time_ns()
+            seq = self._write(self.log_filename, [change], self._append_changes, operator.add)
+            del index[workout_id]
+            if self._postings is not None and self._postings_index is index:
+                self._postings.remove(workout_id)
+            self._track_change(index)
+            self._hashes = None
+        self._persisted(seq)
+        self._maybe_compact()
 
     def load_workouts(self) -> list[dict] | None:
         """Load workout data.
 
+        The workouts are copies of the cached records, so changing them does not change the storage.
+
         Returns:
             List of workout data or None if the file does not exist.
         """
+        with self._guard(), self._lock:
+            index = self._load_index()
+            if not index and not os.path.exists(self.filename) and not os.path.exists(self.log_filename):
+                return None
+            return [copy_workout_record(workout) for workout in index.values()]
+
+    def get_workout(self, workout_id: str) -> dict | None:
+        """Load a single workout.
+
+        Args:
+            workout_id: Id of the workout.
+
+        Returns:
+            Copy of the workout data or None if no workout with the given id exists.
+        """
+        with self._guard(), self._lock:
+            workout = self._load_index().get(workout_id)
+        return copy_workout_record(workout) if workout is not None else None
+
+    def iter_workouts(self, chunk_size: int = 1 << 16) -> Iterator[dict]:
+        """Iterate over the saved workouts without loading the whole workout file.
+
+        The workout file is parsed incrementally, so memory use does not grow with the number of saved
+        workouts. Only the change log, which compaction keeps small, is read in full.
+
+        Args:
+            chunk_size: Number of characters read from the workout file at a time.
+
+        Yields:
+            Workout data, in the same order as returned by `load_workouts`.
+        """
+        with self._guard():
+            pending_workouts = self._pending(self.filename) or []
+            changes = self._final_changes(self._read_changes() + (self._pending(self.log_filename) or []))
+            try:
+                file_ = open(self.filename, encoding='utf-8')  # noqa: SIM115  # pylint: disable=consider-using-with
+            except FileNotFoundError:
+                file_ = None
+
+        def base() -> Iterator[dict]:
+            if file_ is None:
+                return
+            yield from self._iter_base(file_, chunk_size)
+
+        # Pending workouts and changes are shared with the queued writes, so they are copied
+        for workout in itertools.chain(base(), map(copy_workout_record, pending_workouts)):
+            if workout['id'] in changes:
+                change = changes.pop(workout['id'])
+                if change is None:
+                    continue
+                workout = copy_workout_record(change)
+            yield workout
+        yield from (copy_workout_record(workout) for workout in changes.values() if workout is not None)
+
+    def exercise_history(self, exercise_name: str) -> list[dict]:
+        """Return the performances of an exercise, in the order of `load_workouts`.
+
+        The posting lists of the exercises are kept in memory with the cached id index, see
+        `postings`. They are not saved with the workouts, so the first query of a process, or the
+        first after the workout file changed on disk, scans every workout to build them.
+
+        Args:
+            exercise_name: Name of the exercise, matched ignoring case.
+
+        Returns:
+            Performance records, see `records.exercise_performance`.
+        """
+        with self._guard(), self._lock:
+            return self._exercise_postings(self._load_index()).history(exercise_name)
+
+    def bulk_append(self, records: Iterable[dict], chunk_size: int = 1 << 16) -> int:
+        """Append many workouts to the workout file in a single transaction.
+
+        The saved workouts and the records are streamed into a new workout file, which replaces the old
+        one once all records are written, so memory use does not grow with the number of records. If
+        iterating the records raises, nothing is appended.
+
+        Records with the same content as a saved workout, or an earlier record, are skipped.
+
+        Args:
+            records: Validated workout data. Records without an id are given one.
+            chunk_size: Number of characters read from the workout file at a time.
+
+        Returns:
+            Number of appended workouts.
+        """
+        count = 0
+        version = time.time_ns() if self.tracking else None
+        outbox = []
+        with self._guard(), self._lock, file_lock(self.filename), atomic_writer(self.filename) as out:
+            # Only content hashes of the saved workouts are kept in memory
+            changes = self._final_changes(self._read_changes())
+            hashes = {content_hash(workout) for workout in changes.values() if workout is not None}
+            out.write('[')
+            separator = ''
+            if os.path.exists(self.filename):
+                file_ = open(self.filename, encoding='utf-8')  # noqa: SIM115  # pylint: disable=consider-using-with
+                for workout in self._iter_base(file_, chunk_size):
+                    if workout['id'] not in changes:
+                        hashes.add(content_hash(workout))
+                    out.write(separator + json.dumps(workout))
+                    separator = ', '
+            for record in records:
+                record = migrate('workout', record)
+                digest = content_hash(record)
+                if digest in hashes:
+                    continue
+                hashes.add(digest)
+                record.setdefault('id', uuid.uuid4().hex)
+                if version is not None:
+                    record['version'] = version
+                    outbox.append(json.dumps({'id': record['id'], 'version': version}))
+                out.write(separator + json.dumps(record))
+                separator = ', '
+                count += 1
+            out.write(']')
+            if outbox:
+                append_lines(self.outbox_filename, outbox)
+            self._index = None
+        return count
+
+    @property
+    def tracking(self) -> bool:
+        """Whether changed workouts are versioned and recorded in the outbox for syncing."""
+        return os.path.exists(self.sync_filename)
+
+    def read_outbox(self) -> tuple[list[dict], int]:
+        """Read the workouts changed since they were last pushed.
+
+        Returns:
+            Outbox entries with the id and version of every change, oldest first, and the size of the
+            read outbox to pass to `trim_outbox` once the changes are pushed.
+        """
+        with file_lock(self.filename):
+            try:
+                with open(self.outbox_filename, 'rb') as file_:
+                    data = file_.read()
+            except FileNotFoundError:
+                return [], 0
+        entries = []
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return entries, len(data)
+
+    def trim_outbox(self, size: int) -> None:
+        """Remove pushed entries from the outbox, keeping the entries appended in the meantime.
+
+        Args:
+            size: Size of the outbox returned by `read_outbox`.
+        """
+        with file_lock(self.filename):
+            try:
+                with open(self.outbox_filename, 'rb') as file_:
+                    file_.seek(size)
+                    rest = file_.read()
+            except FileNotFoundError:
+                return
+            if rest:
+                with atomic_writer(self.outbox_filename) as file_:
+                    file_.write(rest.decode('utf-8', errors='replace'))
+            else:
+                os.remove(self.outbox_filename)
+
+    def apply_changes(self, changes: list[dict], skip: Iterable[str] = ()) -> int:
+        """Apply workout changes pulled from another device.
+
+        Changes are applied if they are newer than the saved workout, so the most recent version of a
+        workout wins. Applied changes are not added to the outbox.
+
+        Args:
+            changes: Changes with op (`put` or `del`), id, version and, for `put`, the workout.
+            skip: Ids of workouts with local changes that are not pushed yet.
+
+        Returns:
+            Number of applied changes.
+        """
+        skip = set(skip)
+        entries = []
+        with self._guard(), self._lock:
+            index = self._load_index()
+            for change in changes:
+                if change['op'] == 'put':
+                    change = {**change, 'workout': migrate('workout', change['workout'])}
+                local = index.get(change['id'])
+                if change['id'] in skip or (local is not None and version_key(local) >= change_key(change)):
+                    continue
+                if change['op'] == 'put':
+                    # Log entries without a version of their own are not added to the outbox
+                    entries.append({'op': 'put', 'id': change['id'], 'workout': change['workout']})
+                    index[change['id']] = change['workout']
+                elif local is not None:
+                    entries.append({'op': 'del', 'id': change['id']})
+                    del index[change['id']]
+            if not entries:
+                return 0
+            seq = self._write(self.log_filename, entries, self._append_changes, operator.add)
+            self._index = None
+        self._persisted(seq)
+        self._maybe_compact()
+        return len(entries)
+
+    def merge(self, workouts: Iterable[dict]) -> int:
+        """Merge another workout history into the saved workouts.
+
+        Workouts missing from the saved ones are added and competing versions of a workout are
+        resolved by last-writer-wins, see `merge.merge_workouts`. The change log is folded into the
+        workout file, and writes still pending in the write-behind queue are left untouched.
+
+        Args:
+            workouts: Workout data of the other history.
+
+        Returns:
+            Number of added or replaced workouts.
+        """
+        with self._guard(), self._lock, file_lock(self.filename):
+            self._index = None
+            local = list(self._load_index(include_pending=False).values())
+            merged = merge_workouts(local, (migrate('workout', workout) for workout in workouts))
+            # Merging a history into itself gives the same workouts, so unchanged workouts are those
+            unchanged = {version_key(workout) for workout in merge_workouts(local)}
+            changed = [workout for workout in merged if version_key(workout) not in unchanged]
+            self._append_outbox([{'version': 0, **workout} for workout in changed] if self.tracking else [])
+            self._replace_base(merged)
+        return len(changed)
+
+    def deduplicate(self) -> int:
+        """Remove saved workouts with the same content as an earlier saved workout.
+
+        The change log is folded into the workout file, and writes still pending in the write-behind
+        queue are left untouched.
+
+        Returns:
+            Number of removed workouts.
+        """
+        with self._guard(), self._lock, file_lock(self.filename):
+            self._index = None
+            workouts = list(self._load_index(include_pending=False).values())
+            unique: dict[str, dict] = {}
+            for workout in workouts:
+                unique.setdefault(content_hash(workout), workout)
+            kept = {workout['id'] for workout in unique.values()}
+            removed = [workout for workout in workouts if workout['id'] not in kept]
+            if self.tracking:
+                self._append_outbox([{'id': workout['id'], 'version': time.time_ns()} for workout in removed])
+            self._replace_base(list(unique.values()))
+        return len(removed)
+
+    @property
+    def dead_ratio(self) -> float:
+        """Share of stored entries that are replaced or deleted."""
+        with self._guard(), self._lock:
+            live = len(self._load_index())
+            return 1 - live / self._entries if self._entries else 0.0
+
+    def compact(self, assign_ids: bool = False) -> None:
+        """Fold the change log into the workout file.
+
+        The live workouts are written back to the json array and the change log is removed.
+        Writes still pending in the write-behind queue are left untouched.
+
+        Args:
+            assign_ids: Give workouts saved without an id a unique id instead of their positional one.
+        """
+        with self._guard(), self._lock, file_lock(self.filename):
+            self._index = None
+            workouts = list(self._load_index(include_pending=False).values())
+            if assign_ids:
+                for workout in workouts:
+                    if workout['id'].startswith('legacy-'):
+                        workout['id'] = uuid.uuid4().hex
+            self._replace_base(workouts)
+
+    def upgrade_schema(self, chunk_size: int = 1 << 16) -> int:
+        """Rewrite the workouts saved with an outdated schema version, see `schema`.
+
+        Outdated workouts are migrated whenever they are read, the upgrade saves migrating them again on
+        every read. The workout file is streamed into a new file, so memory use does not grow with the
+        number of workouts, and it is left untouched if all workouts are current. Outdated workouts in
+        the change log are upgraded when the log is compacted.
+
+        Args:
+            chunk_size: Number of characters read from the workout file at a time.
+
+        Returns:
+            Number of upgraded workouts.
+        """
+        upgraded = 0
+        try:
+            with self._guard(), self._lock, file_lock(self.filename):
+                if not os.path.exists(self.filename):
+                    return 0
+                with open(self.filename, encoding='utf-8') as file_, atomic_writer(self.filename) as out:
+                    out.write('[')
+                    for idx, workout in enumerate(iter_json_array(file_, chunk_size=chunk_size)):
+                        if not is_current('workout', workout):
+                            workout = migrate('workout', workout)
+                            upgraded += 1
+                        out.write((', ' if idx else '') + json.dumps(workout))
+                    out.write(']')
+                    if not upgraded:
+                        raise _Unchanged
+                self._index = None
+        except _Unchanged:
+            pass
+        return upgraded
+
+    def start_schema_upgrade(self) -> threading.Thread:
+        """Run `upgrade_schema` in a background thread.
+
+        Returns:
+            The started thread.
+        """
+        thread = threading.Thread(target=self.upgrade_schema, name='workout-schema-upgrade', daemon=True)
+        thread.start()
+        return thread
+
+    def wait_for_compaction(self, timeout: float | None = None) -> None:
+        """Block until a running background compaction has finished.
+
+        Args:
+            timeout: Maximum number of seconds to wait.
+        """
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join(timeout)
+
+    def _maybe_compact(self) -> None:
+        """Start a background compaction if the dead ratio passed the threshold."""
+        if self._entries < self.compact_min_entries or self.dead_ratio < self.compact_threshold:
+            return
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(target=self.compact, name='workout-compaction', daemon=True)
+            self._compaction.start()
+
+    def _append_workouts(self, workouts: list[dict]) -> None:
+        """Append workouts to the workout file."""
+        with file_lock(self.filename):
+            self._check_signature()
+            self._append_outbox(workouts)
+            base = self._read_base()
+            base.extend(workouts)
+            atomic_write_json(self.filename, base)
+            self._signature = self._file_signature()
+
+    def _append_changes(self, changes: list[dict]) -> None:
+        """Append entries to the change log."""
+        with file_lock(self.filename):
+            self._check_signature()
+            self._append_outbox(changes)
+            append_lines(self.log_filename, [json.dumps(change) for change in changes])
+            self._signature = self._file_signature()
+
+    def _append_outbox(self, entries: list[dict]) -> None:
+        """Add the versioned workouts or changes to the outbox, before they are written.
+
+        Must be called holding the file lock. A crash after the outbox append leaves an entry for a
+        change that was never written, which is pushed as the current state of the workout.
+        """
+        versioned = [{'id': entry['id'], 'version': entry['version']} for entry in entries if 'version' in entry]
+        if versioned:
+            append_lines(self.outbox_filename, [json.dumps(entry) for entry in versioned])
+
+    def _replace_base(self, workouts: list[dict]) -> None:
+        """Replace the workout file and remove the change log, holding the file lock."""
+        atomic_write_json(self.filename, workouts)
+        if os.path.exists(self.log_filename):
+            os.remove(self.log_filename)
+        self._index = None
+
+    def _check_signature(self) -> None:
+        """Drop the cached index if another writer changed the files since it was loaded.
+
+        Must be called holding the file lock, before writing. The signature of the written files is
+        taken before the file lock is released, so a write of another process landing right after it
+        is never taken for our own. If the index was dropped, the write is not tracked by
+        `_track_change`, and the next read rebuilds the index with the workouts of the other writer.
+        """
+        if self._index is not None and self._file_signature() != self._signature:
+            self._index = None
+
+    def _track_change(self, index: dict[str, dict], entries: int = 1) -> None:
+        """Count the entries of a written change applied to the cached index."""
+        if self._index is index:
+            self._entries += entries
+
+    def _content_index(self, index: dict[str, dict]) -> dict[str, str]:
+        """Return the content hash to id index of the live workouts in an id index.
+
+        The content index is kept with the cached id index and rebuilt when the id index is, or after
+        an edit or delete.
+        """
+        if self._hashes is None or self._hashes_index is not index:
+            self._hashes = {}
+            for workout_id, workout in index.items():
+                self._hashes.setdefault(content_hash(workout), workout_id)
+            self._hashes_index = index
+        return self._hashes
+
+    def _exercise_postings(self, index: dict[str, dict]) -> ExercisePostings:
+        """Return the exercise posting lists of the live workouts in an id index.
+
+        The posting lists are kept with the cached id index, rebuilt when the id index is and updated
+        by saves, edits and deletes.
+        """
+        if self._postings is None or self._postings_index is not index:
+            self._postings = ExercisePostings(index.values())
+            self._postings_index = index
+        return self._postings
+
+    def _read_base(self) -> list[dict]:
+        """Read the workout array and fill in ids for workouts saved without one."""
         if not os.path.exists(self.filename):
-            return None
+            return []
         with open(self.filename, encoding='utf-8') as file_:
-            data = json.load(file_)
-        return data
+            workouts = [migrate('workout', workout) for workout in json.load(file_)]
+        for idx, workout in enumerate(workouts):
+            workout.setdefault('id', f'legacy-{idx}')
+        return workouts
+
+    @staticmethod
+    def _iter_base(file_: TextIO, chunk_size: int) -> Iterator[dict]:
+        """Stream the workout array from a file, closing it afterwards, and fill in missing ids."""
+        with file_:
+            for idx, workout in enumerate(iter_json_array(file_, chunk_size=chunk_size)):
+                workout = migrate('workout', workout)
+                workout.setdefault('id', f'legacy-{idx}')
+                yield workout
+
+    def _read_changes(self) -> list[dict]:
+        """Read the change log, skipping lines torn by a crash during an append."""
+        if not os.path.exists(self.log_filename):
+            return []
+        changes = []
+        with open(self.log_filename, encoding='utf-8', errors='replace') as file_:
+            for line in file_:
+                try:
+                    change = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if change['op'] == 'put':
+                    change['workout'] = migrate('workout', change['workout'])
+                changes.append(change)
+        return changes
+
+    @staticmethod
+    def _final_changes(changes: list[dict]) -> dict[str, dict | None]:
+        """Resolve change log entries to the final workout per id, None for deleted workouts.
+
+        Workouts keep their position when replaced, workouts only found in the change log are placed at
+        the end in the order they first appear.
+        """
+        final: dict[str, dict | None] = {}
+        for change in changes:
+            if change['op'] == 'put':
+                final[change['id']] = change['workout']
+            elif change['op'] == 'del':
+                final[change['id']] = None
+        return final
+
+    def _file_signature(self) -> tuple:
+        """Signature of the workout file and change log used to detect outside changes."""
+        signature: list[tuple[int, int] | None] = []
+        for filename in (self.filename, self.log_filename):
+            try:
+                stat = os.stat(filename)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _load_index(self, include_pending: bool = True) -> dict[str, dict]:
+        """Return the id index of live workouts, rebuilding it if the files changed.
+
+        Must be called within `_guard` and holding `_lock`.
+        """
+        pending_workouts = self._pending(self.filename) if include_pending else None
+        pending_changes = self._pending(self.log_filename) if include_pending else None
+        signature = self._file_signature()
+        if self._index is not None and signature == self._signature and not pending_workouts and not pending_changes:
+            return self._index
+
+        base = self._read_base() + (pending_workouts or [])
+        changes = self._read_changes() + (pending_changes or [])
+        index = {workout['id']: workout for workout in base}
+        for workout_id, workout in self._final_changes(changes).items():
+            if workout is None:
+                index.pop(workout_id, None)
+            else:
+                index[workout_id] = workout
+
+        # Only cache the index when it matches the files on disk
+        self._index = index if not pending_workouts and not pending_changes else None
+        self._entries = len(base) + len(changes)
+        self._signature = signature
+        return index
@@ -0,0 +1,80 @@
+import json
+from collections.abc import Iterator
+from typing import Any, TextIO
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(file_: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Parse a json array from a file one element at a time.
+
+    The file is read in chunks and only the element being parsed is kept in memory, so memory use is
+    bounded by the largest element instead of the size of the file.
+
+    Args:
+        file_: File object opened in text mode, positioned at the start of the array.
+        chunk_size: Number of characters read from the file at a time.
+
+    Yields:
+        The elements of the array.
+
+    Raises:
+        json.JSONDecodeError: If the file does not contain a valid json array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def read(size: int) -> bool:
+        """Append the next chunk to the buffer, dropping consumed data."""
+        nonlocal buffer, pos, eof
+        chunk = file_.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def next_token() -> str:
+        """Skip whitespace and return the next character, or '' at the end of the file."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read(chunk_size):
+                return ''
+
+    if next_token() != '[':
+        raise json.JSONDecodeError('Expecting json array', buffer, pos)
+    pos += 1
+
+    if next_token() == ']':
+        return
+    while True:
+        # Parse the next element, reading more data until it is complete. An element running up to the
+        # end of the buffer may be a truncated number, so it is only accepted once followed by more data.
+        size = chunk_size
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            read(size)
+            size *= 2
+        pos = end
+        yield element
+
+        token = next_token()
+        if token == ']':
+            return
+        if token != ',':
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        pos += 1
+        next_token()
@@ -0,0 +1,210 @@
+"""Delta sync of workouts between devices.
+
+Devices exchange only the workouts changed since their last sync. Every change carries the workout id
+and a version, the time it was made in nanoseconds, and the most recent version of a workout wins.
+
+The protocol runs over a TCP connection with one json message per line. Requests are
+`{"op": "push", "user": ..., "changes": [...]}` and `{"op": "pull", "user": ..., "since": cursor}`,
+responses carry `"ok"` and either the result or an `"error"`. The server numbers the changes it
+accepts per user, a pull returns the latest change of every workout changed after the cursor.
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from .atomic import atomic_write_json
+from .storage import WorkoutStorage
+
+# Limit of a single message, well above a batch of changes
+MAX_MESSAGE_SIZE = 1 << 24
+
+# Number of changes sent in a single push or pull message
+BATCH_SIZE = 500
+
+
+class SyncError(Exception):
+    """Raised when the sync server rejects a request."""
+
+
+async def send_message(writer: asyncio.StreamWriter, message: dict) -> None:
+    """Send a message as a json line.
+
+    Args:
+        writer: Stream to write to.
+        message: Json serializable message.
+    """
+    writer.write(json.dumps(message).encode('utf-8') + b'\n')
+    await writer.drain()
+
+
+async def receive_message(reader: asyncio.StreamReader) -> dict | None:
+    """Receive a json line message.
+
+    Args:
+        reader: Stream to read from.
+
+    Returns:
+        The message or None if the connection was closed.
+    """
+    line = await reader.readline()
+    return json.loads(line) if line else None
+
+
+@dataclass
+class SyncResult:
+    """Result of a sync.
+
+    Attributes:
+        pushed: Number of local changes sent to the server.
+        pulled: Number of remote changes applied to the local workouts.
+    """
+
+    pushed: int = 0
+    pulled: int = 0
+
+
+class SyncClient:
+    """Client syncing a workout storage with a sync server.
+
+    The first sync pushes all saved workouts and starts recording changes in the outbox of the
+    storage, later syncs only push the changes in the outbox and pull the changes made since the
+    cursor of the previous sync. The cursor is kept in `<filename>.sync` next to the workout file,
+    with a flag while the push of all saved workouts has not been accepted, so a failed first sync
+    pushes them again.
+    """
+
+    def __init__(self, workout_storage: WorkoutStorage, user: str, host: str = '127.0.0.1', port: int = 8765):
+        """Initialize the client.
+
+        Args:
+            workout_storage: Storage to sync.
+            user: Name of the user on the sync server.
+            host: Host of the sync server.
+            port: Port of the sync server.
+        """
+        self.storage = workout_storage
+        self.user = user
+        self.host = host
+        self.port = port
+
+    async def sync(self) -> SyncResult:
+        """Push local changes and pull remote changes.
+
+        Returns:
+            Number of pushed and pulled changes.
+
+        Raises:
+            SyncError: If the server rejects a request or the storage was synced for another user.
+            OSError: If the server cannot be reached.
+        """
+        self.storage.flush()
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_SIZE)
+        try:
+            state = self._load_state()
+            if state is None:
+                # Ids must be unique across devices before the workouts are shared
+                self.storage.compact(assign_ids=True)
+                # Changes are recorded in the outbox from now on, the initial push is redone until accepted
+                state = {'user': self.user, 'cursor': 0, 'initial': True}
+                atomic_write_json(self.storage.sync_filename, state)
+            entries: list[dict]
+            if state.get('initial'):
+                entries, size = [], 0
+                pushed = await self._push_all(reader, writer)
+                del state['initial']
+                atomic_write_json(self.storage.sync_filename, state)
+            else:
+                entries, size = self.storage.read_outbox()
+                pushed = await self._push_outbox(reader, writer, entries)
+
+            # Workouts changed locally while syncing are pushed next time and not overwritten
+            unpushed = {entry['id'] for entry in self.storage.read_outbox()[0][len(entries) :]}
+            pulled = 0
+            while True:
+                response = await self._request(reader, writer, {'op': 'pull', 'since': state['cursor']})
+                pulled += self.storage.apply_changes(response['changes'], skip=unpushed)
+                state['cursor'] = response['cursor']
+                if not response['more']:
+                    break
+
+            self.storage.trim_outbox(size)
+            atomic_write_json(self.storage.sync_filename, state)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        return SyncResult(pushed=pushed, pulled=pulled)
+
+    def _load_state(self) -> dict | None:
+        """Load the sync state, None if the storage was never synced."""
+        if not os.path.exists(self.storage.sync_filename):
+            return None
+        with open(self.storage.sync_filename, encoding='utf-8') as file_:
+            state = json.load(file_)
+        if state['user'] != self.user:
+            raise SyncError(f'Workouts are synced for user {state["user"]}')
+        return state
+
+    async def _push_all(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> int:
+        """Push all saved workouts."""
+        batch: list[dict] = []
+        pushed = 0
+        for workout in self.storage.iter_workouts():
+            batch.append({'op': 'put', 'id': workout['id'], 'version': workout.get('version', 0), 'workout': workout})
+            if len(batch) == BATCH_SIZE:
+                pushed += await self._push(reader, writer, batch)
+                batch = []
+        return pushed + await self._push(reader, writer, batch)
+
+    async def _push_outbox(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, entries: list[dict]
+    ) -> int:
+        """Push the current state of the workouts in the outbox."""
+        versions = {entry['id']: entry['version'] for entry in entries}
+        batch: list[dict] = []
+        pushed = 0
+        for workout_id, version in versions.items():
+            workout = self.storage.get_workout(workout_id)
+            if workout is None:
+                batch.append({'op': 'del', 'id': workout_id, 'version': version})
+            else:
+                version = workout.get('version', version)
+                batch.append({'op': 'put', 'id': workout_id, 'version': version, 'workout': workout})
+            if len(batch) == BATCH_SIZE:
+                pushed += await self._push(reader, writer, batch)
+                batch = []
+        return pushed + await self._push(reader, writer, batch)
+
+    async def _push(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, changes: list[dict]) -> int:
+        """Push a batch of changes."""
+        if not changes:
+            return 0
+        await self._request(reader, writer, {'op': 'push', 'changes': changes})
+        return len(changes)
+
+    async def _request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: dict) -> Any:
+        """Send a request for the user and return the response."""
+        await send_message(writer, {**request, 'user': self.user})
+        response = await receive_message(reader)
+        if response is None:
+            raise SyncError('Connection closed by the sync server')
+        if not response['ok']:
+            raise SyncError(response['error'])
+        return response
+
+
+def sync_workouts(workout_storage: WorkoutStorage, user: str, host: str = '127.0.0.1', port: int = 8765) -> SyncResult:
+    """Sync a workout storage with a sync server, see `SyncClient`.
+
+    Args:
+        workout_storage: Storage to sync.
+        user: Name of the user on the sync server.
+        host: Host of the sync server.
+        port: Port of the sync server.
+
+    Returns:
+        Number of pushed and pulled changes.
+    """
+    return asyncio.run(SyncClient(workout_storage, user, host=host, port=port).sync())
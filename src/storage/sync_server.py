@@ -0,0 +1,186 @@
+"""Reference sync server storing the workout changes of many users.
+
+The changes of every user are kept in memory and appended to `<user>.jsonl` in the data directory, so
+the server can be restarted without losing data. A pull only scans the changes after its cursor, so
+the cost of a sync is proportional to the number of changes, not to the size of the history.
+
+Usage:
+    python -m src.storage.sync_server --directory DIR --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+from typing import Any
+
+from .atomic import append_lines
+from .merge import change_key
+from .sync import BATCH_SIZE, MAX_MESSAGE_SIZE, send_message
+
+USER_PATTERN = re.compile(r'[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}')
+
+
+class _UserLog:
+    """Changes of a single user, numbered in the order they were accepted."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.changes: list[dict] = []
+        self.versions: dict[str, tuple[int, str]] = {}
+        self.latest: dict[str, int] = {}
+        self.lock = asyncio.Lock()
+        if os.path.exists(filename):
+            with open(filename, encoding='utf-8', errors='replace') as file_:
+                for line in file_:
+                    try:
+                        self._add(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+
+    @property
+    def cursor(self) -> int:
+        """Number of the last accepted change."""
+        return len(self.changes)
+
+    def _add(self, change: dict) -> None:
+        """Add an accepted change."""
+        self.changes.append(change)
+        self.versions[change['id']] = change_key(change)
+        self.latest[change['id']] = len(self.changes)
+
+    async def push(self, changes: list[dict]) -> int:
+        """Store the changes newer than the stored versions, return the number of accepted changes."""
+        async with self.lock:
+            accepted = []
+            versions: dict[str, tuple[int, str]] = {}
+            for change in changes:
+                if change['op'] not in ('put', 'del') or not isinstance(change['version'], int):
+                    raise ValueError(f'Invalid change for workout {change["id"]}')
+                order = change_key(change)
+                if order > versions.get(change['id'], self.versions.get(change['id'], (-1, ''))):
+                    accepted.append({key: change[key] for key in ('op', 'id', 'version', 'workout') if key in change})
+                    versions[change['id']] = order
+            if accepted:
+                await asyncio.to_thread(append_lines, self.filename, [json.dumps(change) for change in accepted])
+                for change in accepted:
+                    self._add(change)
+            return len(accepted)
+
+    def pull(self, since: int, limit: int) -> tuple[list[dict], int, bool]:
+        """Return the latest change of the workouts changed after a cursor.
+
+        Returns:
+            Up to `limit` changes, the cursor to continue from and whether more changes follow.
+        """
+        changes: list[dict] = []
+        cursor = max(since, 0)
+        while cursor < len(self.changes) and len(changes) < limit:
+            change = self.changes[cursor]
+            cursor += 1
+            # Changes replaced by a later change of the same workout are skipped
+            if self.latest[change['id']] == cursor:
+                changes.append(change)
+        return changes, cursor, cursor < len(self.changes)
+
+
+class SyncServer:
+    """Asyncio server syncing the workouts of many users, see `sync` for the protocol."""
+
+    def __init__(self, directory: str):
+        """Initialize the server.
+
+        Args:
+            directory: Directory where the changes of the users are stored.
+        """
+        self.directory = directory
+        self._logs: dict[str, _UserLog] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765) -> tuple[str, int]:
+        """Start listening for clients.
+
+        Args:
+            host: Host to listen on.
+            port: Port to listen on, a free port if 0.
+
+        Returns:
+            Host and port the server listens on.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_MESSAGE_SIZE)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        """Serve clients until cancelled."""
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    def _log(self, user: Any) -> _UserLog:
+        """Return the change log of a user."""
+        if not isinstance(user, str) or not USER_PATTERN.fullmatch(user):
+            raise ValueError(f'Invalid user {user!r}')
+        if user not in self._logs:
+            self._logs[user] = _UserLog(os.path.join(self.directory, f'{user}.jsonl'))
+        return self._logs[user]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of a client until it disconnects.
+
+        A malformed request is answered with an error, like any other failed request.
+        """
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self._respond(json.loads(line))
+                except (ValueError, KeyError, TypeError) as err:
+                    response = {'ok': False, 'error': str(err)}
+                except OSError as err:
+                    response = {'ok': False, 'error': f'Storage error: {err}'}
+                await send_message(writer, response)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request: dict) -> dict:
+        """Answer a single request."""
+        log = self._log(request['user'])
+        if request['op'] == 'push':
+            accepted = await log.push(request['changes'])
+            return {'ok': True, 'accepted': accepted, 'cursor': log.cursor}
+        if request['op'] == 'pull':
+            changes, cursor, more = log.pull(int(request['since']), int(request.get('limit', BATCH_SIZE)))
+            return {'ok': True, 'changes': changes, 'cursor': cursor, 'more': more}
+        raise ValueError(f'Unknown op {request["op"]!r}')
+
+
+def main() -> None:
+    """Run the sync server from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', default='sync-data', help='Directory where the changes are stored.')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to listen on.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on.')
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        server = SyncServer(args.directory)
+        host, port = await server.start(args.host, args.port)
+        print(f'serving on {host}:{port}', flush=True)
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
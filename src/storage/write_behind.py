@@ -0,0 +1,279 @@
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    """Pending write for a single key."""
+
+    payload: Any
+    write: Callable[[Any], None]
+    merge: Callable[[Any, Any], Any] | None = None
+    submitted: float = field(default_factory=time.monotonic)
+    seq: int = 0
+
+    def combine(self, newer: '_Job') -> '_Job':
+        """Coalesce a newer job for the same key into this one."""
+        payload = self.merge(self.payload, newer.payload) if self.merge else newer.payload
+        return _Job(payload=payload, write=newer.write, merge=newer.merge, submitted=self.submitted, seq=newer.seq)
+
+
+class WriteBehindQueue:
+    """Queue that persists storage writes on a single background thread.
+
+    Writes are submitted per key, usually a file name. A newer write for a key that is still queued is
+    coalesced into the queued one, either replacing its payload or merged with it. Queued writes are
+    flushed once the oldest of them has waited `max_delay` seconds, or when `flush` is called.
+
+    Writes submitted with `commit`, or waited for with `wait`, are flushed right away and block until they
+    are persisted. Commits arriving while the writer is busy are written together in the next batch (group
+    commit), so bursts of durable writes to the same file share a single write and fsync.
+
+    Readers hold off the writes of the keys they read with `snapshot`, so reads of other keys never
+    wait for the writer.
+    """
+
+    def __init__(self, max_delay: float = 0.5):
+        """Initialize the queue.
+
+        Args:
+            max_delay: Maximum number of seconds a write stays queued before it is flushed.
+        """
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        # Locks held while the stored data of a key is written or read with its pending payload
+        self._key_locks: dict[str, threading.RLock] = {}
+        self._queued: dict[str, _Job] = {}
+        self._inflight: dict[str, _Job] = {}
+        self._flush_requested = False
+        self._committers = 0
+        self._submitted_seq = 0
+        self._persisted_seq = 0
+        self._error: Exception | None = None
+        self._error_seq = 0
+        # Latest persisted write and latest failed write of every key, by sequence number
+        self._key_persisted: dict[str, int] = {}
+        self._key_errors: dict[str, tuple[Exception, int]] = {}
+        self._thread: threading.Thread | None = None
+
+    def submit(
+        self,
+        key: str,
+        payload: Any,
+        write: Callable[[Any], None],
+        merge: Callable[[Any, Any], Any] | None = None,
+    ) -> int:
+        """Queue a write.
+
+        Args:
+            key: Key of the write, writes with the same key are coalesced.
+            payload: Data passed to `write`.
+            write: Function persisting the payload, called on the writer thread.
+            merge: Function combining a queued payload with a newer one. If None, the newer payload
+                replaces the queued one.
+
+        Returns:
+            Sequence number of the write, to be passed to `wait`.
+        """
+        with self._cond:
+            self._submitted_seq += 1
+            job = _Job(payload=payload, write=write, merge=merge, seq=self._submitted_seq)
+            queued = self._queued.get(key)
+            self._queued[key] = queued.combine(job) if queued else job
+            self._ensure_thread()
+            self._cond.notify_all()
+            return self._submitted_seq
+
+    def wait(self, seq: int, timeout: float | None = None, key: str | None = None) -> None:
+        """Flush queued writes right away and wait until a write is persisted.
+
+        Must not be called within `snapshot`, as the writer thread may be held off there.
+
+        Args:
+            seq: Sequence number returned by `submit`.
+            timeout: Maximum number of seconds to wait.
+            key: Key of the write. If given, only the writes of the key are waited for, and failing
+                writes of other keys in the same batch are not raised.
+
+        Raises:
+            TimeoutError: If the write did not finish in time.
+            Exception: The error raised by a failing write.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._committers += 1
+            self._cond.notify_all()
+            try:
+                while (self._persisted_seq if key is None else self._key_persisted.get(key, 0)) < seq:
+                    error, error_seq = (
+                        (self._error, self._error_seq) if key is None else self._key_errors.get(key, (None, 0))
+                    )
+                    if error is not None and error_seq >= seq:
+                        raise error
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError('Write was not committed in time')
+                    self._cond.wait(remaining)
+            finally:
+                self._committers -= 1
+
+    def commit(
+        self,
+        key: str,
+        payload: Any,
+        write: Callable[[Any], None],
+        merge: Callable[[Any, Any], Any] | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        """Queue a write and wait until it is persisted.
+
+        Args:
+            key: Key of the write, writes with the same key are coalesced.
+            payload: Data passed to `write`.
+            write: Function persisting the payload, called on the writer thread.
+            merge: Function combining a queued payload with a newer one. If None, the newer payload
+                replaces the queued one.
+            timeout: Maximum number of seconds to wait.
+        """
+        self.wait(self.submit(key, payload, write, merge), timeout)
+
+    def pending(self, key: str) -> Any | None:
+        """Return the payload not yet persisted for a key.
+
+        Use within `snapshot` to read the pending payload and the stored data consistently.
+
+        Args:
+            key: Key of the write.
+
+        Returns:
+            Queued and in-flight payload for the key or None if nothing is pending.
+        """
+        with self._cond:
+            inflight = self._inflight.get(key)
+            queued = self._queued.get(key)
+        if inflight and queued:
+            return inflight.combine(queued).payload
+        job = queued or inflight
+        return job.payload if job else None
+
+    @contextmanager
+    def snapshot(self, *keys: str) -> Iterator[None]:
+        """Hold off the writes of some keys while reading their pending payloads and stored data.
+
+        Args:
+            *keys: Keys of the writes to hold off, writes of other keys go on.
+        """
+        with ExitStack() as stack:
+            # Locks are always taken in the same order, so concurrent snapshots cannot deadlock
+            for key in sorted(set(keys)):
+                stack.enter_context(self._key_lock(key))
+            yield
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Persist all queued writes and wait for them to finish.
+
+        Args:
+            timeout: Maximum number of seconds to wait.
+
+        Raises:
+            TimeoutError: If the writes did not finish in time.
+            Exception: The error raised by a failing write.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while (self._queued or self._inflight) and self._error is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError('Pending writes were not flushed in time')
+                self._cond.wait(remaining)
+            self._flush_requested = False
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _key_lock(self, key: str) -> threading.RLock:
+        """Return the lock of the stored data of a key."""
+        with self._cond:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.RLock()
+            return lock
+
+    def _ensure_thread(self) -> None:
+        """Start the writer thread if it is not running."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def _wait_for_due(self) -> None:
+        """Wait until the oldest queued write is due or a flush is requested."""
+        with self._cond:
+            while True:
+                if self._queued:
+                    oldest = min(job.submitted for job in self._queued.values())
+                    remaining = oldest + self.max_delay - time.monotonic()
+                    if self._flush_requested or self._committers or remaining <= 0:
+                        return
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+
+    def _run(self) -> None:
+        """Writer thread loop."""
+        while True:
+            self._wait_for_due()
+            with self._cond:
+                self._inflight, self._queued = self._queued, {}
+                batch_seq = self._submitted_seq
+                keys = list(self._inflight)
+            failed = False
+            for key in keys:
+                # The job leaves the in-flight writes before readers of the key see the written data
+                with self._key_lock(key):
+                    job = self._inflight[key]
+                    try:
+                        job.write(job.payload)
+                    except Exception as err:  # pylint: disable=broad-exception-caught
+                        logger.exception('Failed to write %s', key)
+                        failed = True
+                        with self._cond:
+                            self._error, self._error_seq = err, batch_seq
+                            self._key_errors[key] = (err, job.seq)
+                            # Failed writes are retried after another max_delay
+                            retry = replace(job, submitted=time.monotonic())
+                            queued = self._queued.get(key)
+                            self._queued[key] = retry.combine(queued) if queued else retry
+                    else:
+                        with self._cond:
+                            self._key_persisted[key] = job.seq
+                            self._key_errors.pop(key, None)
+                    with self._cond:
+                        del self._inflight[key]
+            with self._cond:
+                if failed:
+                    self._flush_requested = False
+                else:
+                    self._persisted_seq = batch_seq
+                self._cond.notify_all()
+
+
+_default_queue: WriteBehindQueue | None = None
+_default_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteBehindQueue:
+    """Return the write-behind queue shared by the app screens."""
+    global _default_queue  # pylint: disable=global-statement
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = WriteBehindQueue()
+        return _default_queue
@@ -64,3 +64,30 @@ def test_workout_dates_auto_population():
 
     assert workout.date == date.today().isoformat()
     assert isinstance(datetime.fromisoformat(workout.datetime), datetime)
+
+
+def test_workout_keeps_given_dates():
+    """Test that given date and datetime fields are kept."""
+    exercises = [Exercise(name='Squat', sets=3, reps=10)]
+    workout = Workout(exercises=exercises, name='Test Workout', datetime='2024-01-02T10:00:00')
+
+    assert workout.date == '2024-01-02'
+    assert workout.datetime == '2024-01-02T10:00:00'
+
+
+def test_workout_keeps_given_date_and_datetime():
+    """Test that a given date is kept even if it differs from the date of the datetime."""
+    exercises = [Exercise(name='Squat', sets=3, reps=10)]
+    workout = Workout(exercises=exercises, name='Test Workout', date='2024-01-02', datetime='2024-01-03T10:00:00')
+
+    assert workout.date == '2024-01-02'
+    assert workout.datetime == '2024-01-03T10:00:00'
+
+
+def test_workout_keeps_given_date_without_datetime():
+    """Test that a given date is kept and a missing datetime is set to the current time."""
+    exercises = [Exercise(name='Squat', sets=3, reps=10)]
+    workout = Workout(exercises=exercises, name='Test Workout', date='2024-01-02')
+
+    assert workout.date == '2024-01-02'
+    assert datetime.fromisoformat(workout.datetime).date() == date.today()
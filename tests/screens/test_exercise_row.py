@@ -0,0 +1,95 @@
+from unittest.mock import Mock
+
+import pytest
+
+from src.models.exercise import Exercise
+from src.screens.exercise_row import INVALID_COLOR, VALID_COLOR, ExerciseRow
+
+
+@pytest.fixture
+def row():
+    """Exercise row fixture with empty mock inputs."""
+    inputs = {
+        field: Mock(text='', hint_text='', focus=False, background_color=VALID_COLOR) for field in ExerciseRow.FIELDS
+    }
+    return ExerciseRow(Mock(), **inputs)
+
+
+def edit(row, **texts):
+    """Set the texts of inputs of a row, validating it as a bound text event would."""
+    for field, text in texts.items():
+        getattr(row, field).text = text
+        row._on_text(getattr(row, field), text)
+
+
+def test_row_binds_inputs(row):
+    """Test that the row validates itself on edits of every input."""
+    for field in row.inputs:
+        field.bind.assert_called_once_with(text=row._on_text)
+
+
+def test_blank_row(row):
+    """Test that a blank row has no exercise and is not tinted."""
+    assert row.exercise is None
+    assert row.invalid == {'sets', 'reps'}
+    assert all(field.background_color == VALID_COLOR for field in row.inputs)
+
+
+def test_row_validated_on_edit(row):
+    """Test that the exercise of a row is cached once its inputs are valid."""
+    edit(row, name='Squat', sets='3')
+
+    assert row.exercise is None
+    assert row.invalid == {'reps'}
+    assert row.reps.background_color == INVALID_COLOR
+    assert row.sets.background_color == VALID_COLOR
+
+    edit(row, reps='5')
+
+    assert row.exercise == Exercise(name='Squat', sets=3, reps=5)
+    assert row.invalid == set()
+    assert row.reps.background_color == VALID_COLOR
+
+    edit(row, weight='102.5')
+
+    assert row.exercise == Exercise(name='Squat', sets=3, reps=5, weight=102.5)
+
+
+def test_row_rejects_model_errors(row):
+    """Test that values rejected by the exercise model mark their inputs invalid."""
+    edit(row, name='Squat', sets='0', reps='5', weight='-1')
+
+    assert row.exercise is None
+    assert row.invalid == {'sets', 'weight'}
+    assert [field.background_color for field in row.inputs] == [VALID_COLOR, INVALID_COLOR, VALID_COLOR, INVALID_COLOR]
+
+
+def test_row_without_name(row):
+    """Test that a row without a name has no exercise but is valid with valid numbers."""
+    edit(row, sets='3', reps='5')
+
+    assert (row.exercise, row.invalid) == (None, set())
+
+
+def test_fill_and_reset(row):
+    """Test filling a row from an exercise record and resetting it for reuse."""
+    row.fill({'name': 'squat', 'sets': 3, 'reps': 5, 'weight': 100.0})
+    row.show_hints(('Last: 3', 'Last: 5', 'Last: 100 kg'))
+
+    assert [field.text for field in row.inputs] == ['squat', '3', '5', '100']
+
+    row.reset()
+
+    assert [field.text for field in row.inputs] == ['', '', '', '']
+    assert [field.hint_text for field in row.inputs[1:]] == ['Sets', 'Reps', 'Weight (kg)']
+
+
+def test_row_reports_edits(row):
+    """Test that edits are reported with the name of the edited input."""
+    row.on_edit = Mock()
+
+    edit(row, reps='5')
+    row.set_texts({'name': 'Squat', 'sets': '3'})
+
+    row.on_edit.assert_called_once_with(row, 'reps', '5')
+    assert [field.text for field in row.inputs] == ['Squat', '3', '', '']
@@ -20,13 +20,13 @@ def screen_manager():
 @pytest.fixture
 def main_screen():
     """MainScreen fixture."""
-    # Patch ProfileStorage to return None for load_profile
-    with patch('src.screens.main_screen.ProfileStorage') as mock_profile_storage:
+    # Patch the storages to return None for load_profile
+    with patch('src.screens.main_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
         mock_storage.load_profile.return_value = None
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
-        # Create a MainScreen instance with patched ProfileStorage
+        # Create a MainScreen instance with patched storages
         screen = MainScreen(name='main')
 
         # Set up the ids dictionary with a welcome_label
@@ -38,13 +38,13 @@ def main_screen():
 
 def test_default_widgets():
     """Test default widget."""
-    # Patch ProfileStorage to return None for load_profile
-    with patch('src.screens.main_screen.ProfileStorage') as mock_profile_storage:
+    # Patch the storages to return None for load_profile
+    with patch('src.screens.main_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
         mock_storage.load_profile.return_value = None
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
-        # Create a MainScreen instance with patched ProfileStorage
+        # Create a MainScreen instance with patched storages
         ms = MainScreen(name='main')
 
         # Set up the ids dictionary with a welcome_label
@@ -60,11 +60,11 @@ def test_profile_data_loading(main_screen):
     # Setup mock profile data
     profile = Profile(name='Test User', dob='1990-01-01', weight=70)
 
-    # Patch ProfileStorage to return our profile
-    with patch('src.screens.main_screen.ProfileStorage') as mock_profile_storage:
+    # Patch the storages to return our profile
+    with patch('src.screens.main_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
         mock_storage.load_profile.return_value = profile
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
         # Re-initialize the main screen to trigger profile loading with our mocked profile
         main_screen.__init__(name='main')
@@ -75,10 +75,10 @@ def test_profile_data_loading(main_screen):
 
 def test_no_profile_data(main_screen):
     """Test behavior when no profile data exists."""
-    with patch('src.screens.main_screen.ProfileStorage') as mock_profile_storage:
+    with patch('src.screens.main_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
         mock_storage.load_profile.return_value = None
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
         main_screen.__init__(name='main')
 
@@ -0,0 +1,69 @@
+from unittest.mock import Mock, patch
+
+from src.screens.pool import WidgetPool
+
+
+def test_acquire_builds_when_empty():
+    """Test that widgets are built only when no free widget is left."""
+    factory = Mock(side_effect=lambda: Mock())
+    pool = WidgetPool(factory)
+
+    first = pool.acquire()
+    pool.release(first)
+
+    assert pool.acquire() is first
+    assert pool.acquire() is not first
+    assert factory.call_count == 2
+
+
+def test_release_resets_widget():
+    """Test that released widgets are reset before they are reused."""
+    reset = Mock()
+    pool = WidgetPool(Mock, reset=reset)
+    widget = pool.acquire()
+
+    pool.release(widget)
+
+    reset.assert_called_once_with(widget)
+
+
+def test_release_beyond_max_size():
+    """Test that released widgets beyond the maximum size are dropped."""
+    pool = WidgetPool(Mock, max_size=2)
+
+    for widget in [pool.acquire() for _ in range(3)]:
+        pool.release(widget)
+
+    assert len(pool) == 2
+
+
+def test_prewarm():
+    """Test that prewarming builds the missing free widgets."""
+    factory = Mock(side_effect=lambda: Mock())
+    pool = WidgetPool(factory, max_size=10)
+    pool.release(pool.acquire())
+
+    pool.prewarm(5)
+    pool.prewarm(20)
+
+    assert len(pool) == 10
+    assert factory.call_count == 10
+
+
+def test_prewarm_idle():
+    """Test that idle prewarming builds a few widgets per frame until the pool is warm."""
+    pool = WidgetPool(Mock)
+
+    with patch('src.screens.pool.Clock') as mock_clock:
+        pool.prewarm_idle(5, per_frame=2)
+        build = mock_clock.schedule_interval.call_args[0][0]
+
+        assert len(pool) == 0
+        assert build(0) is True
+        assert len(pool) == 2
+        assert build(0) is True
+        assert build(0) is False
+        assert len(pool) == 5
+
+        pool.prewarm_idle(6)
+        mock_clock.schedule_interval.return_value.cancel.assert_not_called()
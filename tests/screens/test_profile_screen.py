@@ -21,12 +21,12 @@ def screen_manager():
 @pytest.fixture
 def profile_screen():
     """ProfileScreen fixture."""
-    # Patch ProfileStorage
-    with patch('src.screens.profile_screen.ProfileStorage') as mock_profile_storage:
+    # Patch the storages
+    with patch('src.screens.profile_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
-        # Create a ProfileScreen instance with patched ProfileStorage
+        # Create a ProfileScreen instance with patched storages
         screen = ProfileScreen(name='profile')
 
         # Set up the ids dictionary with required inputs
@@ -40,12 +40,12 @@ def profile_screen():
 
 def test_default_widgets():
     """Test default widget initialization."""
-    # Patch ProfileStorage
-    with patch('src.screens.profile_screen.ProfileStorage') as mock_profile_storage:
+    # Patch the storages
+    with patch('src.screens.profile_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
-        # Create a ProfileScreen instance with patched ProfileStorage
+        # Create a ProfileScreen instance with patched storages
         ps = ProfileScreen(name='profile')
 
         # Set up the ids dictionary with required inputs
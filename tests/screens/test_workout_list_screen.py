@@ -19,16 +19,16 @@ def screen_manager():
 @pytest.fixture
 def workout_list_screen():
     """WorkoutListScreen fixture."""
-    # Patch WorkoutStorage
-    with patch('src.screens.workout_list_screen.WorkoutStorage') as mock_workout_storage:
+    # Patch the storages
+    with patch('src.screens.workout_list_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
         # Return None instead of empty list to match the actual implementation
         mock_storage.load_workouts.return_value = None
-        mock_workout_storage.return_value = mock_storage
+        mock_get_storages.return_value.workouts = mock_storage
 
         # Patch refresh_workouts to prevent it from being called during initialization
         with patch('src.screens.workout_list_screen.WorkoutListScreen.refresh_workouts'):
-            # Create a WorkoutListScreen instance with patched WorkoutStorage
+            # Create a WorkoutListScreen instance with patched storages
             screen = WorkoutListScreen(name='workout_list')
 
             # Set up the ids dictionary with required widgets
@@ -40,16 +40,16 @@ def workout_list_screen():
 
 def test_default_widgets():
     """Test default widget initialization."""
-    # Patch WorkoutStorage
-    with patch('src.screens.workout_list_screen.WorkoutStorage') as mock_workout_storage:
+    # Patch the storages
+    with patch('src.screens.workout_list_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
         # Return None instead of empty list to match the actual implementation
         mock_storage.load_workouts.return_value = None
-        mock_workout_storage.return_value = mock_storage
+        mock_get_storages.return_value.workouts = mock_storage
 
         # Patch refresh_workouts to prevent it from being called during initialization
         with patch('src.screens.workout_list_screen.WorkoutListScreen.refresh_workouts'):
-            # Create a WorkoutListScreen instance with patched WorkoutStorage
+            # Create a WorkoutListScreen instance with patched storages
             wls = WorkoutListScreen(name='workout_list')
 
             # Set up the ids dictionary with required widgets
@@ -1,4 +1,6 @@
-from unittest.mock import Mock, patch
+import threading
+from concurrent.futures import Future
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 from kivy.uix.boxlayout import BoxLayout
@@ -13,8 +15,18 @@ with (
     patch('kivy.uix.screenmanager.Screen.__init__', return_value=None),
     patch('kivy.uix.textinput.TextInput.__init__', return_value=None),
 ):
-    from src.models.exercise import Exercise, Workout
-    from src.screens.workout_planning_screen import ExerciseInput, WorkoutPlanningScreen
+    from src.models.exercise import Exercise
+    from src.screens.exercise_row import VALID_COLOR, ExerciseRow
+    from src.screens.pool import WidgetPool
+    from src.screens.workout_planning_screen import (
+        _LOOKUPS,
+        SAVE_TIMEOUT,
+        SUGGESTION_DELAY,
+        ExerciseInput,
+        WorkoutPlanningScreen,
+    )
+    from src.storage.exercise_index import ExerciseIndex
+    from src.storage.session_journal import SessionJournal
 
 
 # Create a custom dictionary class that supports both attribute and dictionary access
@@ -45,10 +57,9 @@ def screen_manager():
 @pytest.fixture
 def workout_planning_screen():
     """WorkoutPlanningScreen fixture."""
-    # Patch ExerciseStorage and WorkoutStorage
+    # Patch the storages
     with (
-        patch('src.screens.workout_planning_screen.ExerciseStorage') as mock_exercise_storage,
-        patch('src.screens.workout_planning_screen.WorkoutStorage') as mock_workout_storage,
+        patch('src.screens.workout_planning_screen.get_storages') as mock_get_storages,
         patch('src.screens.workout_planning_screen.BoxLayout'),
         patch('src.screens.workout_planning_screen.Button'),
         patch('src.screens.workout_planning_screen.TextInput'),
@@ -57,43 +68,100 @@ def workout_planning_screen():
         # Mock storage instances
         mock_exercise_storage_instance = Mock()
         mock_exercise_storage_instance.load_exercises.return_value = None
-        mock_exercise_storage.return_value = mock_exercise_storage_instance
+        mock_get_storages.return_value.exercises = mock_exercise_storage_instance
 
         mock_workout_storage_instance = Mock()
-        mock_workout_storage.return_value = mock_workout_storage_instance
+        mock_get_storages.return_value.workouts = mock_workout_storage_instance
 
         # Create a WorkoutPlanningScreen instance with patched storages
         screen = Mock(spec=WorkoutPlanningScreen)
         screen.name = 'workout_planning'
         screen.exercise_storage = mock_exercise_storage_instance
         screen.workout_storage = mock_workout_storage_instance
+        screen.exercise_index = Mock()
+        screen.exercise_index.near_duplicates.return_value = []
+        screen.session_index = Mock()
+        screen.session_dropdown = None
+        screen.journal = MagicMock()
+        screen._flagged_names = set()
+        screen._saving = None
         screen.exercise_rows = []
+        screen.row_pool = WidgetPool(
+            lambda s=screen: WorkoutPlanningScreen._build_row(s), reset=WorkoutPlanningScreen._reset_row
+        )
 
         # Set up the ids dictionary with required widgets using AttrDict
-        screen.ids = AttrDict({'exercise_layout': Mock(), 'workout_name': Mock(text='Test Workout')})
+        screen.ids = AttrDict(
+            {'exercise_layout': Mock(), 'workout_name': Mock(text='Test Workout'), 'progress': Mock(state='normal')}
+        )
 
         # Add the methods we need to test - using lambda to properly bind 'self'
         screen.add_exercise_input = lambda instance, s=screen: WorkoutPlanningScreen.add_exercise_input(s, instance)
         screen.remove_row = lambda row, s=screen: WorkoutPlanningScreen.remove_row(s, row)
         screen.save_workout = lambda instance, s=screen: WorkoutPlanningScreen.save_workout(s, instance)
+        screen._find_misspellings = lambda names, s=screen: WorkoutPlanningScreen._find_misspellings(s, names)
+        screen._on_misspellings = lambda *args, s=screen: WorkoutPlanningScreen._on_misspellings(s, *args)
+        screen._save = lambda workout_name, exercises, s=screen: WorkoutPlanningScreen._save(s, workout_name, exercises)
+        screen._write_workout = lambda workout, names, s=screen: WorkoutPlanningScreen._write_workout(s, workout, names)
+        screen._on_saved = lambda *args, s=screen: WorkoutPlanningScreen._on_saved(s, *args)
         screen._show_error_popup = lambda message, s=screen: WorkoutPlanningScreen._show_error_popup(s, message)
         screen.clear_inputs = lambda s=screen: WorkoutPlanningScreen.clear_inputs(s)
+        screen.show_previous_workouts = lambda instance, s=screen: WorkoutPlanningScreen.show_previous_workouts(
+            s, instance
+        )
+        screen._on_previous_workout = lambda btn, s=screen: WorkoutPlanningScreen._on_previous_workout(s, btn)
+        screen.repeat_session = lambda name, s=screen: WorkoutPlanningScreen.repeat_session(s, name)
+        screen._restore_session = lambda s=screen: WorkoutPlanningScreen._restore_session(s)
+        screen._on_name_text = lambda instance, value, s=screen: WorkoutPlanningScreen._on_name_text(s, instance, value)
+        screen._on_row_edit = lambda row, field, text, s=screen: WorkoutPlanningScreen._on_row_edit(s, row, field, text)
+        screen._show_last_performance = lambda row, instance, exercise, s=screen: (
+            WorkoutPlanningScreen._show_last_performance(s, row, instance, exercise)
+        )
 
         return screen
 
 
+def run_lookups(clock):
+    """Run the lookup thread and the callbacks it schedules on the clock, until no more are scheduled."""
+    done = 0
+    while True:
+        _LOOKUPS.submit(int).result()
+        calls = clock.schedule_once.call_args_list[done:]
+        if not calls:
+            return
+        done += len(calls)
+        for call in calls:
+            call.args[0](0)
+
+
+def make_row(name='', sets='', reps='', weight=''):
+    """Return an exercise row with mock inputs of the given texts."""
+    inputs = {
+        field: Mock(spec=TextInput, text=text, hint_text='', focus=False, background_color=VALID_COLOR)
+        for field, text in (('name', name), ('sets', sets), ('reps', reps), ('weight', weight))
+    }
+    return ExerciseRow(Mock(spec=BoxLayout), **inputs)
+
+
 @pytest.fixture
 def exercise_input():
     """ExerciseInput fixture."""
-    with patch('src.screens.workout_planning_screen.ExerciseStorage') as mock_exercise_storage:
+    with patch('src.screens.workout_planning_screen.get_storages') as mock_get_storages:
         mock_storage = Mock()
         mock_storage.load_exercises.return_value = ['Squat', 'Bench Press', 'Deadlift']
-        mock_exercise_storage.return_value = mock_storage
+        mock_get_storages.return_value.exercises = mock_storage
 
         # Create a mock ExerciseInput instead of a real one
         input_mock = Mock(spec=ExerciseInput)
         input_mock.exercise_storage = mock_storage
+        input_mock.exercise_index = ExerciseIndex(mock_storage)
         input_mock.dropdown = None
+        input_mock.suggestion_buttons = []
+        input_mock._shown = 0
+        input_mock._dropdown_open = False
+        input_mock._pending = None
+        input_mock._generation = 0
+        input_mock._selected = None
         input_mock.text = ''
         input_mock.focus = False
         input_mock.multiline = False
@@ -104,7 +172,16 @@ def exercise_input():
         # Add the methods we need to test - using lambda to properly bind 'self'
         input_mock._create_dropdown = lambda s=input_mock: ExerciseInput._create_dropdown(s)
         input_mock._update_dropdown = lambda text='', s=input_mock: ExerciseInput._update_dropdown(s, text)
+        input_mock._cancel_lookup = lambda s=input_mock: ExerciseInput._cancel_lookup(s)
+        input_mock._lookup = lambda text, generation, dt=0, s=input_mock: ExerciseInput._lookup(s, text, generation, dt)
+        input_mock._apply_suggestions = lambda generation, future, dt=0, s=input_mock: ExerciseInput._apply_suggestions(
+            s, generation, future, dt
+        )
+        input_mock._find_suggestions = lambda text, s=input_mock: ExerciseInput._find_suggestions(s, text)
+        input_mock._show_suggestions = lambda suggestions, s=input_mock: ExerciseInput._show_suggestions(s, suggestions)
         input_mock._on_text = lambda instance=None, value='', s=input_mock: ExerciseInput._on_text(s, instance, value)
+        input_mock._on_suggestion = lambda btn, s=input_mock: ExerciseInput._on_suggestion(s, btn)
+        input_mock._on_dismiss = lambda dropdown=None, s=input_mock: ExerciseInput._on_dismiss(s, dropdown)
         input_mock._select_exercise = lambda exercise='', s=input_mock: ExerciseInput._select_exercise(s, exercise)
 
         return input_mock
@@ -131,36 +208,29 @@ def test_add_exercise_input(workout_planning_screen):
     # Mock the exercise_layout
     workout_planning_screen.ids.exercise_layout = Mock()
 
-    # Mock BoxLayout and its children
     with (
         patch('src.screens.workout_planning_screen.BoxLayout') as mock_box,
-        patch('src.screens.workout_planning_screen.ExerciseInput'),
-        patch('src.screens.workout_planning_screen.TextInput'),
+        patch('src.screens.workout_planning_screen.ExerciseInput') as mock_exercise_input,
+        patch('src.screens.workout_planning_screen.TextInput') as mock_text_input,
         patch('src.screens.workout_planning_screen.Button'),
     ):
-        # Set up the mock BoxLayout to be returned
-        mock_box_instance = Mock()
-        mock_box_instance.orientation = 'horizontal'
-        mock_box_instance.size_hint_y = None
-        mock_box_instance.height = 40
-        mock_box_instance.children = [
-            Mock(spec=Button),  # Remove button
-            Mock(spec=TextInput),  # Weight input
-            Mock(spec=TextInput),  # Reps input
-            Mock(spec=TextInput),  # Sets input
-            Mock(spec=ExerciseInput),  # Name input
-        ]
-        mock_box.return_value = mock_box_instance
+        for mock_input in (mock_exercise_input, mock_text_input):
+            mock_input.return_value.text = ''
+            mock_input.return_value.background_color = VALID_COLOR
 
         # Call add_exercise_input
         workout_planning_screen.add_exercise_input(None)
 
         # Verify that a new row was added to exercise_rows
         assert len(workout_planning_screen.exercise_rows) == 1
-        assert workout_planning_screen.exercise_rows[0] == mock_box_instance
+        row = workout_planning_screen.exercise_rows[0]
+        assert row.widget is mock_box.return_value
+        assert row.name is mock_exercise_input.return_value
+        assert row.weight is mock_text_input.return_value
+        assert (row.exercise, row.invalid) == (None, {'sets', 'reps'})
 
         # Verify that add_widget was called on exercise_layout
-        workout_planning_screen.ids.exercise_layout.add_widget.assert_called_once_with(mock_box_instance)
+        workout_planning_screen.ids.exercise_layout.add_widget.assert_called_once_with(mock_box.return_value)
 
 
 def test_remove_row_with_multiple_rows(workout_planning_screen):
@@ -168,9 +238,9 @@ def test_remove_row_with_multiple_rows(workout_planning_screen):
     # Mock the exercise_layout
     workout_planning_screen.ids.exercise_layout = Mock()
 
-    # Create mock rows
-    row1 = Mock(spec=BoxLayout)
-    row2 = Mock(spec=BoxLayout)
+    # Create rows
+    row1 = make_row()
+    row2 = make_row()
     workout_planning_screen.exercise_rows = [row1, row2]
 
     # Remove the first row
@@ -181,7 +251,29 @@ def test_remove_row_with_multiple_rows(workout_planning_screen):
     assert workout_planning_screen.exercise_rows[0] == row2
 
     # Verify that remove_widget was called on exercise_layout
-    workout_planning_screen.ids.exercise_layout.remove_widget.assert_called_once_with(row1)
+    workout_planning_screen.ids.exercise_layout.remove_widget.assert_called_once_with(row1.widget)
+
+
+def test_removed_row_is_reused(workout_planning_screen):
+    """Test that a removed row is cleared and reused by the next added row."""
+    workout_planning_screen.ids.exercise_layout = Mock()
+    row1 = make_row('Squat', '3')
+    row1.name.focus = True
+    row1.sets.hint_text = 'Last: 3'
+    row2 = make_row()
+    workout_planning_screen.exercise_rows = [row1, row2]
+
+    workout_planning_screen.remove_row(row1)
+
+    assert (row1.name.text, row1.name.focus, row1.sets.text, row1.sets.hint_text) == ('', False, '', 'Sets')
+    assert len(workout_planning_screen.row_pool) == 1
+
+    with patch('src.screens.workout_planning_screen.BoxLayout') as mock_box:
+        workout_planning_screen.add_exercise_input(None)
+
+    mock_box.assert_not_called()
+    assert workout_planning_screen.exercise_rows == [row2, row1]
+    assert len(workout_planning_screen.row_pool) == 0
 
 
 def test_remove_row_with_single_row(workout_planning_screen):
@@ -190,7 +282,7 @@ def test_remove_row_with_single_row(workout_planning_screen):
     workout_planning_screen.ids.exercise_layout = Mock()
 
     # Add one exercise row
-    row = Mock(spec=BoxLayout)
+    row = make_row()
     workout_planning_screen.exercise_rows = [row]
 
     # Try to remove the row
@@ -209,74 +301,280 @@ def test_save_workout_success(workout_planning_screen):
     # Set up mock workout name
     workout_planning_screen.ids.workout_name.text = 'Test Workout'
 
-    # Create mock exercise rows with valid data
-    row1 = Mock(spec=BoxLayout)
-    row1.children = [
-        Mock(spec=Button),  # Remove button
-        Mock(spec=TextInput, text='100'),  # Weight
-        Mock(spec=TextInput, text='10'),  # Reps
-        Mock(spec=TextInput, text='3'),  # Sets
-        Mock(spec=TextInput, text='Squat'),  # Name
+    # Create exercise rows with valid data
+    workout_planning_screen.exercise_rows = [
+        make_row('Squat', '3', '10', '100'),
+        make_row('Bench Press', '4', '8', '80'),
     ]
 
-    row2 = Mock(spec=BoxLayout)
-    row2.children = [
-        Mock(spec=Button),  # Remove button
-        Mock(spec=TextInput, text='80'),  # Weight
-        Mock(spec=TextInput, text='8'),  # Reps
-        Mock(spec=TextInput, text='4'),  # Sets
-        Mock(spec=TextInput, text='Bench Press'),  # Name
-    ]
-
-    workout_planning_screen.exercise_rows = [row1, row2]
-
     # Mock the screen manager
     workout_planning_screen.manager = Mock()
 
-    # Mock Exercise and Workout classes
+    # Mock the Workout class
     with (
-        patch('src.screens.workout_planning_screen.Exercise') as mock_exercise,
         patch('src.screens.workout_planning_screen.Workout') as mock_workout,
+        patch('src.screens.workout_planning_screen.Clock') as mock_clock,
     ):
-        # Set up mock Exercise instances
-        mock_exercise_instance1 = Mock(spec=Exercise)
-        mock_exercise_instance1.name = 'Squat'
-        mock_exercise_instance1.sets = 3
-        mock_exercise_instance1.reps = 10
-        mock_exercise_instance1.weight = 100.0
-
-        mock_exercise_instance2 = Mock(spec=Exercise)
-        mock_exercise_instance2.name = 'Bench Press'
-        mock_exercise_instance2.sets = 4
-        mock_exercise_instance2.reps = 8
-        mock_exercise_instance2.weight = 80.0
-
-        # Set up mock Exercise class to return our instances
-        mock_exercise.side_effect = [mock_exercise_instance1, mock_exercise_instance2]
-
-        # Set up mock Workout instance
-        mock_workout_instance = Mock(spec=Workout)
-        mock_workout_instance.name = 'Test Workout'
-        mock_workout_instance.exercises = [mock_exercise_instance1, mock_exercise_instance2]
-
-        # Set up mock Workout class to return our instance
-        mock_workout.return_value = mock_workout_instance
-
-        # Call save_workout
+        # Call save_workout, the workout is saved off the UI thread once the misspelling lookup is done
         workout_planning_screen.save_workout(None)
+        workout_planning_screen.workout_storage.save_workout.assert_not_called()
+        run_lookups(mock_clock)
 
         # Verify that save_exercise was called for each exercise
         assert workout_planning_screen.exercise_storage.save_exercise.call_count == 2
         workout_planning_screen.exercise_storage.save_exercise.assert_any_call(exercise_name='Squat')
         workout_planning_screen.exercise_storage.save_exercise.assert_any_call(exercise_name='Bench Press')
 
-        # Verify that save_workout was called with the correct workout
+        # Verify that the workout was built from the exercises validated by the rows
+        mock_workout.assert_called_once_with(
+            name='Test Workout',
+            exercises=[
+                Exercise(name='Squat', sets=3, reps=10, weight=100.0),
+                Exercise(name='Bench Press', sets=4, reps=8, weight=80.0),
+            ],
+        )
+        mock_workout_instance = mock_workout.return_value
+
+        # Verify that save_workout was called with the correct workout, and waited for
         workout_planning_screen.workout_storage.save_workout.assert_called_once_with(mock_workout_instance)
+        workout_planning_screen.workout_storage.flush.assert_called_once_with(SAVE_TIMEOUT)
+
+        # Verify that the exercises of the workout are ranked for suggestions
+        workout_planning_screen.exercise_index.record_workout.assert_called_once_with(mock_workout_instance)
+        workout_planning_screen.session_index.record_workout.assert_called_once_with(mock_workout_instance)
 
         # Verify that the screen was changed to main
         assert workout_planning_screen.manager.current == 'main'
 
 
+def test_save_workout_discards_journal_once_persisted(workout_planning_screen):
+    """Test that the journal is discarded and the workout ranked only once the workout is persisted."""
+    workout_planning_screen.exercise_rows = [make_row('Squat', '3', '5')]
+    workout_planning_screen._flagged_names = {'squat'}
+    workout_planning_screen.manager = Mock(current='workout_planning')
+    workout_planning_screen._show_error_popup = Mock()
+    calls = []
+    workout_planning_screen.workout_storage.save_workout.side_effect = lambda workout: calls.append('save')
+    workout_planning_screen.workout_storage.flush.side_effect = ValueError('Unexpected write error')
+    workout_planning_screen.journal.discard.side_effect = lambda: calls.append('discard')
+    workout_planning_screen.exercise_index.record_workout.side_effect = lambda workout: calls.append('rank')
+
+    with patch('src.screens.workout_planning_screen.Clock') as mock_clock:
+        workout_planning_screen.save_workout(None)
+        run_lookups(mock_clock)
+
+    # A workout that could not be written keeps its inputs and journal, and is not ranked
+    workout_planning_screen._show_error_popup.assert_called_once()
+    assert calls == ['save']
+    assert len(workout_planning_screen.exercise_rows) == 1
+    assert workout_planning_screen.manager.current == 'workout_planning'
+    assert workout_planning_screen._saving is None
+
+    flushed = threading.Event()
+    workout_planning_screen.workout_storage.flush.side_effect = lambda timeout: (
+        calls.append('flush'),
+        flushed.wait(timeout=5),
+    )
+    with patch('src.screens.workout_planning_screen.Clock') as mock_clock:
+        workout_planning_screen.save_workout(None)
+        # The UI thread goes on while the write is waited for, and saves are ignored meanwhile
+        workout_planning_screen.save_workout(None)
+        flushed.set()
+        run_lookups(mock_clock)
+
+    assert calls == ['save', 'save', 'flush', 'rank', 'discard']
+    assert workout_planning_screen.manager.current == 'main'
+
+
+def test_save_workout_flags_misspellings(workout_planning_screen):
+    """Test that new exercise names close to saved ones are flagged once before they are saved."""
+    workout_planning_screen.ids.workout_name.text = 'Test Workout'
+    workout_planning_screen.exercise_rows = [make_row('Squta', '3', '5')]
+    workout_planning_screen.manager = Mock()
+    workout_planning_screen.clear_inputs = Mock()
+    workout_planning_screen._show_error_popup = Mock()
+    lookup_threads = []
+
+    def near_duplicates(name):
+        lookup_threads.append(threading.current_thread().name)
+        return ['squat']
+
+    workout_planning_screen.exercise_index.near_duplicates.side_effect = near_duplicates
+
+    with patch('src.screens.workout_planning_screen.Clock') as mock_clock:
+        workout_planning_screen.save_workout(None)
+        # Saves are ignored while the lookup runs
+        workout_planning_screen.save_workout(None)
+        run_lookups(mock_clock)
+
+    # Misspellings are looked up once, off the UI thread
+    assert len(lookup_threads) == 1 and lookup_threads[0] != threading.current_thread().name
+    workout_planning_screen._show_error_popup.assert_called_once_with(
+        'Possible misspellings: squta (did you mean squat?). Save again to keep them.'
+    )
+    workout_planning_screen.exercise_storage.save_exercise.assert_not_called()
+    workout_planning_screen.workout_storage.save_workout.assert_not_called()
+
+    # Saving again keeps the name
+    with patch('src.screens.workout_planning_screen.Clock') as mock_clock:
+        workout_planning_screen.save_workout(None)
+        run_lookups(mock_clock)
+
+    workout_planning_screen._show_error_popup.assert_called_once()
+    workout_planning_screen.exercise_storage.save_exercise.assert_called_once_with(exercise_name='Squta')
+    workout_planning_screen.workout_storage.save_workout.assert_called_once()
+
+
+def test_repeat_session(workout_planning_screen):
+    """Test that repeating a workout fills the rows with its next session."""
+    workout_planning_screen.row_pool = WidgetPool(make_row)
+    workout_planning_screen.add_exercise_input(None)
+    workout_planning_screen.ids.progress.state = 'down'
+    workout_planning_screen.session_index.next_session.return_value = [
+        {'name': 'squat', 'sets': 3, 'reps': 5, 'weight': 102.5},
+        {'name': 'pull up', 'sets': 3, 'reps': 9, 'weight': None},
+    ]
+
+    workout_planning_screen.repeat_session('Leg Day')
+
+    workout_planning_screen.session_index.next_session.assert_called_once_with('Leg Day', progress=True)
+    assert workout_planning_screen.ids.workout_name.text == 'Leg Day'
+    assert [[field.text for field in row.inputs] for row in workout_planning_screen.exercise_rows] == [
+        ['squat', '3', '5', '102.5'],
+        ['pull up', '3', '9', ''],
+    ]
+    # The row shown before is reused
+    assert len(workout_planning_screen.row_pool) == 0
+
+
+def test_restore_session(workout_planning_screen, tmp_path):
+    """Test that the session recorded by the journal is restored without being recorded again."""
+    recorded = SessionJournal(str(tmp_path / 'session.jsonl'))
+    recorded.set_name('Leg Day')
+    for texts in ({'name': 'squat', 'sets': '3'}, {'name': 'row'}, {'name': 'lunge', 'reps': '8'}):
+        recorded.add_row()
+        for field, text in texts.items():
+            recorded.edit_row(len(recorded.session()['rows']) - 1, field, text)
+    recorded.remove_row(1)
+    recorded.close()
+    workout_planning_screen.journal = SessionJournal(recorded.filename)
+    workout_planning_screen.row_pool = WidgetPool(make_row)
+
+    workout_planning_screen._restore_session()
+
+    assert workout_planning_screen.ids.workout_name.text == 'Leg Day'
+    assert [[field.text for field in row.inputs] for row in workout_planning_screen.exercise_rows] == [
+        ['squat', '3', '', ''],
+        ['lunge', '', '8', ''],
+    ]
+    assert workout_planning_screen.journal.session() == recorded.session()
+
+    # Edits of the restored rows are recorded
+    workout_planning_screen._on_row_edit(workout_planning_screen.exercise_rows[1], 'sets', '4')
+    workout_planning_screen._on_name_text(None, 'Legs')
+    workout_planning_screen.journal.close()
+
+    assert SessionJournal(recorded.filename).restore() == {
+        'name': 'Legs',
+        'rows': [
+            {'name': 'squat', 'sets': '3', 'reps': '', 'weight': ''},
+            {'name': 'lunge', 'sets': '4', 'reps': '8', 'weight': ''},
+        ],
+    }
+
+
+def test_restore_without_session(workout_planning_screen):
+    """Test that an empty row is added when no session was recorded."""
+    workout_planning_screen.journal = SessionJournal()
+    workout_planning_screen.row_pool = WidgetPool(make_row)
+
+    workout_planning_screen._restore_session()
+
+    assert len(workout_planning_screen.exercise_rows) == 1
+    assert workout_planning_screen.journal.session() == {
+        'name': '',
+        'rows': [{'name': '', 'sets': '', 'reps': '', 'weight': ''}],
+    }
+
+
+def test_row_edits_recorded(workout_planning_screen):
+    """Test that edits of shown rows are recorded by position, and edits of removed rows are not."""
+    row1, row2 = make_row(), make_row()
+    workout_planning_screen.exercise_rows = [row1, row2]
+
+    workout_planning_screen._on_row_edit(row2, 'name', 'Squat')
+    workout_planning_screen.remove_row(row1)
+    workout_planning_screen._on_row_edit(row1, 'name', '')
+
+    workout_planning_screen.journal.edit_row.assert_called_once_with(1, 'name', 'Squat')
+    workout_planning_screen.journal.remove_row.assert_called_once_with(0)
+
+
+def test_show_last_performance(workout_planning_screen):
+    """Test that the last performance of a picked exercise is shown as hints until it is edited."""
+    row = make_row()
+    workout_planning_screen.session_index.last_performance.return_value = {
+        'name': 'squat',
+        'sets': 3,
+        'reps': 5,
+        'weight': 102.5,
+    }
+
+    workout_planning_screen._show_last_performance(row, None, 'Squat')
+
+    workout_planning_screen.session_index.last_performance.assert_called_once_with('Squat')
+    assert [field.hint_text for field in row.inputs[1:]] == ['Last: 3', 'Last: 5', 'Last: 102.5 kg']
+
+    workout_planning_screen._show_last_performance(row, None, '')
+
+    workout_planning_screen.session_index.last_performance.assert_called_once()
+    assert [field.hint_text for field in row.inputs[1:]] == ['Sets', 'Reps', 'Weight (kg)']
+
+
+def test_repeat_session_never_performed(workout_planning_screen):
+    """Test that repeating a workout without sessions keeps the rows."""
+    workout_planning_screen._show_error_popup = Mock()
+    workout_planning_screen.clear_inputs = Mock()
+    workout_planning_screen.session_index.next_session.return_value = None
+
+    workout_planning_screen.repeat_session('Leg Day')
+
+    workout_planning_screen._show_error_popup.assert_called_once_with('No previous session of Leg Day')
+    workout_planning_screen.clear_inputs.assert_not_called()
+
+
+def test_show_previous_workouts(workout_planning_screen):
+    """Test that previous workouts are listed and picking one repeats it."""
+    workout_planning_screen.session_index.workout_names.return_value = ['Leg Day', 'Legs']
+    workout_planning_screen.repeat_session = Mock()
+    button = Mock()
+
+    with (
+        patch('src.screens.workout_planning_screen.DropDown') as mock_dropdown,
+        patch('src.screens.workout_planning_screen.Button') as mock_button,
+    ):
+        workout_planning_screen.show_previous_workouts(button)
+
+    workout_planning_screen.session_index.workout_names.assert_called_once_with('Test Workout', 5)
+    assert [call.kwargs['text'] for call in mock_button.call_args_list] == ['Leg Day', 'Legs']
+    mock_dropdown.return_value.open.assert_called_once_with(button)
+
+    workout_planning_screen._on_previous_workout(Mock(text='Legs'))
+
+    mock_dropdown.return_value.dismiss.assert_called_once()
+    workout_planning_screen.repeat_session.assert_called_once_with('Legs')
+
+
+def test_show_previous_workouts_without_history(workout_planning_screen):
+    """Test that an error is shown without previous workouts."""
+    workout_planning_screen.session_index.workout_names.return_value = []
+    workout_planning_screen._show_error_popup = Mock()
+
+    workout_planning_screen.show_previous_workouts(Mock())
+
+    workout_planning_screen._show_error_popup.assert_called_once_with('No previous workouts found')
+
+
 def test_save_workout_no_name(workout_planning_screen):
     """Test saving a workout with no name."""
     # Set up mock workout name with empty text
@@ -300,31 +598,20 @@ def test_save_workout_invalid_input(workout_planning_screen):
     # Set up mock workout name
     workout_planning_screen.ids.workout_name.text = 'Test Workout'
 
-    # Create mock exercise rows with invalid data
-    row1 = Mock(spec=BoxLayout)
-    row1.children = [
-        Mock(spec=Button),  # Remove button
-        Mock(spec=TextInput, text='invalid'),  # Weight (invalid)
-        Mock(spec=TextInput, text='10'),  # Reps
-        Mock(spec=TextInput, text='3'),  # Sets
-        Mock(spec=TextInput, text='Squat'),  # Name
-    ]
-
-    workout_planning_screen.exercise_rows = [row1]
+    # Create exercise rows with invalid data
+    workout_planning_screen.exercise_rows = [make_row('Squat', '3', '10', 'invalid'), make_row('Row', '0', '10')]
 
     # Mock _show_error_popup
     workout_planning_screen._show_error_popup = Mock()
 
-    # Mock Exercise to raise ValueError
-    with patch('src.screens.workout_planning_screen.Exercise', side_effect=ValueError('Invalid weight')):
-        # Call save_workout
-        workout_planning_screen.save_workout(None)
+    # Call save_workout
+    workout_planning_screen.save_workout(None)
 
-        # Verify that _show_error_popup was called with the correct message
-        workout_planning_screen._show_error_popup.assert_called_once_with('Invalid input in rows: 1')
+    # Verify that _show_error_popup was called with the correct message
+    workout_planning_screen._show_error_popup.assert_called_once_with('Invalid input in rows: 1, 2')
 
-        # Verify that save_workout was not called
-        workout_planning_screen.workout_storage.save_workout.assert_not_called()
+    # Verify that save_workout was not called
+    workout_planning_screen.workout_storage.save_workout.assert_not_called()
 
 
 def test_save_workout_no_exercises(workout_planning_screen):
@@ -332,17 +619,8 @@ def test_save_workout_no_exercises(workout_planning_screen):
     # Set up mock workout name
     workout_planning_screen.ids.workout_name.text = 'Test Workout'
 
-    # Create mock exercise row with empty name
-    row1 = Mock(spec=BoxLayout)
-    row1.children = [
-        Mock(spec=Button),  # Remove button
-        Mock(spec=TextInput, text='100'),  # Weight
-        Mock(spec=TextInput, text='10'),  # Reps
-        Mock(spec=TextInput, text='3'),  # Sets
-        Mock(spec=TextInput, text=''),  # Name (empty)
-    ]
-
-    workout_planning_screen.exercise_rows = [row1]
+    # Create exercise row with empty name
+    workout_planning_screen.exercise_rows = [make_row('', '3', '10', '100')]
 
     # Mock _show_error_popup
     workout_planning_screen._show_error_popup = Mock()
@@ -385,16 +663,8 @@ def test_clear_inputs(workout_planning_screen):
     # Set up mock workout name
     workout_planning_screen.ids.workout_name = Mock(spec=TextInput, text='Test Workout')
 
-    # Create mock exercise rows
-    row1 = Mock(spec=BoxLayout)
-    row1.children = [
-        Mock(spec=Button),  # Remove button
-        Mock(spec=TextInput, text='100'),  # Weight
-        Mock(spec=TextInput, text='10'),  # Reps
-        Mock(spec=TextInput, text='3'),  # Sets
-        Mock(spec=TextInput, text='Squat'),  # Name
-    ]
-
+    # Create exercise rows
+    row1 = make_row('Squat', '3', '10', '100')
     workout_planning_screen.exercise_rows = [row1]
 
     # Mock exercise_layout
@@ -412,6 +682,13 @@ def test_clear_inputs(workout_planning_screen):
     # Verify that clear_widgets was called on exercise_layout
     workout_planning_screen.ids.exercise_layout.clear_widgets.assert_called_once()
 
+    # Verify that the row was cleared and kept for reuse
+    assert row1.name.text == ''
+    assert len(workout_planning_screen.row_pool) == 1
+
+    # Verify that the session journal was discarded
+    workout_planning_screen.journal.discard.assert_called_once()
+
 
 def test_exercise_input_initialization(exercise_input):
     """Test ExerciseInput initialization."""
@@ -449,49 +726,138 @@ def test_exercise_input_update_dropdown_empty_text(exercise_input):
 
 
 def test_exercise_input_update_dropdown_with_matches(exercise_input):
-    """Test updating dropdown with text that has matches."""
-    # Mock _create_dropdown
-    exercise_input._create_dropdown = Mock()
+    """Test that matches are shown in the recycled buttons of a single dropdown."""
+    exercise_input.focus = True
 
-    # Mock dropdown
-    exercise_input.dropdown = Mock()
+    with (
+        patch('src.screens.workout_planning_screen.DropDown') as mock_dropdown,
+        patch('src.screens.workout_planning_screen.Button', side_effect=lambda **kwargs: Mock(text='')),
+    ):
+        exercise_input._show_suggestions(exercise_input._find_suggestions('e'))
+        exercise_input._show_suggestions(exercise_input._find_suggestions('en'))
+
+    # A single dropdown with a fixed set of buttons is created
+    mock_dropdown.assert_called_once()
+    dropdown = mock_dropdown.return_value
+    assert len(exercise_input.suggestion_buttons) == 5
+
+    # The second keystroke hides the button of the match that is gone
+    first, second = exercise_input.suggestion_buttons[:2]
+    assert first.text == 'Bench Press'
+    assert dropdown.add_widget.call_count == 2
+    dropdown.remove_widget.assert_called_once_with(second)
+
+    # The dropdown is opened once, when it becomes visible
+    dropdown.open.assert_called_once_with(exercise_input)
 
-    # Mock Button and DropDown
-    with patch('kivy.uix.button.Button') as mock_button, patch('kivy.uix.dropdown.DropDown') as mock_dropdown:
-        # Set up mock Button
-        mock_button_instance = Mock()
-        mock_button.return_value = mock_button_instance
 
-        # Set up mock DropDown
-        mock_dropdown_instance = Mock()
-        mock_dropdown.return_value = mock_dropdown_instance
+def test_exercise_input_update_dropdown_no_matches(exercise_input):
+    """Test that no dropdown is created when no exercise matches."""
+    exercise_input.focus = True
+
+    with patch('src.screens.workout_planning_screen.DropDown') as mock_dropdown:
+        exercise_input._show_suggestions(exercise_input._find_suggestions('xyz'))
+
+    mock_dropdown.assert_not_called()
+    assert exercise_input.dropdown is None
+
+
+def test_exercise_input_hides_dropdown(exercise_input):
+    """Test that the dropdown is dismissed once when its suggestions are gone, and kept for reuse."""
+    exercise_input.focus = True
+
+    with (
+        patch('src.screens.workout_planning_screen.DropDown') as mock_dropdown,
+        patch('src.screens.workout_planning_screen.Button', side_effect=lambda **kwargs: Mock(text='')),
+    ):
+        exercise_input._show_suggestions(exercise_input._find_suggestions('sq'))
+        exercise_input._on_text(None, '')
+        exercise_input._on_text(None, '')
+
+    dropdown = mock_dropdown.return_value
+    dropdown.dismiss.assert_called_once()
+    dropdown.remove_widget.assert_called_once()
+    assert exercise_input.dropdown is dropdown
+
+
+def test_exercise_input_dismissed_by_touch(exercise_input):
+    """Test that a dropdown dismissed outside of the input is opened again by the next match."""
+    exercise_input.focus = True
+
+    with (
+        patch('src.screens.workout_planning_screen.DropDown') as mock_dropdown,
+        patch('src.screens.workout_planning_screen.Button', side_effect=lambda **kwargs: Mock(text='')),
+    ):
+        exercise_input._show_suggestions(exercise_input._find_suggestions('sq'))
+        exercise_input._on_dismiss()
+        exercise_input._show_suggestions(exercise_input._find_suggestions('squ'))
+
+    assert mock_dropdown.return_value.open.call_count == 2
+
+
+def test_exercise_input_suggestion_pressed(exercise_input):
+    """Test that pressing a suggestion button selects its exercise."""
+    exercise_input._select_exercise = Mock()
 
-        # Call _update_dropdown with text that has matches
+    exercise_input._on_suggestion(Mock(text='Deadlift'))
+
+    exercise_input._select_exercise.assert_called_once_with('Deadlift')
+
+
+def test_exercise_input_debounces_lookups(exercise_input):
+    """Test that a keystroke cancels the pending lookup and schedules a new one."""
+    with patch('src.screens.workout_planning_screen.Clock') as mock_clock:
+        first = Mock()
+        second = Mock()
+        mock_clock.schedule_once.side_effect = [first, second]
+
+        exercise_input._update_dropdown('s')
         exercise_input._update_dropdown('sq')
 
-        # Verify that _create_dropdown was called
-        exercise_input._create_dropdown.assert_called_once()
+    first.cancel.assert_called_once()
+    second.cancel.assert_not_called()
+    assert exercise_input._pending is second
+    assert mock_clock.schedule_once.call_args[0][1] == SUGGESTION_DELAY
 
 
-def test_exercise_input_update_dropdown_no_matches(exercise_input):
-    """Test updating dropdown with text that has no matches."""
-    # Mock _create_dropdown
-    exercise_input._create_dropdown = Mock()
+def test_exercise_input_lookup_off_thread(exercise_input):
+    """Test that lookups run on the lookup thread and their results are shown from the UI thread."""
+    exercise_input.focus = True
+    exercise_input._show_suggestions = Mock()
+    exercise_input._generation = 1
+
+    with patch('src.screens.workout_planning_screen.Clock') as mock_clock:
+        exercise_input._lookup('sq', 1)
+        # Wait for the lookup thread to finish
+        _LOOKUPS.submit(lambda: None).result()
+        apply = mock_clock.schedule_once.call_args[0][0]
+
+    exercise_input._show_suggestions.assert_not_called()
+    apply(0)
+    exercise_input._show_suggestions.assert_called_once_with(['Squat'])
 
-    # Mock dropdown
-    exercise_input.dropdown = Mock()
 
-    # Mock Button and DropDown
-    with patch('kivy.uix.dropdown.DropDown') as mock_dropdown:
-        # Set up mock DropDown
-        mock_dropdown_instance = Mock()
-        mock_dropdown.return_value = mock_dropdown_instance
+def test_exercise_input_discards_stale_lookup(exercise_input):
+    """Test that the results of a lookup are discarded when the text changed since it started."""
+    exercise_input._show_suggestions = Mock()
+    future = Future()
+    future.set_result(['Squat'])
 
-        # Call _update_dropdown with text that has no matches
-        exercise_input._update_dropdown('xyz')
+    exercise_input._cancel_lookup()
+    exercise_input._apply_suggestions(0, future)
 
-        # Verify that _create_dropdown was called
-        exercise_input._create_dropdown.assert_called_once()
+    exercise_input._show_suggestions.assert_not_called()
+
+
+def test_exercise_input_failed_lookup(exercise_input):
+    """Test that a failed lookup hides the suggestions."""
+    exercise_input._show_suggestions = Mock()
+    future = Future()
+    future.set_exception(OSError('unreadable'))
+
+    exercise_input._apply_suggestions(0, future)
+
+    exercise_input._show_suggestions.assert_called_once_with([])
 
 
 def test_exercise_input_on_text_with_focus(exercise_input):
@@ -550,3 +916,16 @@ def test_exercise_input_select_exercise(exercise_input):
 
     # Verify that dropdown was dismissed
     exercise_input.dropdown.dismiss.assert_called_once()
+
+
+def test_exercise_input_select_dispatches_exercise(exercise_input):
+    """Test that picking an exercise dispatches it, and editing it dispatches an empty name."""
+    exercise_input._select_exercise('squat')
+
+    exercise_input.dispatch.assert_called_once_with('on_select', 'squat')
+
+    exercise_input._on_text(None, 'squat')
+    exercise_input._on_text(None, 'squa')
+
+    assert exercise_input.dispatch.call_args_list[1:] == [(('on_select', ''),)]
+    assert exercise_input._selected is None
@@ -0,0 +1,177 @@
+import json
+import operator
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.storage.atomic import append_lines, atomic_write_json
+from src.storage.storage import WorkoutStorage
+from src.storage.write_behind import WriteBehindQueue
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def run_script(script: str, **kwargs) -> subprocess.Popen:
+    """Run a python script in a child process with the repository on the path."""
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+    return subprocess.Popen(
+        [sys.executable, '-c', textwrap.dedent(script)], env=env, stdout=subprocess.PIPE, text=True, **kwargs
+    )
+
+
+def test_atomic_write_json(tmp_path):
+    """Test that atomic_write_json replaces the file contents."""
+    filename = str(tmp_path / 'data.json')
+    atomic_write_json(filename, [1])
+    atomic_write_json(filename, [1, 2])
+
+    assert json.loads(Path(filename).read_text(encoding='utf-8')) == [1, 2]
+    assert os.listdir(tmp_path) == ['data.json']
+
+
+def test_atomic_write_json_failure_keeps_previous_contents(tmp_path):
+    """Test that a failing write leaves the previous contents and no temporary file."""
+    filename = str(tmp_path / 'data.json')
+    atomic_write_json(filename, [1])
+
+    with patch('src.storage.atomic.os.replace', side_effect=OSError('no space left')), pytest.raises(OSError):
+        atomic_write_json(filename, [1, 2])
+
+    assert json.loads(Path(filename).read_text(encoding='utf-8')) == [1]
+    assert os.listdir(tmp_path) == ['data.json']
+
+
+def test_append_lines_terminates_torn_line(tmp_path):
+    """Test that append_lines starts a new line after a torn trailing line."""
+    filename = tmp_path / 'data.log'
+    filename.write_text('{"a": 1}\n{"b":', encoding='utf-8')
+
+    append_lines(str(filename), ['{"c": 3}'])
+
+    assert filename.read_text(encoding='utf-8').splitlines() == ['{"a": 1}', '{"b":', '{"c": 3}']
+
+
+def test_writer_killed_before_rename_keeps_history(tmp_path):
+    """Test that a writer killed after writing the temporary file leaves the history intact."""
+    filename = str(tmp_path / 'workouts.json')
+    process = run_script(
+        f"""
+        import os
+        from src.models.exercise import Exercise, Workout
+        from src.storage.storage import WorkoutStorage
+        from src.storage.write_behind import WriteBehindQueue
+
+        storage = WorkoutStorage(filename={filename!r}, writer=WriteBehindQueue(), durable=True)
+        storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='first'))
+
+        # Die in the middle of the next flush, after the data is written but before it is renamed
+        os.fsync = lambda fd: os._exit(1)
+        storage.save_workout(Workout(exercises=[Exercise(name='clean', sets=3, reps=10)], name='second'))
+        """
+    )
+    assert process.wait(timeout=30) == 1
+
+    workouts = WorkoutStorage(filename=filename).load_workouts()
+    assert [w['name'] for w in workouts] == ['first']
+
+
+def test_writer_killed_during_change_log_append(tmp_path):
+    """Test that a torn change log append is skipped and later changes are still applied."""
+    filename = str(tmp_path / 'workouts.json')
+    process = run_script(
+        f"""
+        import os
+        from src.models.exercise import Exercise, Workout
+        import src.storage.storage as storage_module
+        from src.storage.storage import WorkoutStorage
+
+        storage = WorkoutStorage(filename={filename!r})
+        workout = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='first')
+        first_id = storage.save_workout(workout)
+        second_id = storage.save_workout(workout.model_copy(update={{'name': 'second'}}))
+        storage.delete_workout(first_id)
+        print(second_id, flush=True)
+
+        # Die after writing half of the next change
+        def torn_append(filename, lines):
+            with open(filename, 'a', encoding='utf-8') as file_:
+                file_.write(lines[0][: len(lines[0]) // 2])
+            os._exit(1)
+
+        storage_module.append_lines = torn_append
+        storage.delete_workout(second_id)
+        """
+    )
+    second_id = process.stdout.readline().strip()
+    assert process.wait(timeout=30) == 1
+
+    storage = WorkoutStorage(filename=filename)
+    assert [w['id'] for w in storage.load_workouts()] == [second_id]
+
+    storage.delete_workout(second_id)
+    assert WorkoutStorage(filename=filename).load_workouts() == []
+
+
+def test_writer_killed_mid_flush_never_truncates_history(tmp_path):
+    """Test that killing a process saving workouts at random points never loses committed workouts."""
+    filename = str(tmp_path / 'workouts.json')
+    process = run_script(
+        f"""
+        import itertools
+        from src.models.exercise import Exercise, Workout
+        from src.storage.storage import WorkoutStorage
+        from src.storage.write_behind import WriteBehindQueue
+
+        storage = WorkoutStorage(filename={filename!r}, writer=WriteBehindQueue(), durable=True)
+        workout = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)] * 50, name='day')
+        for day in itertools.count():
+            print(storage.save_workout(workout.model_copy(update={{'name': f'day {{day}}'}})), flush=True)
+        """
+    )
+    committed = [process.stdout.readline().strip() for _ in range(20)]
+    time.sleep(0.05)
+    process.send_signal(signal.SIGKILL)
+    process.wait(timeout=30)
+
+    stored = [w['id'] for w in WorkoutStorage(filename=filename).load_workouts()]
+    assert stored[: len(committed)] == committed
+
+
+def test_group_commit_merges_concurrent_writes(tmp_path):
+    """Test that commits arriving while the writer is busy are persisted in a single write."""
+    writer = WriteBehindQueue(max_delay=60)
+    filename = str(tmp_path / 'data.json')
+    started = threading.Event()
+    release = threading.Event()
+    written = []
+
+    def write(payload):
+        if not written:
+            started.set()
+            release.wait(timeout=5)
+        written.append(payload)
+        atomic_write_json(filename, payload)
+
+    first = threading.Thread(target=writer.commit, args=('key', [0], write, operator.add))
+    first.start()
+    assert started.wait(timeout=5)
+
+    others = [threading.Thread(target=writer.commit, args=('key', [idx], write, operator.add)) for idx in range(1, 9)]
+    for thread in others:
+        thread.start()
+    while len(writer.pending('key') or []) < 9:
+        time.sleep(0.01)
+    release.set()
+    for thread in [first, *others]:
+        thread.join(timeout=5)
+
+    assert len(written) == 2
+    assert sorted(written[1]) == list(range(1, 9))
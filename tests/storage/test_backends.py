@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.models.exercise import Exercise, Workout
+from src.storage import backends
+from src.storage.backends import Storages, backend_names, get_storages, open_storages, register_backend
+from src.storage.conformance import check_backend, measure_backend
+from src.storage.memory import MemoryExerciseStorage, MemoryProfileStorage, MemoryWorkoutStorage
+from src.storage.storage import WorkoutStorage
+
+
+def test_builtin_backends():
+    """Test that the built-in backends are registered."""
+    assert backend_names() == ['json', 'jsonl', 'memory', 'sqlite']
+
+
+@pytest.mark.parametrize('name', backend_names())
+def test_backend_conformance(tmp_path, name):
+    """Test that every registered backend passes the conformance checks."""
+    failures = check_backend(lambda: open_storages(name, str(tmp_path), durable=True), persistent=name != 'memory')
+
+    assert failures == []
+
+
+@pytest.mark.parametrize('name', backend_names())
+def test_measure_backend(tmp_path, name):
+    """Test that the throughput of every operation is measured."""
+    results = measure_backend(lambda: open_storages(name, str(tmp_path), durable=True), workouts=20)
+
+    assert set(results) == {'save', 'batch save', 'load', 'iter', 'get', 'history', 'update', 'delete'}
+    assert all(rate > 0 for rate in results.values())
+
+
+def test_check_backend_reports_failures():
+    """Test that deviations from the protocols are reported."""
+
+    class LosingWorkoutStorage(MemoryWorkoutStorage):
+        def delete_workout(self, workout_id):
+            pass
+
+    def open_broken():
+        return Storages(MemoryProfileStorage(), MemoryExerciseStorage(), LosingWorkoutStorage())
+
+    failures = check_backend(open_broken, persistent=False)
+
+    assert 'delete_workout does not remove the workout' in failures
+    assert 'delete_workout of an unknown id does not raise KeyError' in failures
+
+
+def test_sqlite_indexes_existing_database(tmp_path):
+    """Test that the exercises of databases created without posting lists are indexed when opened."""
+    storages = open_storages('sqlite', str(tmp_path))
+    workout_id = storages.workouts.save_workout(
+        Workout(exercises=[Exercise(name='Squat', sets=3, reps=5)], name='legs', datetime='2024-01-01T10:00:00')
+    )
+    with storages.workouts.database.connection as connection:
+        connection.execute('DROP TABLE exercise_postings')
+    storages.workouts.database.close()
+
+    history = open_storages('sqlite', str(tmp_path)).workouts.exercise_history('squat')
+
+    assert [(performance['workout_id'], performance['position']) for performance in history] == [(workout_id, 0)]
+
+
+@pytest.mark.parametrize('name', backend_names())
+def test_backend_session_journal(tmp_path, name):
+    """Test that backends persisting their data keep the session journal in their directory."""
+    journal = open_storages(name, str(tmp_path)).journal
+    journal.add_row()
+    journal.close()
+
+    restored = open_storages(name, str(tmp_path)).journal.restore()
+
+    assert len(restored['rows']) == (name != 'memory')
+
+
+def test_unknown_backend(tmp_path):
+    """Test that opening an unknown backend raises a ValueError."""
+    with pytest.raises(ValueError, match='Unknown storage backend'):
+        open_storages('missing', str(tmp_path))
+
+
+def test_register_backend(tmp_path):
+    """Test that registered backends are opened by name."""
+    with patch.dict(backends._BACKENDS):  # pylint: disable=protected-access
+
+        @register_backend('custom')
+        def open_custom(directory, writer, durable):
+            return backends._open_memory(directory, writer, durable)  # pylint: disable=protected-access
+
+        assert 'custom' in backend_names()
+        assert isinstance(open_storages('custom', str(tmp_path / 'data')).workouts, MemoryWorkoutStorage)
+        assert (tmp_path / 'data').is_dir()
+
+
+def test_get_storages_from_environment(tmp_path, monkeypatch):
+    """Test that the app storages use the backend and directory of the environment."""
+    monkeypatch.setenv(backends.BACKEND_VARIABLE, 'sqlite')
+    monkeypatch.setenv(backends.DATA_DIR_VARIABLE, str(tmp_path))
+    monkeypatch.setattr(backends, '_default_storages', None)
+
+    storages = get_storages()
+
+    assert get_storages() is storages
+    assert (tmp_path / 'xrcs.sqlite3').exists()
+
+
+def test_get_storages_default(tmp_path, monkeypatch):
+    """Test that the app storages default to the json files of the working directory."""
+    monkeypatch.delenv(backends.BACKEND_VARIABLE, raising=False)
+    monkeypatch.delenv(backends.DATA_DIR_VARIABLE, raising=False)
+    monkeypatch.setattr(backends, '_default_storages', None)
+    monkeypatch.chdir(tmp_path)
+
+    workouts = get_storages().workouts
+
+    assert isinstance(workouts, WorkoutStorage)
+    assert workouts.filename == './workouts.json'
@@ -0,0 +1,131 @@
+import hashlib
+import io
+import json
+import os
+import random
+
+import pytest
+
+from src.models.exercise import Exercise, Workout
+from src.storage.backup import (
+    MAX_CHUNK_SIZE,
+    BackupError,
+    create_backup,
+    iter_chunks,
+    list_snapshots,
+    load_snapshot,
+    restore_backup,
+)
+from src.storage.storage import WorkoutStorage
+
+
+def records(count: int, seed: int = 0) -> bytes:
+    """Json lines data with the given number of workouts."""
+    rng = random.Random(seed)
+    lines = (
+        json.dumps({'name': f'day {idx}', 'exercises': [{'name': 'squat', 'sets': 3, 'reps': rng.randint(1, 20)}]})
+        for idx in range(count)
+    )
+    return ''.join(line + '\n' for line in lines).encode('utf-8')
+
+
+@pytest.fixture
+def workout_storage(tmp_path):
+    """WorkoutStorage fixture with a hundred saved workouts."""
+    (tmp_path / 'data').mkdir()
+    storage = WorkoutStorage(filename=str(tmp_path / 'data' / 'workouts.json'))
+    workout = Workout(exercises=[Exercise(name='squat', sets=3, reps=5)], name='day')
+    storage.bulk_append({**workout.model_dump(), 'name': f'day {idx}'} for idx in range(100))
+    return storage
+
+
+def test_iter_chunks_finds_unchanged_chunks_after_an_insert():
+    """Test that an insert near the start only changes the chunks around it."""
+    data = records(20000)
+    chunks = list(iter_chunks(io.BytesIO(data)))
+    changed = list(iter_chunks(io.BytesIO(data[:100] + b'{"inserted": true}\n' + data[100:])))
+
+    assert b''.join(chunks) == data
+    assert all(len(chunk) <= MAX_CHUNK_SIZE for chunk in chunks)
+    assert len(chunks) > 10
+    assert len(set(changed) - set(chunks)) == 1
+
+
+def test_iter_chunks_without_boundaries():
+    """Test that data without json records is cut at the maximum chunk size."""
+    data = b'x' * (2 * MAX_CHUNK_SIZE + 10)
+
+    assert [len(chunk) for chunk in iter_chunks(io.BytesIO(data))] == [MAX_CHUNK_SIZE, MAX_CHUNK_SIZE, 10]
+    assert not list(iter_chunks(io.BytesIO(b'')))
+
+
+def test_backup_restore_roundtrip(tmp_path, workout_storage):
+    """Test that restoring a snapshot brings back the files and removes a newer change log."""
+    data_dir = str(tmp_path / 'data')
+    backup_dir = str(tmp_path / 'backups')
+    first = create_backup(data_dir, backup_dir)
+
+    assert first.files == 1
+    assert first.chunks > 0
+
+    workout_id = workout_storage.load_workouts()[0]['id']
+    workout_storage.update_workout(
+        workout_id, Workout(exercises=[Exercise(name='deadlift', sets=1, reps=1)], name='new')
+    )
+    second = create_backup(data_dir, backup_dir)
+
+    assert second.files == 2
+    assert list_snapshots(backup_dir) == [first.snapshot, second.snapshot]
+
+    assert restore_backup(backup_dir, data_dir, first.snapshot) == first.snapshot
+    assert not os.path.exists(workout_storage.log_filename)
+    assert workout_storage.load_workouts()[0]['name'] == 'day 0'
+
+    assert restore_backup(backup_dir, data_dir) == second.snapshot
+    assert workout_storage.load_workouts()[0]['name'] == 'new'
+
+
+def test_backup_only_writes_changes(tmp_path, workout_storage):
+    """Test that backups after small changes of a large history only write a few chunks."""
+    data_dir = str(tmp_path / 'data')
+    backup_dir = str(tmp_path / 'backups')
+    workout = Workout(exercises=[Exercise(name='deadlift', sets=1, reps=1)], name='new')
+    workout_storage.save_workouts([workout.model_copy(update={'name': f'new {idx}'}) for idx in range(3000)])
+    assert create_backup(data_dir, backup_dir).chunks > 5
+    assert create_backup(data_dir, backup_dir).chunks == 0
+
+    workout_storage.save_workout(workout)
+    assert create_backup(data_dir, backup_dir).chunks <= 2
+
+    workout_ids = [saved['id'] for saved in workout_storage.load_workouts()]
+    for workout_id in workout_ids[:300]:
+        workout_storage.update_workout(workout_id, workout)
+    create_backup(data_dir, backup_dir)
+    workout_storage.update_workout(workout_ids[-1], workout)
+    result = create_backup(data_dir, backup_dir)
+
+    # Only the end of the change log is chunked again
+    assert result.chunks == 1
+    log = load_snapshot(backup_dir, result.snapshot)['files']['workouts.json.log']
+    with open(workout_storage.log_filename, 'rb') as file_:
+        assert log['chunks'] == [[hashlib.sha256(chunk).hexdigest(), len(chunk)] for chunk in iter_chunks(file_)]
+
+
+def test_restore_corrupted_chunk(tmp_path, workout_storage):
+    """Test that restoring a corrupted or missing chunk fails and leaves the files in place."""
+    data_dir = str(tmp_path / 'data')
+    backup_dir = str(tmp_path / 'backups')
+    snapshot = create_backup(data_dir, backup_dir).snapshot
+    digest = load_snapshot(backup_dir, snapshot)['files']['workouts.json']['chunks'][0][0]
+    chunk_filename = os.path.join(backup_dir, 'chunks', digest[:2], digest)
+    with open(chunk_filename, 'wb') as file_:
+        file_.write(b'garbage')
+
+    with pytest.raises(BackupError, match='corrupted'):
+        restore_backup(backup_dir, data_dir)
+    os.remove(chunk_filename)
+    with pytest.raises(BackupError, match='misses 1 chunks'):
+        restore_backup(backup_dir, data_dir)
+    with pytest.raises(BackupError, match='does not exist'):
+        restore_backup(backup_dir, data_dir, 'unknown')
+    assert len(workout_storage.load_workouts()) == 100
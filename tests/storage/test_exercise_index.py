@@ -0,0 +1,145 @@
+import math
+
+from src.models.exercise import Exercise, Workout
+from src.storage.exercise_index import MAX_PREFIX, ExerciseIndex
+from src.storage.memory import MemoryExerciseStorage, MemoryWorkoutStorage
+
+
+def workout(datetime: str, *names: str) -> Workout:
+    """Return a workout of the given exercises."""
+    return Workout(name='day', datetime=datetime, exercises=[Exercise(name=name, sets=3, reps=5) for name in names])
+
+
+def storages(names: list[str], workouts: list[Workout]) -> tuple[MemoryExerciseStorage, MemoryWorkoutStorage]:
+    """Return in-memory storages with the given exercises and workouts."""
+    exercise_storage = MemoryExerciseStorage()
+    exercise_storage.save_exercises(names)
+    workout_storage = MemoryWorkoutStorage()
+    workout_storage.save_workouts(workouts)
+    return exercise_storage, workout_storage
+
+
+def test_suggest_without_history():
+    """Test that names without history are suggested in the order they were saved."""
+    index = ExerciseIndex(storages(['squat', 'front squat', 'bench press', 'squat jump'], [])[0])
+
+    assert index.suggest('sq') == ['squat', 'front squat', 'squat jump']
+    assert index.suggest('sq', k=2) == ['squat', 'front squat']
+    assert index.suggest('SQUAT J') == ['squat jump']
+    assert index.suggest('xyz') == []
+
+
+def test_suggest_ranks_frequent_exercises_first():
+    """Test that exercises performed more often are suggested first."""
+    exercise_storage, workout_storage = storages(
+        ['squat', 'front squat', 'squat jump'],
+        [workout('2024-01-01T10:00:00', 'front squat'), workout('2024-01-02T10:00:00', 'front squat', 'squat jump')],
+    )
+    index = ExerciseIndex(exercise_storage, workout_storage)
+
+    assert index.suggest('sq') == ['front squat', 'squat jump', 'squat']
+
+
+def test_suggest_ranks_recent_exercises_first():
+    """Test that recent performances outweigh many old ones."""
+    history = [workout(f'2023-01-{day:02d}T10:00:00', 'squat') for day in range(1, 6)]
+    history.append(workout('2024-01-01T10:00:00', 'squat jump'))
+    index = ExerciseIndex(*storages(['squat', 'squat jump'], history))
+
+    assert index.suggest('squat') == ['squat jump', 'squat']
+
+
+def test_suggest_infixes_without_word_matches():
+    """Test that names containing the text inside a word are only suggested without word matches."""
+    index = ExerciseIndex(storages(['bench press', 'press up', 'leg press', 'spress'], [])[0])
+
+    assert index.suggest('press') == ['bench press', 'press up', 'leg press']
+    assert index.suggest('ress') == ['bench press', 'press up', 'leg press', 'spress']
+    assert index.suggest('ench') == ['bench press']
+
+
+def test_suggest_long_query():
+    """Test that queries longer than the indexed prefixes are filtered."""
+    long_name = 'a' * MAX_PREFIX + ' curl'
+    index = ExerciseIndex(storages([long_name, 'a' * MAX_PREFIX + ' row'], [])[0])
+
+    assert index.suggest('a' * MAX_PREFIX + ' c') == [long_name]
+
+
+def test_record_workout():
+    """Test that saved workouts update the ranking incrementally."""
+    exercise_storage, workout_storage = storages(['squat', 'squat jump'], [])
+    index = ExerciseIndex(exercise_storage, workout_storage)
+    assert index.suggest('sq') == ['squat', 'squat jump']
+
+    saved = workout('2024-01-01T10:00:00', 'Squat Jump')
+    workout_storage.save_workout(saved)
+    index.record_workout(saved)
+
+    assert index.suggest('sq') == ['squat jump', 'squat']
+    assert math.isfinite(index._scores['squat jump'])  # pylint: disable=protected-access
+
+
+def test_record_workout_before_first_query():
+    """Test that workouts recorded before the history is loaded are not counted twice."""
+    exercise_storage, workout_storage = storages(['squat', 'squat jump'], [])
+    index = ExerciseIndex(exercise_storage, workout_storage)
+    saved = workout('2024-01-01T10:00:00', 'squat')
+    workout_storage.save_workout(saved)
+    index.record_workout(saved)
+    index.suggest('sq')
+
+    rebuilt = ExerciseIndex(exercise_storage, workout_storage)
+    rebuilt.suggest('sq')
+
+    # A single recorded performance, not two
+    assert index._scores == rebuilt._scores  # pylint: disable=protected-access
+
+
+def test_new_exercise_names_are_picked_up():
+    """Test that exercise names saved after the index was built are suggested."""
+    exercise_storage, workout_storage = storages(['squat'], [workout('2024-01-01T10:00:00', 'deadlift')])
+    index = ExerciseIndex(exercise_storage, workout_storage, refresh_interval=0)
+    assert index.suggest('d') == ['deadlift']
+
+    exercise_storage.save_exercises(['deadlift', 'dip'])
+
+    assert index.suggest('d') == ['deadlift', 'dip']
+
+
+def test_exercise_names_refresh_interval():
+    """Test that the exercise names are read at most once per refresh interval."""
+    exercise_storage = MemoryExerciseStorage()
+    exercise_storage.save_exercise('squat')
+    index = ExerciseIndex(exercise_storage, refresh_interval=3600)
+    assert index.suggest('s') == ['squat']
+
+    exercise_storage.save_exercise('sumo deadlift')
+
+    assert index.suggest('s') == ['squat']
+
+
+def test_suggest_with_typos():
+    """Test that misspelled queries are matched with names close to them, best ranked first."""
+    exercise_storage, workout_storage = storages(
+        ['squat', 'squat jump', 'bench press', 'deadlift'], [workout('2024-01-01T10:00:00', 'squat jump')]
+    )
+    index = ExerciseIndex(exercise_storage, workout_storage)
+
+    assert index.suggest('squta') == ['squat jump', 'squat']
+    assert index.suggest('bench prss') == ['bench press']
+    assert index.suggest('dedlift') == ['deadlift']
+    assert index.suggest('sq') == ['squat jump', 'squat']
+    assert index.suggest('xq') == []
+    assert index.suggest('qwerty') == []
+
+
+def test_near_duplicates():
+    """Test that new names close to saved ones are flagged."""
+    index = ExerciseIndex(storages(['squat', 'bench press', 'row'], [])[0])
+
+    assert index.near_duplicates('Squta') == ['squat']
+    assert index.near_duplicates('squats') == ['squat']
+    assert index.near_duplicates('bench pres ') == ['bench press']
+    assert index.near_duplicates('squat') == []
+    assert index.near_duplicates('rowing machine') == []
@@ -0,0 +1,78 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from src.models.exercise import Exercise, Workout
+from src.storage.exporter import export_workouts, open_output
+from src.storage.importer import import_workouts
+from src.storage.storage import ExerciseStorage, WorkoutStorage
+
+
+@pytest.fixture
+def workout_storage(tmp_path):
+    """WorkoutStorage fixture with three saved workouts."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'))
+    storage.save_workouts(
+        [
+            Workout(
+                exercises=[Exercise(name='Squat', sets=3, reps=5, weight=100), Exercise(name='Lunge', sets=3, reps=10)],
+                name='legs',
+                datetime=f'2024-01-0{day}T10:00:00',
+                notes='with, comma' if day == 1 else None,
+            )
+            for day in (1, 2, 3)
+        ]
+    )
+    return storage
+
+
+@pytest.mark.parametrize('fmt', ['json', 'jsonl', 'csv'])
+def test_export_import_roundtrip(tmp_path, workout_storage, fmt):
+    """Test that exported workouts import to the same workouts."""
+    file_ = io.StringIO(newline='')
+    assert export_workouts(workout_storage, file_, fmt) == 3
+
+    target = WorkoutStorage(filename=str(tmp_path / 'target.json'))
+    file_.seek(0)
+    report = import_workouts(file_, fmt, target, ExerciseStorage(filename=str(tmp_path / 'ex.json')), workers=1)
+
+    assert report.imported == 3
+    strip = [{key: value for key, value in w.items() if key != 'id'} for w in workout_storage.load_workouts()]
+    assert [{key: value for key, value in w.items() if key != 'id'} for w in target.load_workouts()] == strip
+
+
+def test_export_columnar_row_groups(workout_storage):
+    """Test that the columnar format writes row groups of flattened exercise rows."""
+    file_ = io.StringIO()
+    export_workouts(workout_storage, file_, 'columnar', row_group_size=4)
+
+    groups = [json.loads(line) for line in file_.getvalue().splitlines()]
+    assert [group['rows'] for group in groups] == [4, 2]
+    assert groups[0]['columns']['exercise'] == ['Squat', 'Lunge', 'Squat', 'Lunge']
+    assert groups[1]['columns']['date'] == ['2024-01-03', '2024-01-03']
+    assert groups[0]['columns']['weight'] == [100.0, None, 100.0, None]
+
+
+def test_export_filters(workout_storage):
+    """Test exporting a date range and selected exercises only."""
+    file_ = io.StringIO()
+    count = export_workouts(
+        workout_storage, file_, 'jsonl', since='2024-01-02', until='2024-01-02', exercises=['squat']
+    )
+
+    assert count == 1
+    (workout,) = [json.loads(line) for line in file_.getvalue().splitlines()]
+    assert workout['date'] == '2024-01-02'
+    assert [exercise['name'] for exercise in workout['exercises']] == ['Squat']
+
+
+def test_open_output_compresses(tmp_path):
+    """Test that outputs ending with .gz are compressed."""
+    filename = str(tmp_path / 'out.jsonl.gz')
+    with open_output(filename) as file_:
+        file_.write('data\n')
+
+    with gzip.open(filename, 'rt', encoding='utf-8') as file_:
+        assert file_.read() == 'data\n'
@@ -0,0 +1,44 @@
+import pytest
+
+from src.storage.fuzzy import DeletionIndex, deletions, edit_distance
+
+
+@pytest.mark.parametrize(
+    'a, b, distance',
+    [
+        ('squat', 'squat', 0),
+        ('squta', 'squat', 1),
+        ('sqat', 'squat', 1),
+        ('bench prss', 'bench press', 1),
+        ('dedlfit', 'deadlift', 2),
+        ('', 'row', 3),
+    ],
+)
+def test_edit_distance(a, b, distance):
+    """Test the edit distance, with swaps of adjacent characters as a single edit."""
+    assert edit_distance(a, b, max_distance=3) == distance
+    assert edit_distance(b, a, max_distance=3) == distance
+
+
+def test_edit_distance_bounded():
+    """Test that distances beyond the maximum are cut off."""
+    assert edit_distance('squat', 'deadlift', max_distance=2) == 3
+    assert edit_distance('a', 'abcdef', max_distance=1) == 2
+
+
+def test_deletions():
+    """Test the strings left after deleting characters."""
+    assert deletions('abc', 1) == {'abc', 'bc', 'ac', 'ab'}
+    assert deletions('ab', 2) == {'ab', 'a', 'b', ''}
+
+
+def test_candidates():
+    """Test that names within the distance are candidates of a query, as are longer names they start."""
+    index = DeletionIndex()
+    for key, name in enumerate(['squat', 'squat jump', 'bench press', 'row']):
+        index.add(name, key)
+
+    assert {0, 1} <= set(index.candidates('squta'))
+    assert 2 in set(index.candidates('bnch'))
+    assert 3 in set(index.candidates('rwo'))
+    assert 2 not in set(index.candidates('squta'))
@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+from src.storage.importer import import_workouts
+from src.storage.storage import ExerciseStorage, WorkoutStorage
+
+
+@pytest.fixture
+def storages(tmp_path):
+    """Workout and exercise storage fixture."""
+    return (
+        WorkoutStorage(filename=str(tmp_path / 'workouts.json')),
+        ExerciseStorage(filename=str(tmp_path / 'exercises.json')),
+    )
+
+
+def jsonl(count: int) -> io.StringIO:
+    """Json lines file with the given number of workouts."""
+    records = (
+        {'name': f'day {idx}', 'exercises': [{'name': f'Lift {idx % 3}', 'sets': 3, 'reps': 5}]} for idx in range(count)
+    )
+    return io.StringIO(''.join(json.dumps(record) + '\n' for record in records))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_import_jsonl(storages, workers):
+    """Test importing json lines in chunks, inline and across worker processes."""
+    workout_storage, exercise_storage = storages
+    report = import_workouts(jsonl(25), 'jsonl', workout_storage, exercise_storage, chunk_size=4, workers=workers)
+
+    assert report.imported == 25
+    assert not report.errors
+    assert [w['name'] for w in workout_storage.load_workouts()] == [f'day {idx}' for idx in range(25)]
+    assert sorted(exercise_storage.load_exercises()) == ['lift 0', 'lift 1', 'lift 2']
+
+
+def test_import_again_skips_duplicates(storages):
+    """Test that importing the same file twice does not duplicate workouts."""
+    workout_storage, exercise_storage = storages
+    import_workouts(jsonl(10), 'jsonl', workout_storage, exercise_storage, workers=1)
+    report = import_workouts(jsonl(12), 'jsonl', workout_storage, exercise_storage, workers=1)
+
+    assert (report.imported, report.duplicates) == (2, 10)
+    assert len(workout_storage.load_workouts()) == 12
+
+
+def test_import_csv_groups_rows_by_workout(storages):
+    """Test that consecutive csv rows of the same workout are imported as one workout."""
+    workout_storage, exercise_storage = storages
+    file_ = io.StringIO(
+        'workout,date,datetime,notes,exercise,sets,reps,weight\n'
+        'legs,2024-01-02,2024-01-02T10:00:00,,Squat,3,5,100\n'
+        'legs,2024-01-02,2024-01-02T10:00:00,,Lunge,3,10,\n'
+        'push,2024-01-03,2024-01-03T10:00:00,heavy,Bench,5,5,80.5\n',
+        newline='',
+    )
+    report = import_workouts(file_, 'csv', workout_storage, exercise_storage, workers=1)
+
+    assert report.imported == 2
+    legs, push = workout_storage.load_workouts()
+    assert [(e['name'], e['sets'], e['reps'], e['weight']) for e in legs['exercises']] == [
+        ('Squat', 3, 5, 100.0),
+        ('Lunge', 3, 10, None),
+    ]
+    assert legs['date'] == '2024-01-02'
+    assert push['notes'] == 'heavy'
+    assert push['exercises'][0]['weight'] == 80.5
+
+
+def test_import_invalid_rows_imports_nothing(storages):
+    """Test that all invalid rows are reported and nothing is written unless skipped."""
+    workout_storage, exercise_storage = storages
+    lines = jsonl(6).getvalue().splitlines()
+    lines[1] = '{"name": "broken",'
+    lines[4] = json.dumps({'name': 'empty', 'exercises': []})
+    source = '\n'.join(lines)
+
+    report = import_workouts(io.StringIO(source), 'jsonl', workout_storage, exercise_storage, chunk_size=2, workers=1)
+    assert report.imported == 0
+    assert [row for row, _ in report.errors] == [2, 5]
+    assert workout_storage.load_workouts() is None
+    assert exercise_storage.load_exercises() is None
+
+    report = import_workouts(
+        io.StringIO(source), 'jsonl', workout_storage, exercise_storage, skip_invalid=True, chunk_size=2, workers=1
+    )
+    assert report.imported == 4
+    assert len(workout_storage.load_workouts()) == 4
@@ -0,0 +1,69 @@
+import multiprocessing
+import multiprocessing.synchronize
+import os
+import threading
+import time
+
+from benchmarks.storage_stress import run
+from src.models.exercise import Exercise, Workout
+from src.storage.locking import file_lock
+from src.storage.storage import WorkoutStorage
+
+
+def _hold_lock(
+    filename: str, locked: multiprocessing.synchronize.Event, release: multiprocessing.synchronize.Event
+) -> None:
+    """Hold the file lock until released."""
+    with file_lock(filename):
+        locked.set()
+        release.wait(timeout=10)
+
+
+def _edit_workouts(filename: str, workout_ids: list[str]) -> None:
+    """Update and compact workouts from another process."""
+    storage = WorkoutStorage(filename=filename)
+    for workout_id in workout_ids:
+        storage.update_workout(workout_id, Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='edit'))
+    storage.compact()
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    """Test that the file lock is exclusive across processes."""
+    filename = str(tmp_path / 'data.json')
+    locked = multiprocessing.Event()
+    release = multiprocessing.Event()
+    holder = multiprocessing.Process(target=_hold_lock, args=(filename, locked, release))
+    holder.start()
+    assert locked.wait(timeout=10)
+
+    threading.Timer(0.2, release.set).start()
+    start = time.monotonic()
+    with file_lock(filename):
+        assert time.monotonic() - start >= 0.1
+    holder.join(timeout=10)
+    assert os.path.exists(f'{filename}.lock')
+
+
+def test_concurrent_writer_processes_lose_no_records(tmp_path):
+    """Test that concurrent writer processes do not drop each other's workouts and exercises."""
+    result = run(processes=4, records=15, directory=str(tmp_path))
+
+    assert result['lost_workouts'] == 0
+    assert result['lost_exercises'] == 0
+
+
+def test_concurrent_edits_and_saves_lose_no_records(tmp_path):
+    """Test that edits and compaction in another process do not drop saved workouts."""
+    filename = str(tmp_path / 'workouts.json')
+    storage = WorkoutStorage(filename=filename)
+    workout = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='day')
+    edited = [storage.save_workout(workout) for _ in range(10)]
+
+    editor = multiprocessing.Process(target=_edit_workouts, args=(filename, edited))
+    editor.start()
+    saved = [storage.save_workout(workout) for _ in range(10)]
+    editor.join(timeout=30)
+
+    workouts = {w['id']: w for w in WorkoutStorage(filename=filename).load_workouts()}
+    assert set(workouts) == set(edited + saved)
+    assert all(workouts[workout_id]['name'] == 'edit' for workout_id in edited)
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from src.models.exercise import Exercise, Workout
+from src.storage.merge import content_hash, merge_workouts, workout_key
+from src.storage.storage import WorkoutStorage
+
+SEEDS = range(25)
+
+
+def random_history(rng: random.Random, shared: list[dict]) -> list[dict]:
+    """Random history drawing from workouts shared between devices, with edits and legacy workouts."""
+    history = []
+    for workout in rng.sample(shared, rng.randint(0, len(shared))):
+        if rng.random() < 0.3:
+            workout = {**workout, 'name': rng.choice(['edit a', 'edit b']), 'version': rng.randint(1, 3)}
+        history.append(workout)
+    for _ in range(rng.randint(0, 3)):
+        history.append(
+            {
+                'id': f'legacy-{rng.randint(0, 3)}',
+                'name': rng.choice(['old a', 'old b']),
+                'datetime': '2020-01-01T00:00:00',
+                'exercises': [{'name': 'Squat', 'sets': 1, 'reps': rng.randint(1, 2), 'weight': None}],
+            }
+        )
+    rng.shuffle(history)
+    return history
+
+
+def shared_workouts(rng: random.Random) -> list[dict]:
+    """Workouts with stable ids."""
+    return [
+        {
+            'id': f'id-{idx}',
+            'name': f'day {idx}',
+            'datetime': f'2024-01-{rng.randint(1, 28):02d}T10:00:00',
+            'exercises': [{'name': 'Bench', 'sets': 3, 'reps': 5, 'weight': 60.0}],
+        }
+        for idx in range(8)
+    ]
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_merge_is_commutative(seed):
+    """Test that the order of the merged histories does not matter."""
+    rng = random.Random(seed)
+    shared = shared_workouts(rng)
+    a, b = random_history(rng, shared), random_history(rng, shared)
+
+    assert merge_workouts(a, b) == merge_workouts(b, a)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_merge_is_idempotent(seed):
+    """Test that merging a history again does not change the result."""
+    rng = random.Random(seed)
+    shared = shared_workouts(rng)
+    a, b = random_history(rng, shared), random_history(rng, shared)
+    merged = merge_workouts(a, b)
+
+    assert merge_workouts(merged, merged) == merged
+    assert merge_workouts(merged, b) == merged
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_merge_is_associative_and_grow_only(seed):
+    """Test that merges can be grouped freely and never lose a workout."""
+    rng = random.Random(seed)
+    shared = shared_workouts(rng)
+    a, b, c = (random_history(rng, shared) for _ in range(3))
+    merged = merge_workouts(merge_workouts(a, b), c)
+
+    assert merged == merge_workouts(a, merge_workouts(b, c)) == merge_workouts(a, b, c)
+    assert {workout_key(workout) for workout in a + b + c} == {workout['id'] for workout in merged}
+
+
+def test_merge_last_writer_wins():
+    """Test that the most recent version of a workout wins."""
+    older = {'id': 'x', 'name': 'older', 'version': 1, 'exercises': []}
+    newer = {'id': 'x', 'name': 'newer', 'version': 2, 'exercises': []}
+
+    assert [w['name'] for w in merge_workouts([newer], [older])] == ['newer']
+
+
+def test_content_hash_is_canonical():
+    """Test that equal workouts written differently have the same content hash."""
+    a = {'name': 'legs ', 'datetime': 'd', 'exercises': [{'name': 'Squat', 'sets': 3, 'reps': 5, 'weight': 100}]}
+    b = {'name': 'legs', 'datetime': 'd', 'exercises': [{'name': 'squat', 'sets': 3, 'reps': 5, 'weight': 100.0}]}
+
+    assert content_hash(a) == content_hash(b)
+    assert content_hash(a) != content_hash({**b, 'datetime': 'e'})
+
+
+def test_workout_storage_merge(tmp_path):
+    """Test merging the diverged workout files of two devices."""
+    phone = WorkoutStorage(filename=str(tmp_path / 'phone.json'))
+    workout = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='shared')
+    shared_id = phone.save_workout(workout)
+    (tmp_path / 'laptop.json').write_bytes((tmp_path / 'phone.json').read_bytes())
+    laptop = WorkoutStorage(filename=str(tmp_path / 'laptop.json'))
+
+    phone.save_workout(Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='phone'))
+    laptop.save_workout(Workout(exercises=[Exercise(name='jerk', sets=1, reps=1)], name='laptop'))
+    laptop.update_workout(shared_id, Workout(exercises=[Exercise(name='snatch', sets=5, reps=1)], name='edited'))
+
+    assert phone.merge(laptop.iter_workouts()) == 2
+    assert sorted(w['name'] for w in phone.load_workouts()) == ['edited', 'laptop', 'phone']
+    assert phone.merge(laptop.iter_workouts()) == 0
@@ -0,0 +1,58 @@
+from src.storage.postings import ExercisePostings
+
+
+def record(workout_id: str, *names: str) -> dict:
+    """Return a workout record of the given exercises."""
+    return {
+        'id': workout_id,
+        'name': f'workout {workout_id}',
+        'date': '2024-01-01',
+        'datetime': '2024-01-01T10:00:00',
+        'exercises': [{'name': name, 'sets': 3, 'reps': 5, 'weight': None} for name in names],
+    }
+
+
+def history(postings: ExercisePostings, exercise_name: str) -> list[tuple[str, int]]:
+    """Return the workout ids and positions of the performances of an exercise."""
+    return [(performance['workout_id'], performance['position']) for performance in postings.history(exercise_name)]
+
+
+def test_history():
+    """Test that performances are found ignoring case, in the order of the workouts."""
+    postings = ExercisePostings([record('a', 'Squat', 'row'), record('b', 'row', 'squat ', 'squat')])
+
+    assert history(postings, 'SQUAT') == [('a', 0), ('b', 1), ('b', 2)]
+    assert history(postings, 'row') == [('a', 1), ('b', 0)]
+    assert history(postings, 'deadlift') == []
+    assert postings.history('row')[0] == {
+        'name': 'row',
+        'sets': 3,
+        'reps': 5,
+        'weight': None,
+        'workout_id': 'a',
+        'workout': 'workout a',
+        'date': '2024-01-01',
+        'datetime': '2024-01-01T10:00:00',
+        'position': 1,
+    }
+
+
+def test_replace_keeps_order():
+    """Test that a replaced workout keeps its place in the posting lists."""
+    postings = ExercisePostings([record('a', 'squat'), record('b', 'row', 'squat')])
+
+    postings.add(record('a', 'row'))
+    postings.add(record('c', 'row'))
+
+    assert history(postings, 'row') == [('a', 0), ('b', 0), ('c', 0)]
+    assert history(postings, 'squat') == [('b', 1)]
+
+
+def test_remove():
+    """Test that removed workouts leave the posting lists."""
+    postings = ExercisePostings([record('a', 'squat'), record('b', 'squat')])
+
+    postings.remove('a')
+    postings.remove('missing')
+
+    assert history(postings, 'squat') == [('b', 0)]
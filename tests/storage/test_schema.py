@@ -0,0 +1,94 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.storage import schema
+from src.storage.schema import SCHEMA_FIELD, is_current, migrate, migration
+from src.storage.storage import ProfileStorage, WorkoutStorage
+
+LEGACY_WORKOUT = {
+    'name': 'legs',
+    'datetime': '2024-01-02T10:00:00',
+    'exercises': [{'name': 'squat', 'sets': 3, 'reps': 5}],
+}
+
+
+@pytest.fixture
+def registry():
+    """Copy of the migration registry and schema versions, restored after the test."""
+    with (
+        patch.dict(schema.SCHEMA_VERSIONS, schema.SCHEMA_VERSIONS.copy()),
+        patch.dict(schema._MIGRATIONS, schema._MIGRATIONS.copy()),  # pylint: disable=protected-access
+    ):
+        yield schema.SCHEMA_VERSIONS
+
+
+def test_migrate_unversioned_workout():
+    """Test that unversioned workouts get their optional fields and the current version."""
+    migrated = migrate('workout', LEGACY_WORKOUT)
+
+    assert migrated == {
+        **LEGACY_WORKOUT,
+        'date': '2024-01-02',
+        'notes': None,
+        'exercises': [{'name': 'squat', 'sets': 3, 'reps': 5, 'weight': None}],
+        SCHEMA_FIELD: 1,
+    }
+    assert SCHEMA_FIELD not in LEGACY_WORKOUT
+    assert migrate('workout', migrated) is migrated
+    assert is_current('workout', migrated)
+
+
+def test_migrate_applies_registered_migrations_in_order(registry):
+    """Test that records are upgraded one version at a time and newer records are left alone."""
+    registry['workout'] = 3
+
+    @migration('workout', 1)
+    def _rename(record):
+        return {**record, 'title': record['name']}
+
+    @migration('workout', 2)
+    def _upper(record):
+        return {**record, 'title': record['title'].upper()}
+
+    assert migrate('workout', LEGACY_WORKOUT)['title'] == 'LEGS'
+    assert migrate('workout', {**LEGACY_WORKOUT, 'title': 'push', SCHEMA_FIELD: 2})['title'] == 'PUSH'
+    newer = {**LEGACY_WORKOUT, SCHEMA_FIELD: 4}
+    assert migrate('workout', newer) is newer
+
+    registry['workout'] = 4
+    with pytest.raises(ValueError, match='from schema version 3'):
+        migrate('workout', LEGACY_WORKOUT)
+
+
+def test_workout_storage_migrates_on_read_and_upgrades(tmp_path):
+    """Test that legacy workouts are migrated when read and rewritten by the upgrade."""
+    filename = tmp_path / 'workouts.json'
+    filename.write_text(json.dumps([LEGACY_WORKOUT, {**LEGACY_WORKOUT, 'name': 'push', 'id': 'x'}]), encoding='utf-8')
+    storage = WorkoutStorage(filename=str(filename))
+
+    assert [(w['id'], w['date'], w[SCHEMA_FIELD]) for w in storage.load_workouts()] == [
+        ('legacy-0', '2024-01-02', 1),
+        ('x', '2024-01-02', 1),
+    ]
+    assert [w[SCHEMA_FIELD] for w in storage.iter_workouts()] == [1, 1]
+
+    storage.start_schema_upgrade().join()
+    stored = json.loads(filename.read_text(encoding='utf-8'))
+    assert [w[SCHEMA_FIELD] for w in stored] == [1, 1]
+    # Positional ids of legacy workouts are kept
+    assert 'id' not in stored[0]
+
+    stat = os.stat(filename)
+    assert storage.upgrade_schema() == 0
+    assert os.stat(filename).st_ino == stat.st_ino
+
+
+def test_profile_storage_loads_unversioned_profile(tmp_path):
+    """Test that a profile saved before versioning loads."""
+    filename = tmp_path / 'profile.json'
+    filename.write_text(json.dumps({'name': 'Test User', 'dob': '1990-01-01', 'weight': 70.0}), encoding='utf-8')
+
+    assert ProfileStorage(filename=str(filename)).load_profile().name == 'Test User'
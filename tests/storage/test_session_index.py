@@ -0,0 +1,126 @@
+from src.models.exercise import Exercise, Workout
+from src.storage.memory import MemoryWorkoutStorage
+from src.storage.session_index import SessionIndex, progression
+
+
+def workout(name: str, datetime: str, *exercises: tuple[str, int, int, float | None]) -> Workout:
+    """Return a workout of the given exercises, as name, sets, reps and weight."""
+    return Workout(
+        name=name,
+        datetime=datetime,
+        exercises=[Exercise(name=ex, sets=sets, reps=reps, weight=weight) for ex, sets, reps, weight in exercises],
+    )
+
+
+def index_of(*workouts: Workout, history: int = 5) -> SessionIndex:
+    """Return a session index of an in-memory storage with the given workouts."""
+    storage = MemoryWorkoutStorage()
+    storage.save_workouts(list(workouts))
+    return SessionIndex(storage, history=history)
+
+
+def test_progression():
+    """Test that exercises progress unless they went backwards."""
+    squat = {'name': 'squat', 'sets': 3, 'reps': 5, 'weight': 100.0}
+
+    assert progression([squat]) == squat
+    assert progression([squat, squat])['weight'] == 102.5
+    assert progression([{**squat, 'weight': 95.0}, squat])['weight'] == 102.5
+    assert progression([{**squat, 'weight': 10.0}] * 2)['weight'] == 10.5
+    assert progression([squat, {**squat, 'reps': 4}]) == {**squat, 'reps': 4}
+    assert progression([squat, {**squat, 'weight': 97.5}]) == {**squat, 'weight': 97.5}
+
+    pull_up = {'name': 'pull up', 'sets': 3, 'reps': 8, 'weight': None}
+    assert progression([pull_up, pull_up]) == {**pull_up, 'reps': 9}
+    assert progression([pull_up]) is not pull_up
+
+
+def test_last_session():
+    """Test that the last session of a workout is found ignoring case."""
+    index = index_of(
+        workout('Leg Day', '2024-01-08T10:00:00', ('squat', 3, 5, 105.0)),
+        workout('Leg Day', '2024-01-01T10:00:00', ('squat', 3, 5, 100.0)),
+        workout('Push', '2024-01-09T10:00:00', ('bench press', 3, 5, 80.0)),
+    )
+
+    assert index.last_session(' leg day')['exercises'][0]['weight'] == 105.0
+    assert index.last_session('Pull') is None
+
+
+def test_workout_names():
+    """Test that workout names are matched and listed most recent first."""
+    index = index_of(
+        workout('Leg Day', '2024-01-01T10:00:00', ('squat', 3, 5, 100.0)),
+        workout('Push', '2024-01-09T10:00:00', ('bench press', 3, 5, 80.0)),
+        workout('Legs', '2024-01-05T10:00:00', ('lunge', 3, 8, None)),
+    )
+
+    assert index.workout_names() == ['Push', 'Legs', 'Leg Day']
+    assert index.workout_names('LEG') == ['Legs', 'Leg Day']
+    assert index.workout_names('', k=1) == ['Push']
+
+
+def test_next_session():
+    """Test that the next session repeats or progresses the last one."""
+    index = index_of(
+        workout('Leg Day', '2024-01-01T10:00:00', ('squat', 3, 5, 100.0), ('calf raise', 3, 12, None)),
+        workout('Leg Day', '2024-01-04T10:00:00', ('squat', 3, 5, 100.0), ('lunge', 3, 8, 20.0)),
+        workout('Leg Day', '2024-01-08T10:00:00', ('squat', 3, 4, 102.5), ('Lunge', 3, 8, 20.0)),
+    )
+
+    assert [ex['name'] for ex in index.next_session('leg day')] == ['squat', 'Lunge']
+    assert [(ex['reps'], ex['weight']) for ex in index.next_session('leg day')] == [(4, 102.5), (8, 20.0)]
+    assert [(ex['reps'], ex['weight']) for ex in index.next_session('leg day', progress=True)] == [
+        (4, 102.5),
+        (8, 20.5),
+    ]
+    assert index.next_session('Push') is None
+
+
+def test_last_performance():
+    """Test that the last performance of an exercise is found across workouts."""
+    index = index_of(
+        workout('Push', '2024-01-09T10:00:00', ('bench press', 3, 5, 80.0), ('Dip', 3, 10, None)),
+        workout('Full Body', '2024-01-10T10:00:00', ('Bench Press', 5, 5, 75.0)),
+        workout('Push', '2024-01-02T10:00:00', ('bench press', 3, 5, 77.5), ('dip', 3, 8, None)),
+    )
+
+    assert index.last_performance('bench press') == {'name': 'Bench Press', 'sets': 5, 'reps': 5, 'weight': 75.0}
+    assert index.last_performance(' DIP')['reps'] == 10
+    assert index.last_performance('squat') is None
+
+    later = workout('Push', '2024-01-11T10:00:00', ('bench press', 3, 5, 82.5))
+    index.workout_storage.save_workout(later)
+    index.record_workout(later)
+
+    assert index.last_performance('bench press')['weight'] == 82.5
+
+
+def test_history_is_capped():
+    """Test that only the most recent sessions of a workout are kept."""
+    index = index_of(
+        *(workout('Leg Day', f'2024-01-{day:02d}T10:00:00', ('squat', 3, 5, 100.0 + day)) for day in range(1, 6)),
+        history=2,
+    )
+
+    assert index.last_session('Leg Day')['exercises'][0]['weight'] == 105.0
+    assert len(index._sessions['leg day']) == 2  # pylint: disable=protected-access
+
+
+def test_record_workout():
+    """Test that saved workouts are added once, whether or not the history is loaded."""
+    storage = MemoryWorkoutStorage()
+    index = SessionIndex(storage)
+    first = workout('Leg Day', '2024-01-01T10:00:00', ('squat', 3, 5, 100.0))
+    storage.save_workout(first)
+    index.record_workout(first)
+
+    assert index.workout_names() == ['Leg Day']
+
+    second = workout('leg day', '2024-01-08T10:00:00', ('squat', 3, 5, 102.5))
+    storage.save_workout(second)
+    index.record_workout(second)
+
+    assert index.workout_names() == ['leg day']
+    assert index.last_session('Leg Day')['exercises'][0]['weight'] == 102.5
+    assert len(index._sessions['leg day']) == 2  # pylint: disable=protected-access
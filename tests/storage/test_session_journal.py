@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from src.storage.session_journal import SessionJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    """Session journal fixture writing to a temporary file."""
+    return SessionJournal(str(tmp_path / 'session.jsonl'))
+
+
+def record_session(journal):
+    """Record a session of two rows, after removing a row."""
+    journal.set_name('Leg Day')
+    for idx, (name, sets) in enumerate((('squat', '3'), ('row', ''), ('lunge', '2'))):
+        journal.add_row()
+        journal.edit_row(idx, 'name', name)
+        journal.edit_row(idx, 'sets', sets)
+    journal.remove_row(1)
+    journal.close()
+
+
+def read_entries(filename):
+    """Return the entries of a journal file."""
+    with open(filename, encoding='utf-8') as file_:
+        return [json.loads(line) for line in file_]
+
+
+def test_journal_records_edits(journal):
+    """Test that every edit is appended and unchanged texts are not."""
+    record_session(journal)
+
+    assert read_entries(journal.filename) == [
+        {'op': 'name', 'text': 'Leg Day'},
+        {'op': 'add'},
+        {'op': 'edit', 'row': 0, 'field': 'name', 'text': 'squat'},
+        {'op': 'edit', 'row': 0, 'field': 'sets', 'text': '3'},
+        {'op': 'add'},
+        {'op': 'edit', 'row': 1, 'field': 'name', 'text': 'row'},
+        {'op': 'add'},
+        {'op': 'edit', 'row': 2, 'field': 'name', 'text': 'lunge'},
+        {'op': 'edit', 'row': 2, 'field': 'sets', 'text': '2'},
+        {'op': 'remove', 'row': 1},
+    ]
+
+
+def test_journal_restore(journal):
+    """Test that a restored session matches the recorded one and the file is compacted."""
+    record_session(journal)
+    expected = journal.session()
+
+    restored = SessionJournal(journal.filename)
+
+    assert (
+        restored.restore()
+        == expected
+        == {
+            'name': 'Leg Day',
+            'rows': [
+                {'name': 'squat', 'sets': '3', 'reps': '', 'weight': ''},
+                {'name': 'lunge', 'sets': '2', 'reps': '', 'weight': ''},
+            ],
+        }
+    )
+    assert len(read_entries(journal.filename)) == 7
+    assert SessionJournal(journal.filename).restore() == expected
+
+
+def test_journal_skips_torn_lines(journal):
+    """Test that a line torn by a crash is skipped and later appends stay readable."""
+    record_session(journal)
+    with open(journal.filename, 'a', encoding='utf-8') as file_:
+        file_.write('{"op": "edit", "row": 0, "fie')
+
+    restored = SessionJournal(journal.filename)
+    restored.restore()
+    restored.edit_row(0, 'reps', '5')
+    restored.close()
+
+    assert SessionJournal(journal.filename).restore()['rows'][0] == {
+        'name': 'squat',
+        'sets': '3',
+        'reps': '5',
+        'weight': '',
+    }
+
+
+def test_journal_paused(journal):
+    """Test that edits made while paused are ignored."""
+    with journal.paused():
+        journal.set_name('Leg Day')
+        journal.add_row()
+
+    assert journal.session() == {'name': '', 'rows': []}
+    assert not SessionJournal(journal.filename).restore()['rows']
+
+
+def test_journal_discard(journal):
+    """Test that discarding forgets the session and removes the file."""
+    record_session(journal)
+    journal.restore()
+
+    journal.discard()
+
+    assert journal.session() == {'name': '', 'rows': []}
+    assert SessionJournal(journal.filename).restore() == {'name': '', 'rows': []}
+
+
+def test_journal_in_memory():
+    """Test that a journal without a file keeps the session in memory only."""
+    journal = SessionJournal()
+    journal.add_row()
+    journal.edit_row(0, 'name', 'squat')
+
+    assert journal.session()['rows'] == [{'name': 'squat', 'sets': '', 'reps': '', 'weight': ''}]
+    assert journal.restore() == {'name': '', 'rows': []}
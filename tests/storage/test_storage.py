@@ -1,4 +1,7 @@
-from unittest.mock import mock_open, patch
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
@@ -43,9 +46,11 @@ def workout_storage(tmp_path):
 def test_profile_storage_save(tmp_path, profile_storage):
     """Test ProfileStorage save method."""
     test_profile = Profile(name='Test User', dob='1990-01-01', weight=70)
-    with patch('builtins.open', mock_open()) as mock_file:
+    with patch('src.storage.storage.atomic_write_json') as mock_write:
         profile_storage.save_profile(profile=test_profile)
-        mock_file.assert_called_once_with(str(tmp_path / 'test_profile.json'), 'w', encoding='utf-8')
+        mock_write.assert_called_once_with(
+            str(tmp_path / 'test_profile.json'), {**test_profile.model_dump(), 'schema_version': 1}
+        )
 
 
 def test_profile_storage_load_nonexistent(profile_storage):
@@ -77,9 +82,9 @@ def test_profile_storage_does_not_exists(profile_storage):
 
 def test_exercise_storage_save(tmp_path, exercise_storage):
     """Test ExerciseStorage save method."""
-    with patch('builtins.open', mock_open()) as mock_file:
+    with patch('src.storage.storage.atomic_write_json') as mock_write:
         exercise_storage.save_exercise('pushup')
-        mock_file.assert_called_once_with(str(tmp_path / 'test_exercises.json'), 'w', encoding='utf-8')
+        mock_write.assert_called_once_with(str(tmp_path / 'test_exercises.json'), ['pushup'])
 
 
 def test_exercise_storage_load_nonexistent(exercise_storage):
@@ -114,9 +119,11 @@ def test_workout_storage_save(tmp_path, workout_storage):
     """Test WorkoutStorage save method."""
     test_exercise = Exercise(name='snatch', sets=3, reps=10, weight=70.0)
     test_workout = Workout(exercises=[test_exercise], name='snatch day')
-    with patch('builtins.open', mock_open()) as mock_file:
-        workout_storage.save_workout(test_workout)
-        mock_file.assert_called_once_with(str(tmp_path / 'test_workouts.json'), 'w', encoding='utf-8')
+    with patch('src.storage.storage.atomic_write_json') as mock_write:
+        workout_id = workout_storage.save_workout(test_workout)
+        mock_write.assert_called_once_with(
+            str(tmp_path / 'test_workouts.json'), [{'id': workout_id, **test_workout.model_dump(), 'schema_version': 1}]
+        )
 
 
 def test_workout_storage_load_nonexistent(workout_storage):
@@ -153,3 +160,225 @@ def test_workout_storage_load(workout_storage):
     assert loaded_workouts[1]['exercises'][0]['weight'] == test_exercise.weight
     assert loaded_workouts[1]['date'] == test_workout.date
     assert loaded_workouts[1]['datetime'] == test_workout.datetime
+
+
+def test_workout_storage_save_returns_id(workout_storage):
+    """Test WorkoutStorage save method returns the id of the saved workout."""
+    test_workout = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='snatch day')
+    workout_id = workout_storage.save_workout(test_workout)
+    loaded_workouts = workout_storage.load_workouts()
+    assert loaded_workouts[0]['id'] == workout_id
+
+
+def test_workout_storage_update(workout_storage):
+    """Test WorkoutStorage update method."""
+    first_id = workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+    second_id = workout_storage.save_workout(Workout(exercises=[Exercise(name='clean', sets=3, reps=10)], name='b'))
+    base_before = Path(workout_storage.filename).read_text(encoding='utf-8')
+
+    workout_storage.update_workout(first_id, Workout(exercises=[Exercise(name='jerk', sets=5, reps=1)], name='c'))
+
+    # The workout file is not rewritten, the change is appended to the log
+    assert Path(workout_storage.filename).read_text(encoding='utf-8') == base_before
+    loaded_workouts = workout_storage.load_workouts()
+    assert [w['id'] for w in loaded_workouts] == [first_id, second_id]
+    assert loaded_workouts[0]['name'] == 'c'
+    assert loaded_workouts[0]['exercises'][0]['name'] == 'jerk'
+
+    # A fresh instance resolves the change log as well
+    fresh = WorkoutStorage(filename=workout_storage.filename)
+    assert fresh.load_workouts() == loaded_workouts
+
+
+def test_workout_storage_delete(workout_storage):
+    """Test WorkoutStorage delete method."""
+    first_id = workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+    second_id = workout_storage.save_workout(Workout(exercises=[Exercise(name='clean', sets=3, reps=10)], name='b'))
+
+    workout_storage.delete_workout(first_id)
+
+    assert [w['id'] for w in workout_storage.load_workouts()] == [second_id]
+    assert [w['id'] for w in WorkoutStorage(filename=workout_storage.filename).load_workouts()] == [second_id]
+    assert workout_storage.dead_ratio == pytest.approx(2 / 3)
+
+
+def test_workout_storage_update_delete_unknown_id(workout_storage):
+    """Test WorkoutStorage update and delete methods with unknown ids."""
+    test_workout = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a')
+    with pytest.raises(KeyError):
+        workout_storage.update_workout('missing', test_workout)
+    with pytest.raises(KeyError):
+        workout_storage.delete_workout('missing')
+
+
+def test_workout_storage_legacy_workouts_without_id(workout_storage):
+    """Test WorkoutStorage resolves edits of workouts saved without an id."""
+    legacy = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='legacy').model_dump()
+    with open(workout_storage.filename, 'w', encoding='utf-8') as file_:
+        json.dump([legacy, legacy], file_)
+
+    workout_storage.delete_workout('legacy-0')
+    loaded_workouts = workout_storage.load_workouts()
+    assert [w['id'] for w in loaded_workouts] == ['legacy-1']
+
+
+def test_workout_storage_compact(workout_storage):
+    """Test WorkoutStorage compact method."""
+    ids = [
+        workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name=str(idx)))
+        for idx in range(3)
+    ]
+    workout_storage.delete_workout(ids[0])
+    workout_storage.update_workout(ids[1], Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='x'))
+    expected = workout_storage.load_workouts()
+
+    workout_storage.compact()
+
+    assert not os.path.exists(workout_storage.log_filename)
+    assert workout_storage.load_workouts() == expected
+    assert workout_storage.dead_ratio == 0.0
+
+
+def test_workout_storage_background_compaction(tmp_path):
+    """Test WorkoutStorage compacts in the background once the dead ratio passes the threshold."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'), compact_threshold=0.5, compact_min_entries=4)
+    ids = [
+        storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name=str(idx)))
+        for idx in range(4)
+    ]
+    storage.delete_workout(ids[0])
+    storage.wait_for_compaction()
+    assert os.path.exists(storage.log_filename)
+
+    storage.delete_workout(ids[1])
+    storage.wait_for_compaction()
+
+    assert not os.path.exists(storage.log_filename)
+    assert [w['id'] for w in storage.load_workouts()] == ids[2:]
+
+
+def test_workout_storage_bulk_append(workout_storage):
+    """Test WorkoutStorage bulk_append streams records after the saved workouts."""
+    first_id = workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+    workout = Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='b')
+    records = [{**workout.model_dump(), 'name': str(idx)} for idx in range(3)]
+
+    assert workout_storage.bulk_append(iter(records), chunk_size=8) == 3
+
+    loaded_workouts = workout_storage.load_workouts()
+    assert [w['name'] for w in loaded_workouts] == ['a', '0', '1', '2']
+    assert loaded_workouts[0]['id'] == first_id
+    assert len({w['id'] for w in loaded_workouts}) == 4
+
+
+def test_workout_storage_save_duplicate_returns_saved_id(workout_storage):
+    """Test that saving an equal workout again returns the id of the saved workout."""
+    workout = Workout(exercises=[Exercise(name='Snatch', sets=3, reps=10)], name='a', datetime='2024-01-02T10:00:05')
+    first_id = workout_storage.save_workout(workout)
+    # Equal up to exercise name case and seconds
+    same = Workout(exercises=[Exercise(name='snatch ', sets=3, reps=10)], name='a', datetime='2024-01-02T10:00:40')
+
+    assert workout_storage.save_workout(same) == first_id
+    assert workout_storage.save_workouts([workout, workout.model_copy(update={'name': 'b'})])[0] == first_id
+    assert [w['name'] for w in workout_storage.load_workouts()] == ['a', 'b']
+
+
+def test_workout_storage_bulk_append_skips_duplicates(workout_storage):
+    """Test that bulk_append skips saved workouts and duplicates among the records."""
+    workout = Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='a')
+    workout_storage.save_workout(workout)
+    records = [workout.model_dump(), {**workout.model_dump(), 'name': 'b'}, {**workout.model_dump(), 'name': 'b'}]
+
+    assert workout_storage.bulk_append(iter(records)) == 1
+    assert [w['name'] for w in workout_storage.load_workouts()] == ['a', 'b']
+
+
+def test_workout_storage_deduplicate(tmp_path, workout_storage):
+    """Test that deduplicate keeps the first of equal workouts in files written without the check."""
+    workout = Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='a').model_dump()
+    records = [{**workout, 'id': 'x'}, {**workout, 'name': 'b', 'id': 'y'}, {**workout, 'id': 'z'}]
+    (tmp_path / 'test_workouts.json').write_text(json.dumps(records), encoding='utf-8')
+
+    assert workout_storage.deduplicate() == 1
+    assert [w['id'] for w in workout_storage.load_workouts()] == ['x', 'y']
+    assert workout_storage.deduplicate() == 0
+
+
+def test_workout_storage_bulk_append_failure_appends_nothing(workout_storage):
+    """Test WorkoutStorage bulk_append leaves the workout file unchanged if the records raise."""
+    workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+
+    def records():
+        yield Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='b').model_dump()
+        raise ValueError('invalid record')
+
+    with pytest.raises(ValueError):
+        workout_storage.bulk_append(records())
+
+    assert [w['name'] for w in workout_storage.load_workouts()] == ['a']
+    assert not [name for name in os.listdir(os.path.dirname(workout_storage.filename)) if name.endswith('.tmp')]
+
+
+def test_workout_storage_exercise_history(workout_storage):
+    """Test that the exercise history follows saves, edits, bulk appends and writes of other processes."""
+    first_id = workout_storage.save_workout(
+        Workout(exercises=[Exercise(name='Snatch', sets=3, reps=2), Exercise(name='clean', sets=3, reps=1)], name='a')
+    )
+    assert [(p['workout_id'], p['position']) for p in workout_storage.exercise_history('snatch')] == [(first_id, 0)]
+
+    workout_storage.update_workout(first_id, Workout(exercises=[Exercise(name='clean', sets=5, reps=1)], name='a'))
+    second_id = workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=1, reps=1)], name='b'))
+    workout_storage.bulk_append(
+        iter([Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='c').model_dump()])
+    )
+    other = WorkoutStorage(filename=workout_storage.filename)
+    other.save_workout(Workout(exercises=[Exercise(name='snatch ', sets=2, reps=2)], name='d'))
+
+    assert [p['workout'] for p in workout_storage.exercise_history('snatch')] == ['b', 'd']
+    assert [(p['workout'], p['sets']) for p in workout_storage.exercise_history('CLEAN')] == [('a', 5), ('c', 1)]
+    assert workout_storage.exercise_history('snatch')[0]['workout_id'] == second_id
+
+
+@pytest.mark.parametrize('edit', [False, True])
+def test_workout_storage_sees_writes_racing_its_own(workout_storage, edit):
+    """Test that workouts saved by another writer between loading the index and writing are not lost."""
+    first_id = workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=1)], name='a'))
+    other = WorkoutStorage(filename=workout_storage.filename)
+    load_index = workout_storage._load_index
+
+    def racing_load_index(*args, **kwargs):
+        index = load_index(*args, **kwargs)
+        other.save_workout(Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='b'))
+        return index
+
+    with patch.object(workout_storage, '_load_index', racing_load_index):
+        if edit:
+            workout_storage.update_workout(
+                first_id, Workout(exercises=[Exercise(name='jerk', sets=1, reps=1)], name='c')
+            )
+        else:
+            workout_storage.save_workout(Workout(exercises=[Exercise(name='jerk', sets=1, reps=1)], name='c'))
+
+    expected = ['c', 'b'] if edit else ['a', 'b', 'c']
+    assert [w['name'] for w in workout_storage.load_workouts()] == expected
+    assert [w['name'] for w in WorkoutStorage(filename=workout_storage.filename).load_workouts()] == expected
+    # The workouts of the other writer are known to the duplicate check
+    assert workout_storage.save_workout(Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='b')) in {
+        w['id'] for w in other.load_workouts()
+    }
+
+
+def test_workout_storage_sees_writes_landing_after_its_own(workout_storage):
+    """Test that a write of another writer right after ours is not taken for our own."""
+    workout_storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=1)], name='a'))
+    other = WorkoutStorage(filename=workout_storage.filename)
+    track_change = workout_storage._track_change
+
+    def racing_track_change(*args, **kwargs):
+        other.save_workout(Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='b'))
+        track_change(*args, **kwargs)
+
+    with patch.object(workout_storage, '_track_change', racing_track_change):
+        workout_storage.save_workout(Workout(exercises=[Exercise(name='jerk', sets=1, reps=1)], name='c'))
+
+    assert [w['name'] for w in workout_storage.load_workouts()] == ['a', 'c', 'b']
@@ -0,0 +1,84 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+
+from src.models.exercise import Exercise, Workout
+from src.storage.storage import WorkoutStorage
+from src.storage.streaming import iter_json_array
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1 << 16])
+@pytest.mark.parametrize(
+    'text',
+    [
+        '[]',
+        ' [ ] ',
+        '[1]',
+        '[12345, -6.5e3, true, false, null, "a,]b"]',
+        '[{"a": [1, 2, {"b": "}"}]}, [], {}]',
+        '\n[\n  {"name": "squat"},\n  {"name": "bench press"}\n]\n',
+    ],
+)
+def test_iter_json_array(text, chunk_size):
+    """Test that iter_json_array yields the same elements as json.loads."""
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == json.loads(text)
+
+
+@pytest.mark.parametrize('text', ['', '{}', '[1', '[1,]', '[1 2]', '[{"a": 1}'])
+def test_iter_json_array_invalid(text):
+    """Test that iter_json_array raises on invalid arrays."""
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO(text), chunk_size=2))
+
+
+def test_iter_workouts_matches_load_workouts(tmp_path):
+    """Test that iter_workouts resolves edits and deletes like load_workouts."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'))
+    assert list(storage.iter_workouts()) == []
+
+    ids = [
+        storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name=str(idx)))
+        for idx in range(5)
+    ]
+    storage.delete_workout(ids[0])
+    storage.update_workout(ids[2], Workout(exercises=[Exercise(name='clean', sets=1, reps=1)], name='edit'))
+    storage.update_workout(ids[3], Workout(exercises=[Exercise(name='jerk', sets=1, reps=1)], name='first edit'))
+    storage.update_workout(ids[3], Workout(exercises=[Exercise(name='jerk', sets=1, reps=1)], name='second edit'))
+
+    workouts = list(storage.iter_workouts(chunk_size=16))
+    assert workouts == storage.load_workouts()
+    assert [w['name'] for w in workouts] == ['1', 'edit', 'second edit', '4']
+
+
+def test_iter_workouts_legacy_workouts_without_id(tmp_path):
+    """Test that iter_workouts assigns the same ids to legacy workouts as load_workouts."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'))
+    legacy = Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='legacy').model_dump()
+    with open(storage.filename, 'w', encoding='utf-8') as file_:
+        json.dump([legacy, legacy], file_)
+
+    assert [w['id'] for w in storage.iter_workouts()] == ['legacy-0', 'legacy-1']
+
+
+def test_iter_workouts_memory_is_bounded(tmp_path):
+    """Test that iterating a large workout file does not load it into memory."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'))
+    workout = {
+        'exercises': [{'name': 'squat', 'sets': 5, 'reps': 5, 'weight': 100.0}] * 10,
+        'name': 'leg day',
+        'date': '2024-01-01',
+        'datetime': '2024-01-01T10:00:00',
+        'notes': None,
+    }
+    with open(storage.filename, 'w', encoding='utf-8') as file_:
+        json.dump([{**workout, 'id': str(idx)} for idx in range(5_000)], file_)
+
+    tracemalloc.start()
+    count = sum(1 for _ in storage.iter_workouts())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == 5_000
+    assert peak < 500_000
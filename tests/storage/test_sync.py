@@ -0,0 +1,193 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.models.exercise import Exercise, Workout
+from src.storage.storage import WorkoutStorage
+from src.storage.sync import SyncClient, SyncError
+from src.storage.sync_server import SyncServer
+
+
+def workout(name: str) -> Workout:
+    """Workout with a single exercise."""
+    return Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name=name)
+
+
+def run_with_server(directory, scenario):
+    """Run a scenario coroutine function with a sync server listening on a free port."""
+
+    async def main():
+        server = SyncServer(str(directory))
+        _, port = await server.start(port=0)
+        try:
+            return await scenario(port)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def names(storage: WorkoutStorage) -> list[str]:
+    """Sorted names of the saved workouts."""
+    return sorted(w['name'] for w in storage.load_workouts() or [])
+
+
+def test_sync_between_devices(tmp_path):
+    """Test that saves, edits and deletes on one device reach the other device."""
+    phone = WorkoutStorage(filename=str(tmp_path / 'phone.json'))
+    laptop = WorkoutStorage(filename=str(tmp_path / 'laptop.json'))
+    phone.save_workout(workout('a'))
+    laptop.save_workout(workout('b'))
+
+    async def scenario(port):
+        phone_client = SyncClient(phone, 'alice', port=port)
+        laptop_client = SyncClient(laptop, 'alice', port=port)
+        await phone_client.sync()
+        await laptop_client.sync()
+        await phone_client.sync()
+        assert names(phone) == names(laptop) == ['a', 'b']
+
+        (b_id,) = [w['id'] for w in phone.load_workouts() if w['name'] == 'b']
+        phone.update_workout(b_id, workout('b2'))
+        (a_id,) = [w['id'] for w in laptop.load_workouts() if w['name'] == 'a']
+        laptop.delete_workout(a_id)
+        laptop.save_workout(workout('c'))
+
+        phone_result = await phone_client.sync()
+        laptop_result = await laptop_client.sync()
+        await phone_client.sync()
+        return phone_result, laptop_result
+
+    phone_result, laptop_result = run_with_server(tmp_path / 'server', scenario)
+
+    assert names(phone) == names(laptop) == ['b2', 'c']
+    assert phone_result.pushed == 1
+    assert (laptop_result.pushed, laptop_result.pulled) == (2, 1)
+    assert not (tmp_path / 'phone.json.outbox').exists()
+
+
+def test_sync_cost_is_proportional_to_changes(tmp_path):
+    """Test that a sync only exchanges the workouts changed since the previous sync."""
+    phone = WorkoutStorage(filename=str(tmp_path / 'phone.json'))
+    laptop = WorkoutStorage(filename=str(tmp_path / 'laptop.json'))
+    phone.save_workouts([workout(str(idx)) for idx in range(200)])
+
+    async def scenario(port):
+        phone_client = SyncClient(phone, 'alice', port=port)
+        laptop_client = SyncClient(laptop, 'alice', port=port)
+        first = await phone_client.sync()
+        await laptop_client.sync()
+        phone.save_workout(workout('new'))
+        return first, await phone_client.sync(), await laptop_client.sync()
+
+    first, second, laptop_result = run_with_server(tmp_path / 'server', scenario)
+
+    assert first.pushed == 200
+    assert second.pushed == 1
+    assert laptop_result.pulled == 1
+    assert len(laptop.load_workouts()) == 201
+
+
+def test_sync_last_writer_wins(tmp_path):
+    """Test that concurrent edits of the same workout resolve to the most recent edit."""
+    phone = WorkoutStorage(filename=str(tmp_path / 'phone.json'))
+    laptop = WorkoutStorage(filename=str(tmp_path / 'laptop.json'))
+    workout_id = phone.save_workout(workout('a'))
+
+    async def scenario(port):
+        phone_client = SyncClient(phone, 'alice', port=port)
+        laptop_client = SyncClient(laptop, 'alice', port=port)
+        await phone_client.sync()
+        await laptop_client.sync()
+        laptop.update_workout(workout_id, workout('older'))
+        phone.update_workout(workout_id, workout('newer'))
+        await phone_client.sync()
+        await laptop_client.sync()
+        await phone_client.sync()
+
+    run_with_server(tmp_path / 'server', scenario)
+
+    assert names(phone) == names(laptop) == ['newer']
+
+
+def test_sync_server_keeps_users_apart_and_survives_restart(tmp_path):
+    """Test that users only see their own workouts, also after the server restarts."""
+    alice = WorkoutStorage(filename=str(tmp_path / 'alice.json'))
+    bob = WorkoutStorage(filename=str(tmp_path / 'bob.json'))
+    alice.save_workout(workout('alice'))
+    bob.save_workout(workout('bob'))
+
+    async def push(port):
+        await SyncClient(alice, 'alice', port=port).sync()
+        await SyncClient(bob, 'bob', port=port).sync()
+
+    run_with_server(tmp_path / 'server', push)
+
+    fresh = WorkoutStorage(filename=str(tmp_path / 'fresh.json'))
+    run_with_server(tmp_path / 'server', lambda port: SyncClient(fresh, 'alice', port=port).sync())
+
+    assert names(fresh) == ['alice']
+
+
+def test_sync_assigns_ids_to_legacy_workouts(tmp_path):
+    """Test that workouts saved without an id get a unique id before they are shared."""
+    phone = WorkoutStorage(filename=str(tmp_path / 'phone.json'))
+    (tmp_path / 'phone.json').write_text(json.dumps([workout('legacy').model_dump()]), encoding='utf-8')
+
+    run_with_server(tmp_path / 'server', lambda port: SyncClient(phone, 'alice', port=port).sync())
+
+    (saved,) = phone.load_workouts()
+    assert not saved['id'].startswith('legacy-')
+
+
+def test_sync_rejects_invalid_user(tmp_path):
+    """Test that the server rejects user names that are not safe file names."""
+    phone = WorkoutStorage(filename=str(tmp_path / 'phone.json'))
+    phone.save_workout(workout('a'))
+
+    with pytest.raises(SyncError, match='Invalid user'):
+        run_with_server(tmp_path / 'server', lambda port: SyncClient(phone, '../etc', port=port).sync())
+
+
+def test_sync_server_answers_malformed_requests(tmp_path):
+    """Test that the server answers a malformed line with an error and keeps the connection open."""
+
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"op": "pull"\n' + json.dumps({'op': 'pull', 'user': 'alice', 'since': 0}).encode() + b'\n')
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        await writer.wait_closed()
+        return responses
+
+    malformed, pulled = run_with_server(tmp_path / 'server', scenario)
+
+    assert not malformed['ok']
+    assert pulled == {'ok': True, 'changes': [], 'cursor': 0, 'more': False}
+
+
+def test_sync_redoes_failed_first_push(tmp_path):
+    """Test that the saved workouts are pushed again when the push of the first sync fails."""
+    phone = WorkoutStorage(filename=str(tmp_path / 'phone.json'))
+    phone.save_workouts([workout('a'), workout('b'), workout('c')])
+    laptop = WorkoutStorage(filename=str(tmp_path / 'laptop.json'))
+
+    async def scenario(port):
+        phone_client = SyncClient(phone, 'alice', port=port)
+        with (
+            patch.object(SyncClient, '_push', side_effect=SyncError('Rejected')),
+            pytest.raises(SyncError, match='Rejected'),
+        ):
+            await phone_client.sync()
+        result = await phone_client.sync()
+        await SyncClient(laptop, 'alice', port=port).sync()
+        return result
+
+    result = run_with_server(tmp_path / 'server', scenario)
+
+    assert result.pushed == 3
+    assert names(laptop) == ['a', 'b', 'c']
+    assert 'initial' not in json.loads((tmp_path / 'phone.json.sync').read_text(encoding='utf-8'))
@@ -0,0 +1,223 @@
+import operator
+import os
+import threading
+import time
+
+import pytest
+
+from src.models.exercise import Exercise, Workout
+from src.models.profile import Profile
+from src.storage.storage import ExerciseStorage, ProfileStorage, WorkoutStorage
+from src.storage.write_behind import WriteBehindQueue, get_write_queue
+
+
+@pytest.fixture
+def writer():
+    """WriteBehindQueue fixture with a delay long enough to only flush explicitly."""
+    queue = WriteBehindQueue(max_delay=60)
+    yield queue
+    queue.flush(timeout=5)
+
+
+def test_submit_coalesces_writes(writer):
+    """Test that queued writes with the same key are coalesced."""
+    written = []
+    writer.submit('replace', 1, written.append)
+    writer.submit('replace', 2, written.append)
+    writer.submit('merge', [1], written.append, operator.add)
+    writer.submit('merge', [2], written.append, operator.add)
+
+    assert writer.pending('replace') == 2
+    assert writer.pending('merge') == [1, 2]
+    assert not written
+
+    writer.flush(timeout=5)
+
+    assert written == [2, [1, 2]]
+    assert writer.pending('replace') is None
+    assert writer.pending('merge') is None
+
+
+def test_writes_are_flushed_after_max_delay():
+    """Test that queued writes are persisted without flush once max_delay has passed."""
+    queue = WriteBehindQueue(max_delay=0.05)
+    done = threading.Event()
+    queue.submit('key', 1, lambda payload: done.set())
+
+    assert done.wait(timeout=5)
+
+
+def test_flush_raises_write_error(writer):
+    """Test that flush raises the error of a failing write and keeps the payload queued."""
+    attempts = []
+
+    def failing_write(payload):
+        attempts.append(payload)
+        if len(attempts) == 1:
+            raise OSError('disk full')
+
+    writer.submit('key', 1, failing_write)
+    with pytest.raises(OSError, match='disk full'):
+        writer.flush(timeout=5)
+    assert writer.pending('key') == 1
+
+    writer.flush(timeout=5)
+    assert attempts == [1, 1]
+
+
+def test_storage_flush_only_waits_for_its_own_writes(tmp_path, writer):
+    """Test that a storage flush persists the writes of the storage, and ignores failing writes of others."""
+    attempts = []
+
+    def failing_write(payload):
+        attempts.append(payload)
+        if len(attempts) == 1:
+            raise OSError('disk full')
+
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'), writer=writer)
+    writer.submit('other', 1, failing_write)
+    storage.save_workout(Workout(exercises=[Exercise(name='squat', sets=3, reps=5)], name='a'))
+    storage.flush(timeout=5)
+
+    assert [w['name'] for w in WorkoutStorage(filename=storage.filename).load_workouts()] == ['a']
+    with pytest.raises(OSError, match='disk full'):
+        writer.flush(timeout=5)
+
+
+def test_flush_timeout(writer):
+    """Test that flush raises TimeoutError if the writes do not finish in time."""
+    release = threading.Event()
+    writer.submit('key', 1, lambda payload: release.wait(timeout=5))
+    with pytest.raises(TimeoutError):
+        writer.flush(timeout=0.05)
+    release.set()
+
+
+def test_get_write_queue_is_shared():
+    """Test that the default write queue is shared."""
+    assert get_write_queue() is get_write_queue()
+
+
+def test_profile_storage_write_behind(tmp_path, writer):
+    """Test ProfileStorage serves pending writes before they are persisted."""
+    storage = ProfileStorage(filename=str(tmp_path / 'profile.json'), writer=writer)
+    storage.save_profile(Profile(name='Test User', dob='1990-01-01', weight=70))
+
+    assert not os.path.exists(storage.filename)
+    assert storage.profile_exists()
+    assert storage.load_profile().name == 'Test User'
+
+    storage.flush(timeout=5)
+
+    assert os.path.exists(storage.filename)
+    assert ProfileStorage(filename=storage.filename).load_profile().name == 'Test User'
+
+
+def test_exercise_storage_write_behind(tmp_path, writer):
+    """Test ExerciseStorage coalesces pending writes."""
+    storage = ExerciseStorage(filename=str(tmp_path / 'exercises.json'), writer=writer)
+    storage.save_exercise('pushup')
+    storage.save_exercise('snatch')
+    storage.save_exercise('pushup')
+
+    assert not os.path.exists(storage.filename)
+    assert storage.load_exercises() == ['pushup', 'snatch']
+
+    storage.flush(timeout=5)
+
+    assert ExerciseStorage(filename=storage.filename).load_exercises() == ['pushup', 'snatch']
+
+
+def test_workout_storage_write_behind(tmp_path, writer):
+    """Test WorkoutStorage serves pending saves, edits and deletes before they are persisted."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'), writer=writer)
+    first_id = storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+    second_id = storage.save_workout(Workout(exercises=[Exercise(name='clean', sets=3, reps=10)], name='b'))
+    storage.update_workout(first_id, Workout(exercises=[Exercise(name='jerk', sets=5, reps=1)], name='c'))
+    storage.delete_workout(second_id)
+
+    assert not os.path.exists(storage.filename)
+    assert [w['name'] for w in storage.load_workouts()] == ['c']
+    # Other storage instances sharing the queue see the pending writes as well
+    assert [w['name'] for w in WorkoutStorage(filename=storage.filename, writer=writer).load_workouts()] == ['c']
+
+    storage.flush(timeout=5)
+
+    assert [w['name'] for w in WorkoutStorage(filename=storage.filename).load_workouts()] == ['c']
+
+
+def test_workout_storage_write_behind_compaction_keeps_pending_writes(tmp_path, writer):
+    """Test that compaction leaves writes pending in the queue untouched."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'), writer=writer)
+    first_id = storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+    storage.flush(timeout=5)
+    storage.delete_workout(first_id)
+    second_id = storage.save_workout(Workout(exercises=[Exercise(name='clean', sets=3, reps=10)], name='b'))
+
+    storage.compact()
+    storage.flush(timeout=5)
+
+    assert [w['id'] for w in WorkoutStorage(filename=storage.filename).load_workouts()] == [second_id]
+
+
+def test_writer_does_not_block_saves(tmp_path, writer):
+    """Test that saving returns immediately while the writer is busy."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_write(payload):
+        started.set()
+        release.wait(timeout=5)
+
+    writer.submit('slow', None, slow_write)
+    flusher = threading.Thread(target=writer.flush, kwargs={'timeout': 5})
+    flusher.start()
+    assert started.wait(timeout=5)
+
+    storage = ProfileStorage(filename=str(tmp_path / 'profile.json'), writer=writer)
+    start = time.monotonic()
+    storage.save_profile(Profile(name='Test User', dob='1990-01-01', weight=70))
+    assert time.monotonic() - start < 1
+
+    release.set()
+    flusher.join()
+
+
+def test_writer_only_blocks_reads_of_the_written_key(tmp_path, writer):
+    """Test that a slow write holds off the reads of its own key but not the reads of other keys."""
+    started = threading.Event()
+    release = threading.Event()
+    written = []
+
+    def slow_write(payload):
+        started.set()
+        release.wait(timeout=5)
+        written.append(payload)
+
+    writer.submit('slow', 'data', slow_write)
+    flusher = threading.Thread(target=writer.flush, kwargs={'timeout': 5})
+    flusher.start()
+    assert started.wait(timeout=5)
+
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'), writer=writer)
+    start = time.monotonic()
+    assert storage.load_workouts() is None
+    with writer.snapshot('other'):
+        assert time.monotonic() - start < 1
+
+    seen = []
+
+    def read_slow():
+        with writer.snapshot('slow'):
+            seen.append((writer.pending('slow'), list(written)))
+
+    reader = threading.Thread(target=read_slow)
+    reader.start()
+    reader.join(timeout=0.1)
+    assert reader.is_alive()
+
+    release.set()
+    flusher.join()
+    reader.join(timeout=5)
+    # The reader sees the written data without the payload pending any longer
+    assert seen == [(None, ['data'])]
@@ -0,0 +1,258 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.cli import main
+from src.models.exercise import Exercise, Workout
+from src.storage.backends import BACKEND_VARIABLE, open_storages
+from src.storage.storage import WorkoutStorage
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def records():
+    """Workout records fixture."""
+    return [
+        {
+            'name': 'leg day',
+            'exercises': [{'name': 'Squat', 'sets': 3, 'reps': 5, 'weight': 100.0}],
+            'date': '2024-01-02',
+            'datetime': '2024-01-02T10:00:00',
+        },
+        {
+            'name': 'push day',
+            'exercises': [
+                {'name': 'Bench Press', 'sets': 4, 'reps': 8, 'weight': 60.0},
+                {'name': 'Squat', 'sets': 1, 'reps': 1},
+            ],
+            'date': '2024-01-04',
+            'datetime': '2024-01-04T10:00:00',
+        },
+    ]
+
+
+def test_cli_does_not_import_kivy_or_models():
+    """Test that the CLI can be imported without loading Kivy, the pydantic models or the command modules."""
+    code = (
+        'import sys, src.cli; '
+        'print(sorted(m for m in sys.modules if m.split(".")[0] in ("kivy", "kivymd", "pydantic", "asyncio", "ssl") '
+        'or m in ("src.storage.sync", "src.storage.backup", "src.storage.importer", "src.storage.exporter")))'
+    )
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, text=True)
+    assert output.strip() == '[]'
+
+
+@pytest.mark.parametrize('extension', ['json', 'jsonl'])
+def test_import_export_roundtrip(tmp_path, records, extension, capsys):
+    """Test importing workouts and exporting them again."""
+    source = tmp_path / f'in.{extension}'
+    if extension == 'json':
+        source.write_text(json.dumps(records), encoding='utf-8')
+    else:
+        source.write_text('\n'.join(json.dumps(record) for record in records), encoding='utf-8')
+
+    assert main(['--data-dir', str(tmp_path), 'import', str(source)]) == 0
+    assert 'imported 2 workouts' in capsys.readouterr().out
+
+    output = tmp_path / f'out.{extension}'
+    assert main(['--data-dir', str(tmp_path), 'export', '--output', str(output)]) == 0
+    text = output.read_text(encoding='utf-8')
+    exported = json.loads(text) if extension == 'json' else [json.loads(line) for line in text.splitlines()]
+    assert [
+        {key: value for key, value in workout.items() if key not in ('id', 'schema_version')} for workout in exported
+    ] == [Workout(**record).model_dump() for record in records]
+
+
+def test_import_invalid_rows(tmp_path, records, capsys):
+    """Test that invalid rows are reported and nothing is imported unless skipped."""
+    records.append({'name': 'empty', 'exercises': []})
+    source = tmp_path / 'in.json'
+    source.write_text(json.dumps(records), encoding='utf-8')
+
+    assert main(['--data-dir', str(tmp_path), 'import', str(source)]) == 1
+    assert 'row 3' in capsys.readouterr().err
+    assert not os.path.exists(tmp_path / 'workouts.json')
+
+    assert main(['--data-dir', str(tmp_path), 'import', '--skip-invalid', str(source)]) == 0
+    assert len(WorkoutStorage(filename=str(tmp_path / 'workouts.json')).load_workouts()) == 2
+
+
+def test_stats(tmp_path, records, capsys):
+    """Test workout statistics."""
+    source = tmp_path / 'in.json'
+    source.write_text(json.dumps(records), encoding='utf-8')
+    main(['--data-dir', str(tmp_path), 'import', str(source)])
+    capsys.readouterr()
+
+    assert main(['--data-dir', str(tmp_path), 'stats', '--json']) == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert stats['workouts'] == 2
+    assert stats['exercises'] == 2
+    assert stats['sets'] == 8
+    assert stats['reps'] == 15 + 32 + 1
+    assert stats['volume_kg'] == 1500.0 + 1920.0
+    assert stats['first_date'] == '2024-01-02'
+    assert stats['last_date'] == '2024-01-04'
+    assert stats['top_exercises'][0] == ['squat', 2]
+
+
+def test_history(tmp_path, records, capsys):
+    """Test printing the performances of an exercise."""
+    source = tmp_path / 'in.json'
+    source.write_text(json.dumps(records), encoding='utf-8')
+    main(['--data-dir', str(tmp_path), 'import', str(source)])
+    capsys.readouterr()
+
+    assert main(['--data-dir', str(tmp_path), 'history', 'squat']) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        '2024-01-02  leg day: 3 x 5 @ 100 kg',
+        '2024-01-04  push day: 1 x 1',
+        '2 performances of squat',
+    ]
+
+    assert main(['--data-dir', str(tmp_path), 'history', 'Bench Press', '--json']) == 0
+    (performance,) = json.loads(capsys.readouterr().out)
+    assert (performance['workout'], performance['position'], performance['weight']) == ('push day', 0, 60.0)
+
+
+def test_compact(tmp_path, capsys):
+    """Test compacting the change log."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'))
+    workout_id = storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+    storage.delete_workout(workout_id)
+
+    assert main(['--data-dir', str(tmp_path), 'compact']) == 0
+    assert 'dead ratio 1.00 -> 0.00' in capsys.readouterr().out
+    assert not os.path.exists(storage.log_filename)
+
+
+def test_verify(tmp_path, capsys):
+    """Test verifying the stored data."""
+    storage = WorkoutStorage(filename=str(tmp_path / 'workouts.json'))
+    storage.save_workout(Workout(exercises=[Exercise(name='snatch', sets=3, reps=10)], name='a'))
+    assert main(['--data-dir', str(tmp_path), 'verify']) == 0
+
+    with open(storage.filename, 'w', encoding='utf-8') as file_:
+        json.dump([{'id': 'x', 'name': 'a', 'exercises': [{'name': 'snatch', 'sets': -1, 'reps': 1}]}], file_)
+    assert main(['--data-dir', str(tmp_path), 'verify']) == 1
+    assert 'invalid workout x' in capsys.readouterr().err
+
+    Path(storage.filename).write_text('[{"id": ', encoding='utf-8')
+    assert main(['--data-dir', str(tmp_path), 'verify']) == 1
+    assert 'unreadable workout file' in capsys.readouterr().err
+
+
+def test_backend(tmp_path, monkeypatch, capsys):
+    """Test that reading commands use the selected backend and file commands refuse other backends."""
+    storages = open_storages('sqlite', str(tmp_path))
+    storages.workouts.save_workout(Workout(exercises=[Exercise(name='Squat', sets=3, reps=5)], name='a'))
+    storages.exercises.save_exercise('squat')
+
+    assert main(['--data-dir', str(tmp_path), '--backend', 'sqlite', 'stats', '--json']) == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert (stats['workouts'], stats['exercises'], stats['dead_ratio']) == (1, 1, None)
+
+    monkeypatch.setenv(BACKEND_VARIABLE, 'sqlite')
+    assert main(['--data-dir', str(tmp_path), 'history', 'squat']) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == '1 performances of squat'
+    assert main(['--data-dir', str(tmp_path), 'verify']) == 0
+    assert 'checked 1 workouts' in capsys.readouterr().out
+
+    for command in (['compact'], ['dedup'], ['sync', '--user', 'alice'], ['backup']):
+        assert main(['--data-dir', str(tmp_path), *command]) == 1
+        assert f'{command[0]} only works with the json backend, not sqlite' in capsys.readouterr().err
+    assert not os.path.exists(tmp_path / 'workouts.json')
+
+    with pytest.raises(SystemExit):
+        main(['--data-dir', str(tmp_path), '--backend', 'missing', 'stats'])
+    assert 'unknown storage backend' in capsys.readouterr().err
+
+
+def test_import_csv(tmp_path, capsys):
+    """Test importing workouts from a csv file."""
+    source = tmp_path / 'in.csv'
+    source.write_text(
+        'workout,date,datetime,notes,exercise,sets,reps,weight\n'
+        'legs,2024-01-02,2024-01-02T10:00:00,,Squat,3,5,100\n'
+        'legs,2024-01-02,2024-01-02T10:00:00,,Lunge,3,10,\n'
+        'push,2024-01-03,2024-01-03T10:00:00,,Bench,five,5,80\n',
+        encoding='utf-8',
+    )
+
+    assert main(['--data-dir', str(tmp_path), 'import', '--workers', '1', str(source)]) == 1
+    assert 'row 4' in capsys.readouterr().err
+
+    assert main(['--data-dir', str(tmp_path), 'import', '--workers', '2', '--skip-invalid', str(source)]) == 0
+    workouts = WorkoutStorage(filename=str(tmp_path / 'workouts.json')).load_workouts()
+    assert [len(workout['exercises']) for workout in workouts] == [2]
+
+
+def test_export_compressed_csv(tmp_path, records, capsys):
+    """Test exporting a filtered, compressed csv file and importing it again."""
+    source = tmp_path / 'in.json'
+    source.write_text(json.dumps(records), encoding='utf-8')
+    main(['--data-dir', str(tmp_path), 'import', str(source)])
+
+    output = tmp_path / 'out.csv.gz'
+    assert main(['--data-dir', str(tmp_path), 'export', '-o', str(output), '--exercise', 'squat']) == 0
+    assert 'exported 2 workouts' in capsys.readouterr().out
+
+    target = tmp_path / 'target'
+    target.mkdir()
+    assert main(['--data-dir', str(target), 'import', str(output)]) == 0
+    workouts = WorkoutStorage(filename=str(target / 'workouts.json')).load_workouts()
+    assert [[exercise['name'] for exercise in workout['exercises']] for workout in workouts] == [['Squat'], ['Squat']]
+
+
+def test_sync_unreachable_server(tmp_path, capsys):
+    """Test that a sync reports an unreachable server."""
+    assert main(['--data-dir', str(tmp_path), 'sync', '--user', 'alice', '--port', '1']) == 1
+    assert 'sync failed' in capsys.readouterr().err
+
+
+def test_merge(tmp_path, records, capsys):
+    """Test merging the workouts file of another device."""
+    source = tmp_path / 'in.json'
+    source.write_text(json.dumps(records), encoding='utf-8')
+    other = tmp_path / 'other'
+    other.mkdir()
+    main(['--data-dir', str(other), 'import', str(source)])
+    capsys.readouterr()
+
+    assert main(['--data-dir', str(tmp_path), 'merge', str(other / 'workouts.json')]) == 0
+    assert 'merged 2 workouts' in capsys.readouterr().out
+    assert main(['--data-dir', str(tmp_path), 'merge', str(other / 'workouts.json')]) == 0
+    assert 'merged 0 workouts' in capsys.readouterr().out
+    assert main(['--data-dir', str(tmp_path), 'merge', str(tmp_path / 'missing.json')]) == 1
+
+
+def test_dedup(tmp_path, records, capsys):
+    """Test that the dedup command removes repeated workouts."""
+    (tmp_path / 'workouts.json').write_text(json.dumps([*records, records[0]]), encoding='utf-8')
+
+    assert main(['--data-dir', str(tmp_path), 'dedup']) == 0
+    assert 'removed 1 duplicate workouts' in capsys.readouterr().out
+    assert [w['name'] for w in WorkoutStorage(str(tmp_path / 'workouts.json')).load_workouts()] == [
+        'leg day',
+        'push day',
+    ]
+
+
+def test_backup_restore(tmp_path, records, capsys):
+    """Test backing up, listing snapshots and restoring."""
+    (tmp_path / 'workouts.json').write_text(json.dumps(records), encoding='utf-8')
+
+    assert main(['--data-dir', str(tmp_path), 'backup']) == 0
+    assert '1 files, 1 new chunks' in capsys.readouterr().out
+    assert main(['--data-dir', str(tmp_path), 'backup', '--list']) == 0
+    snapshot = capsys.readouterr().out.strip()
+
+    (tmp_path / 'workouts.json').write_text('[]', encoding='utf-8')
+    assert main(['--data-dir', str(tmp_path), 'restore', snapshot]) == 0
+    assert json.loads((tmp_path / 'workouts.json').read_text(encoding='utf-8')) == records
+    assert main(['--data-dir', str(tmp_path), 'restore', 'unknown']) == 1
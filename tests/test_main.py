@@ -5,18 +5,18 @@ from kivy.uix.screenmanager import Screen, ScreenManager
 
 # We need to patch the Builder before importing ExerciseApp
 with patch('kivy.lang.builder.Builder.load_file'):
-    from src.main import ExerciseApp
+    from src.main import FLUSH_TIMEOUT, ExerciseApp
 
 
 @pytest.fixture
 def exercise_app():
     """ExerciseApp fixture."""
-    # Patch ProfileStorage
-    with patch('src.main.ProfileStorage') as mock_profile_storage:
+    # Patch the storages
+    with patch('src.main.get_storages') as mock_get_storages:
         mock_storage = Mock()
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
-        # Create an ExerciseApp instance with patched ProfileStorage
+        # Create an ExerciseApp instance with patched storages
         app = ExerciseApp()
 
         return app
@@ -39,7 +39,7 @@ def test_build_creates_screen_manager():
         patch('src.main.MainScreen') as mock_main_screen,
         patch('src.main.WorkoutPlanningScreen') as mock_workout_planning_screen,
         patch('src.main.WorkoutListScreen') as mock_workout_list_screen,
-        patch('src.main.ProfileStorage') as mock_profile_storage,
+        patch('src.main.get_storages') as mock_get_storages,
     ):
         # Create actual Screen instances for our mocks to return
         profile_screen = Screen(name='profile')
@@ -55,7 +55,7 @@ def test_build_creates_screen_manager():
 
         # Setup mock storage
         mock_storage = Mock()
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
         # Create app and call build
         app = ExerciseApp()
@@ -79,7 +79,7 @@ def test_build_adds_all_screens():
         patch('src.main.MainScreen') as mock_main_screen,
         patch('src.main.WorkoutPlanningScreen') as mock_workout_planning_screen,
         patch('src.main.WorkoutListScreen') as mock_workout_list_screen,
-        patch('src.main.ProfileStorage') as mock_profile_storage,
+        patch('src.main.get_storages') as mock_get_storages,
     ):
         # Create actual Screen instances for our mocks to return
         profile_screen = Screen(name='profile')
@@ -95,7 +95,7 @@ def test_build_adds_all_screens():
 
         # Setup mock storage
         mock_storage = Mock()
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
         # Create app and call build
         app = ExerciseApp()
@@ -117,7 +117,7 @@ def test_initial_screen_with_profile():
         patch('src.main.MainScreen') as mock_main_screen,
         patch('src.main.WorkoutPlanningScreen') as mock_workout_planning_screen,
         patch('src.main.WorkoutListScreen') as mock_workout_list_screen,
-        patch('src.main.ProfileStorage') as mock_profile_storage,
+        patch('src.main.get_storages') as mock_get_storages,
     ):
         # Create actual Screen instances for our mocks to return
         profile_screen = Screen(name='profile')
@@ -134,7 +134,7 @@ def test_initial_screen_with_profile():
         # Setup mock storage with profile_exists returning True
         mock_storage = Mock()
         mock_storage.profile_exists.return_value = True
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
         # Create app and call build
         app = ExerciseApp()
@@ -152,7 +152,7 @@ def test_initial_screen_without_profile():
         patch('src.main.MainScreen') as mock_main_screen,
         patch('src.main.WorkoutPlanningScreen') as mock_workout_planning_screen,
         patch('src.main.WorkoutListScreen') as mock_workout_list_screen,
-        patch('src.main.ProfileStorage') as mock_profile_storage,
+        patch('src.main.get_storages') as mock_get_storages,
     ):
         # Create actual Screen instances for our mocks to return
         profile_screen = Screen(name='profile')
@@ -169,7 +169,7 @@ def test_initial_screen_without_profile():
         # Setup mock storage with profile_exists returning False
         mock_storage = Mock()
         mock_storage.profile_exists.return_value = False
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
         # Create app and call build
         app = ExerciseApp()
@@ -187,7 +187,7 @@ def test_storage_initialization():
         patch('src.main.MainScreen') as mock_main_screen,
         patch('src.main.WorkoutPlanningScreen') as mock_workout_planning_screen,
         patch('src.main.WorkoutListScreen') as mock_workout_list_screen,
-        patch('src.main.ProfileStorage') as mock_profile_storage,
+        patch('src.main.get_storages') as mock_get_storages,
     ):
         # Create actual Screen instances for our mocks to return
         profile_screen = Screen(name='profile')
@@ -203,7 +203,7 @@ def test_storage_initialization():
 
         # Setup mock storage
         mock_storage = Mock()
-        mock_profile_storage.return_value = mock_storage
+        mock_get_storages.return_value.profile = mock_storage
 
         # Create app and call build
         app = ExerciseApp()
@@ -212,3 +212,34 @@ def test_storage_initialization():
         # Verify storage was initialized
         assert app.storage is not None
         assert app.storage == mock_storage
+
+
+def test_on_pause_flushes_pending_writes():
+    """Test that pending storage writes are flushed when the app is paused."""
+    with patch('src.main.get_write_queue') as mock_get_write_queue:
+        app = ExerciseApp()
+
+        assert app.on_pause() is True
+        mock_get_write_queue.return_value.flush.assert_called_once_with(FLUSH_TIMEOUT)
+
+
+def test_on_stop_flushes_pending_writes():
+    """Test that pending storage writes are flushed when the app is stopped."""
+    with patch('src.main.get_write_queue') as mock_get_write_queue:
+        app = ExerciseApp()
+        app.on_stop()
+
+        mock_get_write_queue.return_value.flush.assert_called_once()
+
+
+@pytest.mark.parametrize('error', [OSError('disk full'), TimeoutError('Pending writes were not flushed in time')])
+def test_pause_and_stop_survive_failing_writes(error):
+    """Test that a failing or slow write is logged instead of crashing the app on pause or stop."""
+    with patch('src.main.get_write_queue') as mock_get_write_queue, patch('src.main.Logger') as mock_logger:
+        mock_get_write_queue.return_value.flush.side_effect = error
+        app = ExerciseApp()
+
+        assert app.on_pause() is True
+        app.on_stop()
+
+    assert mock_logger.error.call_count == 2
@@ -0,0 +1,152 @@
+import asyncio
+import os
+
+from src.server import OPS, ShardedStore, WorkoutServer
+from src.storage.storage import WorkoutStorage
+from src.storage.sync import receive_message, send_message
+
+WORKOUT = {'name': 'legs', 'exercises': [{'name': 'Squat', 'sets': 3, 'reps': 5, 'weight': 100}]}
+
+
+def run_with_server(store, scenario):
+    """Run a scenario coroutine function with a workout server listening on a free port."""
+
+    async def main():
+        server = WorkoutServer(store, pool_size=4)
+        _, port = await server.start(port=0)
+        try:
+            return await scenario(port)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+async def request(port: int, *requests: dict) -> list[dict]:
+    """Send requests over a single connection and return the responses."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    for message in requests:
+        await send_message(writer, message)
+        response = await receive_message(reader)
+        assert response is not None, 'the server closed the connection'
+        responses.append(response)
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+def test_server_concurrent_users(tmp_path):
+    """Test that concurrent users save and load their own workouts."""
+    store = ShardedStore(str(tmp_path), shards=4)
+    users = [f'user{idx}' for idx in range(20)]
+
+    async def scenario(port):
+        saves = [
+            request(port, *({'op': 'save_workout', 'user': user, 'workout': {**WORKOUT, 'name': n}} for n in 'abc'))
+            for user in users
+        ]
+        await asyncio.gather(*saves)
+        return await asyncio.gather(*(request(port, {'op': 'load_workouts', 'user': user}) for user in users))
+
+    loaded = run_with_server(store, scenario)
+
+    assert all(len(response['result']) == 3 for (response,) in loaded)
+    stored = WorkoutStorage(os.path.join(tmp_path, f'shard-{store.shard("user0"):02d}', 'user0', 'workouts.json'))
+    assert len(stored.load_workouts()) == 3
+
+
+def test_server_ops(tmp_path):
+    """Test updating, deleting and loading workouts, exercises and profiles."""
+    store = ShardedStore(str(tmp_path), shards=2)
+
+    async def scenario(port):
+        (saved,) = await request(port, {'op': 'save_workout', 'user': 'alice', 'workout': WORKOUT})
+        workout_id = saved['result']
+        return await request(
+            port,
+            {'op': 'update_workout', 'user': 'alice', 'id': workout_id, 'workout': {**WORKOUT, 'name': 'legs 2'}},
+            {'op': 'get_workout', 'user': 'alice', 'id': workout_id},
+            {'op': 'exercise_history', 'user': 'alice', 'exercise': 'SQUAT'},
+            {'op': 'load_exercises', 'user': 'alice'},
+            {'op': 'save_profile', 'user': 'alice', 'profile': {'name': 'Alice', 'dob': '1990-01-01', 'weight': 60}},
+            {'op': 'load_profile', 'user': 'alice'},
+            {'op': 'delete_workout', 'user': 'alice', 'id': workout_id},
+            {'op': 'load_workouts', 'user': 'alice'},
+            {'op': 'load_workouts', 'user': 'bob'},
+        )
+
+    updated, got, history, exercises, _, profile, _, alice, bob = run_with_server(store, scenario)
+
+    assert updated['ok']
+    assert got['result']['name'] == 'legs 2'
+    assert [(performance['workout'], performance['weight']) for performance in history['result']] == [('legs 2', 100)]
+    assert exercises['result'] == ['squat']
+    assert profile['result']['name'] == 'Alice'
+    assert alice['result'] == bob['result'] == []
+
+
+def test_server_errors(tmp_path):
+    """Test that invalid requests are answered with an error and the connection stays usable."""
+    store = ShardedStore(str(tmp_path), shards=2)
+
+    async def scenario(port):
+        return await request(
+            port,
+            {'op': 'save_workout', 'user': 'alice', 'workout': {'name': 'empty', 'exercises': []}},
+            {'op': 'delete_workout', 'user': 'alice', 'id': 'missing'},
+            {'op': 'load_workouts', 'user': '../etc'},
+            {'op': 'drop_tables', 'user': 'alice'},
+            {'op': 'load_workouts', 'user': 'alice'},
+        )
+
+    *errors, last = run_with_server(store, scenario)
+
+    assert [response['ok'] for response in errors] == [False] * 4
+    assert 'Invalid user' in errors[2]['error']
+    assert last == {'ok': True, 'result': []}
+
+
+def test_server_malformed_and_failed_requests(tmp_path, monkeypatch):
+    """Test that malformed lines and storage errors are answered with an error on a usable connection."""
+    store = ShardedStore(str(tmp_path), shards=2)
+
+    def timeout(storages, request):
+        raise TimeoutError('Pending writes were not flushed in time')
+
+    monkeypatch.setitem(OPS, 'load_exercises', timeout)
+
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"op": "load_workouts", \n[1, 2]\n')
+        responses = [await receive_message(reader), await receive_message(reader)]
+        responses += await asyncio.gather(
+            *(request(port, {'op': op, 'user': 'alice'}) for op in ('load_exercises', 'load_workouts'))
+        )
+        await send_message(writer, {'op': 'load_workouts', 'user': 'alice'})
+        responses.append(await receive_message(reader))
+        writer.close()
+        await writer.wait_closed()
+        return responses
+
+    malformed, not_a_dict, (failed,), (loaded,), last = run_with_server(store, scenario)
+
+    assert not malformed['ok'] and 'Malformed request' in malformed['error']
+    assert not not_a_dict['ok']
+    assert failed == {'ok': False, 'error': 'Storage error: Pending writes were not flushed in time'}
+    assert loaded == last == {'ok': True, 'result': []}
+
+
+def test_sharded_store_pool_evicts_least_recently_used(tmp_path):
+    """Test that the pool keeps at most max_open users open and evicted users keep their data."""
+    store = ShardedStore(str(tmp_path), shards=2, max_open=2)
+
+    async def scenario(port):
+        for user in ('a', 'b', 'c'):
+            await request(port, {'op': 'save_workout', 'user': user, 'workout': WORKOUT})
+        assert list(store._open) == ['b', 'c']  # pylint: disable=protected-access
+        return await request(port, {'op': 'load_workouts', 'user': 'a'})
+
+    (loaded,) = run_with_server(store, scenario)
+
+    assert len(loaded['result']) == 1